@@ -1,2 +1,5 @@
 from .translation import router as translation_router
-from .completeness import router as completeness_router 
\ No newline at end of file
+from .completeness import router as completeness_router
+from .session import router as session_router
+from .metrics import router as metrics_router
+from .speech import router as speech_router
\ No newline at end of file
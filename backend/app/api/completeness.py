@@ -4,12 +4,15 @@ completeness 检测相关API
 """
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from typing import List
 from app.services.completeness import (
     input_detector,
     llm_detector,
+    verdict_cache,
     trigger_detector,
     chinese_detector,
-    english_detector
+    english_detector,
+    rule_scanner
 )
 
 router = APIRouter()
@@ -59,6 +62,7 @@ class TriggerRequest(BaseModel):
     last_translated_text: str
     is_first_translation: bool
     llm_api_key: str = None
+    session_id: str = None
 
 class TriggerResponse(BaseModel):
     should_translate: bool
@@ -70,7 +74,8 @@ async def trigger_check(req: TriggerRequest):
     """
     try:
         should = await trigger_detector.should_translate(
-            req.source_text, req.source_language_code, req.last_translated_text, req.is_first_translation, req.llm_api_key
+            req.source_text, req.source_language_code, req.last_translated_text, req.is_first_translation, req.llm_api_key,
+            session_id=req.session_id
         )
         return TriggerResponse(should_translate=should)
     except Exception as e:
@@ -80,6 +85,7 @@ class TriggerExRequest(BaseModel):
     source_text: str
     source_language_code: str
     llm_api_key: str = None
+    session_id: str = None
 
 class TriggerExResponse(BaseModel):
     should: bool
@@ -92,12 +98,41 @@ async def trigger_ex_check(req: TriggerExRequest):
     """
     try:
         result = await trigger_detector.should_translate_ex(
-            req.source_text, req.source_language_code, req.llm_api_key
+            req.source_text, req.source_language_code, req.llm_api_key,
+            session_id=req.session_id
         )
         return TriggerExResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class SessionStatsResponse(BaseModel):
+    live_sessions: int
+    max_sessions: int
+    created: int
+    expired: int
+    evicted: int
+
+@router.get("/sessions", response_model=SessionStatsResponse)
+async def session_stats():
+    """
+    触发检测会话统计（在线会话数、过期/淘汰次数）
+    """
+    return SessionStatsResponse(**trigger_detector.detector_registry.stats())
+
+@router.get("/cascade-stats")
+async def cascade_stats():
+    """
+    完整性级联各阶段判定次数（本地判定 / LLM 判定 / 规则兜底）
+    """
+    return input_detector.cascade_stats
+
+@router.get("/verdict-cache-stats")
+async def verdict_cache_stats():
+    """
+    LLM 判定缓存统计（命中/未命中/连接词短路/淘汰）
+    """
+    return verdict_cache.verdict_cache.stats()
+
 class EnglishCompleteRequest(BaseModel):
     text: str
 
@@ -113,4 +148,27 @@ def english_complete_check(req: EnglishCompleteRequest):
         is_complete = english_detector.is_english_sentence_complete(req.text)
         return EnglishCompleteResponse(is_complete=is_complete)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+# 批量检测单次最多文本条数
+BATCH_MAX_TEXTS = 100000
+
+class BatchCompleteRequest(BaseModel):
+    texts: List[str]
+    language_code: str = None
+    detector: str = 'input'
+
+class BatchCompleteResponse(BaseModel):
+    results: List[bool]
+
+@router.post("/batch", response_model=BatchCompleteResponse)
+def batch_complete_check(req: BatchCompleteRequest):
+    """
+    批量规则完整性检测（不调用 LLM），用于字幕、语音转写等离线批处理
+    """
+    if len(req.texts) > BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"单次最多 {BATCH_MAX_TEXTS} 条文本")
+    try:
+        return BatchCompleteResponse(results=rule_scanner.scan_batch(req.texts, req.language_code, req.detector))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,86 @@
+# @AI-Generated
+"""
+Prometheus 指标 API：/metrics 输出文本格式指标
+各服务已有的统计在抓取时由采集函数读取，指标为单进程数据，多 worker 部署时按实例分别抓取
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.metrics import registry
+from app.services.translation_cache import translation_cache
+from app.services.singleflight import provider_flight
+from app.services.circuit_breaker import provider_breakers
+from app.services.provider_latency import provider_latency
+from app.services.provider_router import router_stats
+from app.services.speculative_translation import speculation_stats
+from app.services.tracing import tracing_stats
+from app.services.logger import logging_stats
+from app.services.speech_google import speech_clients
+from app.services.completeness.input_detector import cascade_stats
+from app.services.completeness.verdict_cache import verdict_cache
+from app.services.completeness.trigger_detector import detector_registry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter()
+
+def _labeled(stats: dict, label: str):
+    return [({label: key}, value) for key, value in stats.items()]
+
+def _service_stats():
+    cache = translation_cache.stats()
+    yield ("translation_cache_lookups_total", "counter", "翻译缓存查询数，tier 为 memory/disk/miss",
+           [({"tier": "memory"}, cache["hits"] - cache["disk_hits"]),
+            ({"tier": "disk"}, cache["disk_hits"]),
+            ({"tier": "miss"}, cache["misses"])])
+    yield ("translation_cache_hit_ratio", "gauge", "翻译缓存命中率", [({}, cache["hit_ratio"])])
+    yield ("translation_cache_evictions_total", "counter", "翻译缓存内存层淘汰数", [({}, cache["evictions"])])
+    yield ("translation_cache_entries", "gauge", "翻译缓存内存层条目数", [({}, cache["entries"])])
+    yield ("translation_cache_bytes", "gauge", "翻译缓存内存层字节数", [({}, cache["bytes"])])
+
+    verdicts = verdict_cache.stats()
+    yield ("verdict_cache_events_total", "counter", "LLM 判定缓存事件数",
+           _labeled({k: verdicts[k] for k in ("hits", "misses", "short_circuits", "evictions")}, "event"))
+    yield ("verdict_cache_entries", "gauge", "LLM 判定缓存条目数", [({}, verdicts["entries"])])
+
+    flight = provider_flight.stats()
+    yield ("singleflight_calls_total", "counter", "单飞合并层调用数，result 为 started/shared",
+           [({"result": "started"}, flight["started"]), ({"result": "shared"}, flight["shared"])])
+    yield ("singleflight_in_flight", "gauge", "单飞合并层进行中的上游请求数", [({}, flight["in_flight"])])
+
+    breakers = provider_breakers.stats()
+    open_counts = {}
+    for key, state in breakers["breakers"].items():
+        provider = key.split(":", 1)[0]
+        if state["state"] != "closed":
+            open_counts[provider] = open_counts.get(provider, 0) + 1
+    yield ("circuit_breaker_rejections_total", "counter", "熔断拒绝的请求数", [({}, breakers["rejected"])])
+    yield ("circuit_breaker_open", "gauge", "非关闭状态的熔断器数量", _labeled(open_counts, "provider"))
+
+    latency = provider_latency.stats()
+    yield ("provider_latency_ewma_seconds", "gauge", "服务商延迟 EWMA 估计",
+           [({"provider": p}, s["ewma_ms"] / 1000) for p, s in latency.items() if s["ewma_ms"] is not None])
+    yield ("provider_healthy", "gauge", "服务商健康状态（1 健康）",
+           [({"provider": p}, int(s["healthy"])) for p, s in latency.items()])
+    yield ("provider_router_events_total", "counter", "延迟路由计数", _labeled(router_stats, "event"))
+
+    yield ("completeness_cascade_total", "counter", "完整性级联判定各阶段次数", _labeled(cascade_stats, "stage"))
+    yield ("speculation_events_total", "counter", "推测翻译计数", _labeled(speculation_stats.as_dict(), "event"))
+    yield ("trigger_sessions", "gauge", "触发检测的活跃会话数", [({}, detector_registry.stats()["live_sessions"])])
+
+    spans = tracing_stats()
+    yield ("trace_spans_total", "counter", "链路 span 导出结果",
+           [({"result": r}, spans[r]) for r in ("exported", "dropped", "failed")])
+    yield ("google_speech_clients", "gauge", "缓存的 Google 语音识别客户端数", [({}, speech_clients.stats()["clients"])])
+
+    logs = logging_stats()
+    yield ("log_records_total", "counter", "结构化日志写出结果",
+           [({"result": "written"}, logs["written"]), ({"result": "dropped"}, logs["dropped"])])
+
+registry.register_collector(_service_stats)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus 抓取接口
+    """
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,55 @@
+# @AI-Generated
+"""
+输入会话 WebSocket API：一个连接内完成触发检测、完整性检测和翻译推送
+"""
+import json
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.services.typing_session import TypingSession
+
+router = APIRouter()
+
+@router.websocket("/ws")
+async def typing_session(websocket: WebSocket):
+    """
+    客户端消息：
+      {"type": "config", "source_language", "target_language", "llm_api_key", "llm_provider", "incremental", "speculative"}
+      {"type": "edit", "text": 当前完整输入}
+    服务端消息：
+      {"type": "translation", "source_text", "translated_text"}
+      {"type": "trigger", "source_text"}（未配置服务商时仅通知触发）
+      {"type": "error", "detail"}
+    """
+    await websocket.accept()
+    session = TypingSession(websocket.send_json)
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            try:
+                message = _parse_text(frame.get("text"))
+                msg_type = message.get('type')
+                if msg_type == 'config':
+                    session.configure(message)
+                elif msg_type == 'edit':
+                    edit = message.get('text', '')
+                    if not isinstance(edit, str):
+                        raise ValueError("text 必须是字符串")
+                    session.on_edit(edit)
+                else:
+                    await websocket.send_json({"type": "error", "detail": f"未知消息类型: {msg_type}"})
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.cancel()
+
+def _parse_text(text: str) -> dict:
+    try:
+        message = json.loads(text or "")
+    except ValueError:
+        raise ValueError("消息不是合法的 JSON")
+    if not isinstance(message, dict):
+        raise ValueError("消息必须是 JSON 对象")
+    return message
@@ -0,0 +1,58 @@
+# @AI-Generated
+"""
+流式语音识别 WebSocket API：边录边传 PCM 音频，按句推送识别结果
+"""
+import json
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.services.speech_stream import SpeechStreamSession
+
+router = APIRouter()
+
+@router.websocket("/ws")
+async def speech_stream(websocket: WebSocket):
+    """
+    客户端消息：
+      文本 {"type": "config", "provider", "api_key", "xfyun_app_id", "xfyun_api_key", "xfyun_api_secret", "sample_rate", "interim"}
+      二进制 16 位小端单声道 PCM
+      文本 {"type": "end"}
+    服务端消息：
+      {"type": "speech_start", "seq"}
+      {"type": "interim", "seq", "text"}（config 中 interim 为 true 时）
+      {"type": "final", "seq", "text", "confidence", "start_ms", "end_ms"}
+      {"type": "error", "detail", "seq"（识别失败时）}
+      {"type": "done", "utterances"}（收到 end 且全部识别完成后）
+    """
+    await websocket.accept()
+    session = SpeechStreamSession(websocket.send_json)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                if message.get("bytes") is not None:
+                    await session.on_audio(message["bytes"])
+                    continue
+                payload = _parse_text(message.get("text"))
+                msg_type = payload.get("type")
+                if msg_type == "config":
+                    session.configure(payload)
+                elif msg_type == "end":
+                    await session.on_end()
+                else:
+                    await websocket.send_json({"type": "error", "detail": f"未知消息类型: {msg_type}"})
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.cancel()
+
+def _parse_text(text: str) -> dict:
+    try:
+        message = json.loads(text or "")
+    except ValueError:
+        raise ValueError("消息不是合法的 JSON")
+    if not isinstance(message, dict):
+        raise ValueError("消息必须是 JSON 对象")
+    return message
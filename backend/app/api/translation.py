@@ -4,13 +4,29 @@
 """
 from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Request
 from pydantic import BaseModel, Field
-from app.services.llm_translation import translate_with_llm
+from app.services.llm_translation import translate_with_llm, stream_translate_with_llm
+from app.services.incremental_translation import translate_incremental
+from app.services.batch_translation import translate_batch
+from app.services.provider_router import translate_routed, router_stats
+from app.services.provider_latency import provider_latency
+from app.services.circuit_breaker import CircuitOpenError, provider_breakers
+from app.services.speculative_translation import translate_if_complete, speculation_stats
 from app.services.completeness.llm_completeness import analyze_sentence_completeness_with_llm, is_chinese_sentence_complete
 from app.services.speech_router import speech_to_text_with_llm
-from typing import Optional
-from fastapi.responses import JSONResponse
+from app.services.speech_google import SpeechBusyError
+from app.services.audio_upload import AudioTooLargeError
+from app.services.audio_normalize import AudioDecodeError
+from app.services.speech_long import prepare_long_audio, transcribe_long
+from app.services.http_client import get_client
+from app.services.translation_cache import translation_cache
+from app.services.logger import get_logger
+from typing import Dict, List, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
+import time
 
 router = APIRouter()
+log = get_logger(__name__)
 
 class TranslationRequest(BaseModel):
     """
@@ -21,6 +37,9 @@ class TranslationRequest(BaseModel):
     target_language: str = Field(..., description="目标语言代码")
     llm_api_key: str = Field(..., description="大模型API密钥")
     llm_provider: str = Field(..., description="大模型服务商")
+    incremental: bool = Field(False, description="增量分句翻译，已完成的句子复用缓存")
+    routing: bool = Field(False, description="延迟感知路由：在有 API Key 的服务商中选择最快的，并对慢请求发起对冲")
+    llm_api_keys: Optional[Dict[str, str]] = Field(None, description="路由模式下其他服务商的API密钥（服务商 -> 密钥）")
 
 class TranslationResponse(BaseModel):
     """
@@ -28,6 +47,41 @@ class TranslationResponse(BaseModel):
     :param translated_text: 翻译后的文本内容
     """
     translated_text: str  # 翻译结果，字符串类型，返回给前端
+    provider: Optional[str] = None  # 路由模式下实际采用的服务商
+
+class BatchTranslationRequest(BaseModel):
+    """
+    批量翻译请求体
+    """
+    segments: List[str] = Field(..., description="原文段落列表（如字幕行、文档段落）")
+    source_language: str = Field(..., description="源语言代码")
+    target_language: str = Field(..., description="目标语言代码")
+    llm_api_key: str = Field(..., description="大模型API密钥")
+    llm_provider: str = Field(..., description="大模型服务商")
+
+class BatchTranslationResponse(BaseModel):
+    """
+    批量翻译响应体
+    :param translations: 与 segments 一一对应的译文
+    :param stats: 段数、缓存命中段数、服务商调用次数、未对齐重试段数
+    """
+    translations: List[str]
+    stats: Dict[str, int]
+
+class SpeculativeTranslationRequest(TranslationRequest):
+    """
+    推测翻译请求体，在翻译请求基础上增加完整性检测上下文
+    """
+    context: Optional[str] = Field(None, description="上下文（可选）")
+
+class SpeculativeTranslationResponse(BaseModel):
+    """
+    推测翻译响应体
+    :param is_complete: 输入是否完整
+    :param translated_text: 完整时的译文，不完整时为空
+    """
+    is_complete: bool
+    translated_text: Optional[str] = None
 
 class CompletenessRequest(BaseModel):
     """
@@ -72,26 +126,176 @@ class TestConnectionResponse(BaseModel):
     ok: bool
     message: str
 
+def _circuit_open(e: CircuitOpenError) -> HTTPException:
+    """
+    熔断中的快速失败返回 503，并告知客户端重试等待时间
+    """
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+
 @router.post("/", response_model=TranslationResponse)
 async def translate(req: TranslationRequest):
     """
     调用大模型进行翻译
     """
-    print("[后端API] 收到翻译请求:", req.dict())
+    # 只记录元数据，不记录原文和 API Key
+    log.debug(
+        "translate_request", provider=req.llm_provider, source_language=req.source_language,
+        target_language=req.target_language, chars=len(req.source_text), incremental=req.incremental, routing=req.routing
+    )
+    if req.routing:
+        return await _translate_routed(req)
+    translate_func = translate_incremental if req.incremental else translate_with_llm
     try:
-        result = await translate_with_llm(
+        result = await translate_func(
             req.source_text,
             req.source_language,
             req.target_language,
             req.llm_api_key,
             req.llm_provider
         )
-        print("[后端API] 返回翻译结果:", result)
+        log.debug("translate_result", provider=req.llm_provider, chars=len(result))
         return TranslationResponse(translated_text=result)
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
     except Exception as e:
-        print("[后端API] 翻译异常:", str(e))
+        log.error("translate_failed", provider=req.llm_provider, error=str(e))
         raise HTTPException(status_code=500, detail=f"翻译失败: {str(e)}")
 
+async def _translate_routed(req: TranslationRequest) -> TranslationResponse:
+    api_keys = dict(req.llm_api_keys or {})
+    api_keys.setdefault(req.llm_provider, req.llm_api_key)
+    try:
+        result, provider = await translate_routed(
+            req.source_text,
+            req.source_language,
+            req.target_language,
+            api_keys
+        )
+        log.debug("translate_result", provider=provider, chars=len(result), routed=True)
+        return TranslationResponse(translated_text=result, provider=provider)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except Exception as e:
+        log.error("translate_failed", provider=req.llm_provider, error=str(e))
+        raise HTTPException(status_code=500, detail=f"翻译失败: {str(e)}")
+
+@router.get("/provider-latency")
+async def provider_latency_view():
+    """
+    各服务商延迟估计（EWMA/p95）、健康状态与路由计数
+    """
+    return {"providers": provider_latency.stats(), "router": router_stats}
+
+@router.get("/breakers")
+async def breakers_view():
+    """
+    熔断器状态：仅列出发生过失败或熔断的 (服务商, Key 指纹)
+    """
+    return provider_breakers.stats()
+
+BATCH_MAX_SEGMENTS = 2000
+
+@router.post("/batch", response_model=BatchTranslationResponse)
+async def translate_batch_view(req: BatchTranslationRequest):
+    """
+    批量翻译：多段按 token 预算打包进一次服务商请求，译文按原顺序返回
+    """
+    if len(req.segments) > BATCH_MAX_SEGMENTS:
+        raise HTTPException(status_code=400, detail=f"单次最多 {BATCH_MAX_SEGMENTS} 段")
+    try:
+        translations, stats = await translate_batch(
+            req.segments,
+            req.source_language,
+            req.target_language,
+            req.llm_api_key,
+            req.llm_provider
+        )
+        return BatchTranslationResponse(translations=translations, stats=stats)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except Exception as e:
+        log.error("batch_translate_failed", provider=req.llm_provider, segments=len(req.segments), error=str(e))
+        raise HTTPException(status_code=500, detail=f"翻译失败: {str(e)}")
+
+@router.post("/speculative", response_model=SpeculativeTranslationResponse)
+async def translate_speculative(req: SpeculativeTranslationRequest):
+    """
+    完整性检测与翻译并行发起：判定完整直接返回译文，不完整则取消翻译
+    """
+    try:
+        is_complete, result = await translate_if_complete(
+            req.source_text,
+            req.source_language,
+            req.target_language,
+            req.llm_api_key,
+            req.llm_provider,
+            req.context
+        )
+        return SpeculativeTranslationResponse(is_complete=is_complete, translated_text=result)
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except Exception as e:
+        log.error("speculative_translate_failed", provider=req.llm_provider, error=str(e))
+        raise HTTPException(status_code=500, detail=f"翻译失败: {str(e)}")
+
+@router.get("/speculation-stats")
+async def speculation_stats_view():
+    """
+    推测翻译统计：发起/采用/浪费次数
+    """
+    return speculation_stats.as_dict()
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/stream")
+async def translate_stream(req: TranslationRequest):
+    """
+    流式翻译（SSE）：逐段推送 chunk 事件，结束时推送 done 事件（含完整译文、首字耗时与总耗时）
+    """
+    async def event_stream():
+        start = time.time()
+        ttft_ms = None
+        parts = []
+        try:
+            async for chunk in stream_translate_with_llm(
+                req.source_text,
+                req.source_language,
+                req.target_language,
+                req.llm_api_key,
+                req.llm_provider
+            ):
+                if ttft_ms is None:
+                    ttft_ms = int((time.time() - start) * 1000)
+                parts.append(chunk)
+                yield _sse_event("chunk", {"text": chunk})
+            total_ms = int((time.time() - start) * 1000)
+            yield _sse_event("done", {
+                "translated_text": "".join(parts).strip(),
+                "ttft_ms": ttft_ms if ttft_ms is not None else total_ms,
+                "total_ms": total_ms
+            })
+        except Exception as e:
+            log.error("stream_translate_failed", provider=req.llm_provider, error=str(e))
+            yield _sse_event("error", {"detail": f"翻译失败: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache-stats")
+async def cache_stats():
+    """
+    翻译缓存命中/未命中/淘汰统计
+    """
+    return translation_cache.stats()
+
 @router.post("/completeness", response_model=CompletenessResponse)
 async def analyze_completeness(req: CompletenessRequest):
     """
@@ -102,6 +306,8 @@ async def analyze_completeness(req: CompletenessRequest):
             req.text, req.llm_api_key, req.llm_provider
         )
         return CompletenessResponse(is_complete=is_complete, reason=reason)
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"完整性分析失败: {str(e)}")
 
@@ -127,9 +333,56 @@ async def speech_to_text(
             xfyun_api_secret=xfyun_api_secret
         )
         return SpeechToTextResponse(text=text, confidence=confidence)
+    except CircuitOpenError as e:
+        raise _circuit_open(e)
+    except SpeechBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
+    except AudioTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"语音识别失败: {str(e)}")
 
+@router.post("/speech-to-text/long")
+async def speech_to_text_long(
+    audio: UploadFile = File(..., description="音频文件"),
+    llm_provider: str = Form(..., description="服务商(openai/google/xfyun)"),
+    llm_api_key: Optional[str] = Form(None, description="大模型API密钥/Google服务账号JSON字符串"),
+    xfyun_app_id: Optional[str] = Form(None, description="讯飞AppID"),
+    xfyun_api_key: Optional[str] = Form(None, description="讯飞APIKey"),
+    xfyun_api_secret: Optional[str] = Form(None, description="讯飞APISecret")
+):
+    """
+    长音频分段并行识别（SSE）：plan 事件后每段完成推送 chunk 事件，按顺序拼接的新增文本推送 text 事件，结束时推送 done 事件
+    """
+    try:
+        pcm = await prepare_long_audio(audio, llm_provider)
+    except AudioTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    credentials = {
+        "llm_api_key": llm_api_key,
+        "xfyun_app_id": xfyun_app_id,
+        "xfyun_api_key": xfyun_api_key,
+        "xfyun_api_secret": xfyun_api_secret,
+    }
+
+    async def event_stream():
+        try:
+            async for event in transcribe_long(pcm, llm_provider, credentials):
+                yield _sse_event(event.pop("type"), event)
+        except Exception as e:
+            log.error("speech_long_failed", provider=llm_provider, error=str(e))
+            yield _sse_event("error", {"detail": f"语音识别失败: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/chinese-completeness", response_model=ChineseCompletenessResponse)
 async def chinese_completeness_check(req: ChineseCompletenessRequest):
     """
@@ -153,81 +406,73 @@ async def test_connection(req: TestConnectionRequest):
     try:
         if provider == "chatgpt":
             # OpenAI ChatGPT 测试
-            import httpx
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "gpt-4o-mini",
-                        "messages": [{"role": "user", "content": "Hello"}],
-                        "max_tokens": 5
-                    },
-                    timeout=10
-                )
-                if resp.is_success:
-                    return TestConnectionResponse(ok=True, message="ChatGPT 连接成功")
-                else:
-                    return TestConnectionResponse(ok=False, message=f"ChatGPT 连接失败: {resp.text}")
+            resp = await get_client("openai").post(
+                "https://api.openai.com/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": "gpt-4o-mini",
+                    "messages": [{"role": "user", "content": "Hello"}],
+                    "max_tokens": 5
+                },
+                timeout=10
+            )
+            if resp.is_success:
+                return TestConnectionResponse(ok=True, message="ChatGPT 连接成功")
+            else:
+                return TestConnectionResponse(ok=False, message=f"ChatGPT 连接失败: {resp.text}")
         elif provider == "gemini":
-            import httpx
             url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro:generateContent?key={api_key}"
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    url,
-                    headers={"Content-Type": "application/json"},
-                    json={
-                        "contents": [{"parts": [{"text": "Hello"}]}],
-                        "generationConfig": {"maxOutputTokens": 10}
-                    },
-                    timeout=10
-                )
-                if resp.is_success:
-                    return TestConnectionResponse(ok=True, message="Gemini 连接成功")
-                else:
-                    return TestConnectionResponse(ok=False, message=f"Gemini 连接失败: {resp.text}")
+            resp = await get_client("gemini").post(
+                url,
+                headers={"Content-Type": "application/json"},
+                json={
+                    "contents": [{"parts": [{"text": "Hello"}]}],
+                    "generationConfig": {"maxOutputTokens": 10}
+                },
+                timeout=10
+            )
+            if resp.is_success:
+                return TestConnectionResponse(ok=True, message="Gemini 连接成功")
+            else:
+                return TestConnectionResponse(ok=False, message=f"Gemini 连接失败: {resp.text}")
         elif provider == "huggingface":
-            import httpx
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    "https://api-inference.huggingface.co/models/facebook/mbart-large-50-many-to-many-mmt",
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "inputs": "Hello",
-                        "parameters": {"src_lang": "en_XX", "tgt_lang": "zh_CN"}
-                    },
-                    timeout=10
-                )
-                if resp.is_success:
-                    return TestConnectionResponse(ok=True, message="HuggingFace 连接成功")
-                else:
-                    return TestConnectionResponse(ok=False, message=f"HuggingFace 连接失败: {resp.text}")
+            resp = await get_client("huggingface").post(
+                "https://api-inference.huggingface.co/models/facebook/mbart-large-50-many-to-many-mmt",
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "inputs": "Hello",
+                    "parameters": {"src_lang": "en_XX", "tgt_lang": "zh_CN"}
+                },
+                timeout=10
+            )
+            if resp.is_success:
+                return TestConnectionResponse(ok=True, message="HuggingFace 连接成功")
+            else:
+                return TestConnectionResponse(ok=False, message=f"HuggingFace 连接失败: {resp.text}")
         elif provider == "deepseek":
-            import httpx
-            async with httpx.AsyncClient() as client:
-                resp = await client.post(
-                    "https://api.deepseek.com/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "deepseek-chat",
-                        "messages": [{"role": "user", "content": "Hello"}],
-                        "max_tokens": 5
-                    },
-                    timeout=10
-                )
-                if resp.is_success:
-                    return TestConnectionResponse(ok=True, message="DeepSeek 连接成功")
-                else:
-                    return TestConnectionResponse(ok=False, message=f"DeepSeek 连接失败: {resp.text}")
+            resp = await get_client("deepseek").post(
+                "https://api.deepseek.com/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": "deepseek-chat",
+                    "messages": [{"role": "user", "content": "Hello"}],
+                    "max_tokens": 5
+                },
+                timeout=10
+            )
+            if resp.is_success:
+                return TestConnectionResponse(ok=True, message="DeepSeek 连接成功")
+            else:
+                return TestConnectionResponse(ok=False, message=f"DeepSeek 连接失败: {resp.text}")
         else:
             return TestConnectionResponse(ok=False, message="不支持的 provider")
     except Exception as e:
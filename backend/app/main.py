@@ -2,14 +2,44 @@
 """
 FastAPI 入口
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api import translation, translation_router, completeness_router
+from app.api import translation, translation_router, completeness_router, session_router, speech_router, metrics_router
 from app.middleware.rate_limit import RateLimiter
+from app.middleware.timing import RequestTiming
+from app.middleware.tracing import RequestTracing
+from app.services.http_client import init_clients, close_clients
+from app.services.translation_cache import translation_cache
+from app.services.tracing import init_tracing, shutdown_tracing
+from app.services.logger import shutdown_logging
+from app.services.speech_google import close_google_clients
+from app.services.audio_normalize import shutdown_audio_pool
 
-app = FastAPI(title="AI Translation Server")
-app.add_middleware(RateLimiter, max_requests=2, window_seconds=2)  # 2秒内最多2次
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：启动时建立服务商连接池和链路导出线程，关闭时释放连接、缓存并写出剩余的 span 与日志
+    """
+    await init_clients()
+    init_tracing()
+    yield
+    await close_clients()
+    translation_cache.close()
+    close_google_clients()
+    shutdown_audio_pool()
+    shutdown_tracing()
+    shutdown_logging()
+
+app = FastAPI(title="AI Translation Server", lifespan=lifespan)
+# 纯 ASGI 中间件，后添加的在外层：耗时统计包含限流，链路根 span 包含全部
+app.add_middleware(RateLimiter)  # 策略见 RATE_LIMIT_* 环境变量，默认 2秒内最多2次，完整性检测接口 2秒内20次
+app.add_middleware(RequestTiming)
+app.add_middleware(RequestTracing)
 
 # 注册路由
 app.include_router(translation.router, prefix="/api/translation", tags=["Translation"])
 app.include_router(translation_router, prefix="/api/translation")
-app.include_router(completeness_router, prefix="/api/translation/completeness") 
\ No newline at end of file
+app.include_router(completeness_router, prefix="/api/translation/completeness")
+app.include_router(session_router, prefix="/api/translation/session")
+app.include_router(speech_router, prefix="/api/translation/speech")
+app.include_router(metrics_router, tags=["Metrics"])
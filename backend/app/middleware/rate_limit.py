@@ -1,36 +1,229 @@
 # @AI-Generated
 """
-全局/用户/IP 限流中间件
+限流中间件：令牌桶算法，每个限流键 O(1) 状态，空闲键自动淘汰
+支持按路由前缀配置策略、按会话（X-Session-ID 请求头）或 IP 计数，
+存储后端可选内存（单进程）或 SQLite（同机多个 uvicorn worker 共享）
 """
+import asyncio
+import os
+import sqlite3
+import threading
 import time
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
 from starlette.responses import JSONResponse
-from collections import defaultdict
-from typing import Dict
-
-class RateLimiter(BaseHTTPMiddleware):
-    """
-    简单内存限流，支持全局/每IP/每用户限流
-    """
-    def __init__(self, app, max_requests: int = 3, window_seconds: int = 2):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self.ip_timestamps: Dict[str, list] = defaultdict(list)
-
-    async def dispatch(self, request: Request, call_next):
-        # 获取客户端IP
-        ip = request.client.host
-        now = time.time()
-        timestamps = self.ip_timestamps[ip]
-        # 移除过期时间戳
-        self.ip_timestamps[ip] = [t for t in timestamps if now - t < self.window_seconds]
-        if len(self.ip_timestamps[ip]) >= self.max_requests:
-            # 超出限流
-            return JSONResponse(
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.services.metrics import rate_limit_rejections_total
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")          # memory / sqlite
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "rate_limit.db")              # sqlite 后端的数据库文件
+RATE_LIMIT_IDLE_TTL = float(os.getenv("RATE_LIMIT_IDLE_TTL", "300"))     # 秒，空闲键淘汰时间
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))    # 内存后端键数量硬上限
+# 默认策略与按路由前缀的策略，格式 "次数/秒"，路由为 "前缀=次数/秒,前缀=次数/秒"
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "2/2")
+RATE_LIMIT_ROUTES = os.getenv(
+    "RATE_LIMIT_ROUTES",
+    "/api/translation/completeness/=20/2,/api/translation/chinese-completeness=20/2,/metrics=10/1"
+)
+# 每个 IP 的总上限，防止伪造会话 ID 绕过限流
+RATE_LIMIT_IP_CEILING = os.getenv("RATE_LIMIT_IP_CEILING", "60/2")
+
+SESSION_HEADER = b"x-session-id"
+
+class RatePolicy(NamedTuple):
+    """
+    window 秒内最多 capacity 次，令牌以 capacity/window 每秒的速率恢复，允许 capacity 次突发
+    """
+    capacity: int
+    window: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.window
+
+    @classmethod
+    def parse(cls, spec: str) -> "RatePolicy":
+        count, window = spec.strip().split("/")
+        return cls(int(count), float(window))
+
+def parse_route_policies(spec: str) -> List[Tuple[str, RatePolicy]]:
+    """
+    解析 "前缀=次数/秒,..."，按前缀长度降序排列，最长前缀优先匹配
+    """
+    routes = []
+    for item in spec.split(","):
+        if item.strip():
+            prefix, policy = item.split("=", 1)
+            routes.append((prefix.strip(), RatePolicy.parse(policy)))
+    return sorted(routes, key=lambda r: len(r[0]), reverse=True)
+
+def _refill(tokens: float, updated: float, policy: RatePolicy, now: float) -> float:
+    return min(float(policy.capacity), tokens + (now - updated) * policy.rate)
+
+class MemoryBucketStore:
+    """
+    单进程内存令牌桶，按最近访问顺序排列，空闲超时或超出上限时从最久未访问的一端淘汰
+    空闲超过策略窗口的桶已经回满，淘汰不影响限流结果
+    """
+    def __init__(self, idle_ttl: float = RATE_LIMIT_IDLE_TTL, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.idle_ttl = idle_ttl
+        self.max_keys = max_keys
+        # key -> [剩余令牌, 更新时间]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.evicted = 0
+
+    async def acquire(self, key: str, policy: RatePolicy) -> float:
+        return self.take(key, policy, time.monotonic())
+
+    def take(self, key: str, policy: RatePolicy, now: float) -> float:
+        """
+        :return: 0 表示放行，否则为需要等待的秒数
+        """
+        self._evict(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(policy.capacity), now]
+            self._buckets[key] = bucket
+        else:
+            bucket[0] = _refill(bucket[0], bucket[1], policy, now)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / policy.rate
+
+    def _evict(self, now: float):
+        buckets = self._buckets
+        while buckets:
+            _, bucket = next(iter(buckets.items()))
+            if now - bucket[1] < self.idle_ttl and len(buckets) < self.max_keys:
+                break
+            buckets.popitem(last=False)
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def close(self):
+        self._buckets.clear()
+
+class SQLiteBucketStore:
+    """
+    SQLite 令牌桶，WAL 模式，同机多个 worker 进程共享同一文件；读改写在 IMMEDIATE 事务内完成
+    """
+    # 每处理这么多次请求清理一次空闲键
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str = RATE_LIMIT_DB, idle_ttl: float = RATE_LIMIT_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    async def acquire(self, key: str, policy: RatePolicy) -> float:
+        return await asyncio.to_thread(self.take, key, policy, time.time())
+
+    def take(self, key: str, policy: RatePolicy, now: float) -> float:
+        # 多进程共享，使用墙上时间
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                tokens = float(policy.capacity) if row is None else _refill(row[0], row[1], policy, now)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / policy.rate
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now)
+                )
+                self._calls += 1
+                if self._calls % self.PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - self.idle_ttl,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def create_store(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "sqlite":
+        return SQLiteBucketStore()
+    if backend == "memory":
+        return MemoryBucketStore()
+    raise ValueError(f"不支持的限流后端: {backend}")
+
+class RateLimiter:
+    """
+    令牌桶限流（纯 ASGI 中间件，不包装请求/响应流）：按路由前缀选择策略，
+    同一会话（无会话头时同一 IP）在每组路由内独立计数，另对每个 IP 施加总上限
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        default_policy: Optional[RatePolicy] = None,
+        route_policies: Optional[List[Tuple[str, RatePolicy]]] = None,
+        ip_ceiling: Optional[RatePolicy] = None,
+        store=None
+    ):
+        self.app = app
+        self.default_policy = default_policy or RatePolicy.parse(RATE_LIMIT_DEFAULT)
+        self.route_policies = route_policies if route_policies is not None else parse_route_policies(RATE_LIMIT_ROUTES)
+        self.ip_ceiling = ip_ceiling or RatePolicy.parse(RATE_LIMIT_IP_CEILING)
+        self.store = store or create_store()
+
+    def resolve(self, path: str) -> Tuple[str, RatePolicy]:
+        """
+        :return: (策略所属路由前缀，默认策略为空串, 策略)
+        """
+        for prefix, policy in self.route_policies:
+            if path.startswith(prefix):
+                return prefix, policy
+        return "", self.default_policy
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # WebSocket 与 lifespan 不限流
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        ip = client[0] if client else "unknown"
+        prefix, policy = self.resolve(scope["path"])
+        session_id = None
+        for name, value in scope["headers"]:
+            if name == SESSION_HEADER:
+                session_id = value.decode("latin-1")
+                break
+        subject = session_id or ip
+        wait = await self.store.acquire(f"r:{prefix}:{subject}", policy)
+        if not wait and subject != ip:
+            wait = await self.store.acquire(f"ip:{ip}", self.ip_ceiling)
+        if wait:
+            rate_limit_rejections_total.inc(prefix or "default")
+            retry_after = max(1, int(wait + 0.999))
+            response = JSONResponse(
                 status_code=429,
-                content={"detail": f"请求过于频繁，请{self.window_seconds}秒后再试"}
+                content={"detail": f"请求过于频繁，请{retry_after}秒后再试"},
+                headers={"Retry-After": str(retry_after)}
             )
-        self.ip_timestamps[ip].append(now)
-        return await call_next(request) 
\ No newline at end of file
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
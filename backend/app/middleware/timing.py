@@ -0,0 +1,68 @@
+# @AI-Generated
+"""
+请求耗时中间件（纯 ASGI）：响应头带 Server-Timing（到响应开始的耗时），
+响应结束后按路由模板记录请求数与耗时指标并打印慢请求；不缓冲响应体，流式响应逐块透传
+"""
+import os
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.metrics import http_requests_total, http_request_duration_seconds
+from app.services.logger import get_logger
+
+REQUEST_SLOW_MS = float(os.getenv("REQUEST_SLOW_MS", "1000"))   # 超过该耗时的请求记录 warning 日志
+
+log = get_logger(__name__)
+
+def route_template(scope: Scope) -> str:
+    """
+    路由模板作为指标标签（避免路径参数导致基数膨胀）；未匹配路由的请求归为 unmatched
+    嵌套 include_router 时 scope 中的路由只含子路由路径，前缀从实际路径中还原
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope["path"]
+    params = scope.get("path_params") or {}
+    try:
+        concrete = getattr(route, "path_format", template).format(**params)
+    except (KeyError, IndexError, ValueError):
+        return template
+    if path.endswith(concrete):
+        return path[:len(path) - len(concrete)] + template
+    return template
+
+class RequestTiming:
+    """
+    记录请求耗时
+    """
+    def __init__(self, app: ASGIApp, slow_ms: float = REQUEST_SLOW_MS):
+        self.app = app
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 0
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", f"app;dur={elapsed_ms:.1f}".encode("latin-1")))
+                message = dict(message, headers=headers)
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                elapsed = time.perf_counter() - start
+                route = route_template(scope)
+                http_requests_total.inc(route, scope["method"], str(status))
+                http_request_duration_seconds.observe(elapsed, route, scope["method"])
+                total_ms = elapsed * 1000
+                if total_ms >= self.slow_ms:
+                    log.warning("slow_request", method=scope["method"], path=scope["path"], status=status, duration_ms=round(total_ms))
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,46 @@
+# @AI-Generated
+"""
+链路追踪中间件（纯 ASGI）：每个 HTTP 请求开始一条链路，请求 ID 取自 X-Request-ID 头（原样返回），
+trace ID 取自 traceparent 头或由请求 ID 得出，请求 ID 通过 X-Request-ID 响应头返回，便于在日志与链路文件中检索
+"""
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.middleware.timing import route_template
+from app.services.tracing import start_trace
+
+REQUEST_ID_HEADER = b"x-request-id"
+TRACEPARENT_HEADER = b"traceparent"
+
+class RequestTracing:
+    """
+    根 span 覆盖整个请求（含限流），结束时记录路由模板与状态码
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = traceparent = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+            elif name == TRACEPARENT_HEADER:
+                traceparent = value.decode("latin-1")
+
+        with start_trace(f"{scope['method']} {scope['path']}", request_id, traceparent) as root:
+            async def send_with_request_id(message: Message):
+                if message["type"] == "http.response.start":
+                    root.set("http.status_code", message["status"])
+                    headers = list(message.get("headers", []))
+                    headers.append((REQUEST_ID_HEADER, root.request_id.encode("latin-1")))
+                    message = dict(message, headers=headers)
+                await send(message)
+
+            root.set("http.method", scope["method"])
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            finally:
+                route = route_template(scope)
+                root.name = f"{scope['method']} {route}"
+                root.set("http.route", route)
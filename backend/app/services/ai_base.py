@@ -4,4 +4,16 @@ AI服务通用类型和工具函数
 """
 from typing import Optional, Tuple
 
-# 可在此添加通用工具函数、类型别名等 
\ No newline at end of file
+# 可在此添加通用工具函数、类型别名等 
+
+class ProviderError(Exception):
+    """
+    服务商返回非成功状态码，保留状态码供熔断器区分认证失败、限流与服务端错误
+    """
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def is_auth_error(self) -> bool:
+        return self.status_code in (401, 403)
@@ -0,0 +1,285 @@
+# @AI-Generated
+"""
+音频预处理：解码常见容器、混为单声道、重采样到 16kHz（NumPy）、裁掉首尾静音，输出 16 位 PCM
+WAV / 裸 PCM 直接解析，解码与重采样在进程池中执行，不占用事件循环和 GIL；
+WebM/Opus、OGG、MP3、M4A 等交给 ffmpeg（可选，未安装时这些格式原样上传），上传文件分块写入其 stdin
+只在服务商确实需要时转换：Whisper 接受压缩格式，原样上传比 PCM 小得多
+"""
+import asyncio
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+import numpy as np
+from fastapi import UploadFile
+from .audio_upload import ensure_upload_size, iter_upload, SPEECH_MAX_UPLOAD_BYTES
+from .vad import frame_energy_db
+from .logger import get_logger
+
+AUDIO_TARGET_RATE = 16000
+AUDIO_NORMALIZE_WORKERS = int(os.getenv("AUDIO_NORMALIZE_WORKERS", "2"))        # 进程池大小，0 表示在线程中执行
+AUDIO_DECODE_TIMEOUT = float(os.getenv("AUDIO_DECODE_TIMEOUT", "30"))           # 秒，单次解码上限
+AUDIO_TRIM_DB = float(os.getenv("AUDIO_TRIM_DB", "-45"))                        # 首尾静音判定阈值下限（dBFS）
+AUDIO_TRIM_PAD_MS = int(os.getenv("AUDIO_TRIM_PAD_MS", "200"))                  # 裁剪后首尾保留的静音
+AUDIO_FFMPEG = os.getenv("AUDIO_FFMPEG") or shutil.which("ffmpeg")              # ffmpeg 可执行文件，为空时不解码压缩格式
+
+# 裁剪用的帧长与阈值余量（高于最安静 10% 帧的能量多少 dB 视为有声）
+_TRIM_FRAME_MS = 20
+_TRIM_MARGIN_DB = 15
+# 低通滤波器阶数（抽取前抗混叠）
+_LOWPASS_TAPS = 63
+# 裸 PCM 的识别方式：内容类型或扩展名，按 16kHz 16 位单声道处理
+_RAW_PCM_TYPES = ("audio/l16", "audio/pcm", "audio/x-pcm")
+_RAW_PCM_EXTENSIONS = (".pcm", ".raw")
+# 判断格式读取的文件头长度（WAV 的 fmt 块一般在开头几十字节内）
+_HEAD_BYTES = 4096
+
+log = get_logger(__name__)
+
+class AudioDecodeError(Exception):
+    """
+    无法解码的音频
+    """
+
+def _is_wav(data: bytes) -> bool:
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+def _is_raw_pcm(content_type: Optional[str], filename: Optional[str]) -> bool:
+    if content_type and content_type.split(";")[0].strip().lower() in _RAW_PCM_TYPES:
+        return True
+    return bool(filename) and filename.lower().endswith(_RAW_PCM_EXTENSIONS)
+
+def _wav_format(data: bytes) -> Tuple[int, int, int, int]:
+    """
+    读取 fmt 块
+    :return: (格式码, 声道数, 采样率, 位深)；WAVE_FORMAT_EXTENSIBLE 取子格式
+    """
+    position = 12
+    while position + 8 <= len(data):
+        chunk_id = data[position:position + 4]
+        size = int.from_bytes(data[position + 4:position + 8], "little")
+        if chunk_id == b"fmt ":
+            fmt = data[position + 8:position + 8 + size]
+            code = int.from_bytes(fmt[0:2], "little")
+            if code == 0xFFFE and len(fmt) >= 26:
+                code = int.from_bytes(fmt[24:26], "little")
+            return (code, int.from_bytes(fmt[2:4], "little"),
+                    int.from_bytes(fmt[4:8], "little"), int.from_bytes(fmt[14:16], "little"))
+        position += 8 + size + (size & 1)
+    raise AudioDecodeError("WAV 缺少 fmt 块")
+
+def _wav_data(data: bytes) -> bytes:
+    position = 12
+    while position + 8 <= len(data):
+        size = int.from_bytes(data[position + 4:position + 8], "little")
+        if data[position:position + 4] == b"data":
+            return data[position + 8:position + 8 + size]
+        position += 8 + size + (size & 1)
+    raise AudioDecodeError("WAV 缺少 data 块")
+
+def decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    :return: (float32 采样，形状 [帧数, 声道数]，范围 -1~1, 采样率)
+    """
+    code, channels, rate, bits = _wav_format(data)
+    if channels < 1 or rate <= 0:
+        raise AudioDecodeError("WAV 头无效")
+    payload = _wav_data(data)
+    if code == 3 and bits in (32, 64):
+        samples = np.frombuffer(payload[:len(payload) - len(payload) % (bits // 8)], dtype=f"<f{bits // 8}").astype(np.float32)
+    elif code == 1 and bits == 8:
+        samples = (np.frombuffer(payload, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif code == 1 and bits == 16:
+        samples = np.frombuffer(payload[:len(payload) - len(payload) % 2], dtype="<i2").astype(np.float32) / 32768
+    elif code == 1 and bits == 24:
+        raw = np.frombuffer(payload[:len(payload) - len(payload) % 3], dtype=np.uint8).reshape(-1, 3)
+        values = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        samples = values.astype(np.float32) / (1 << 23)
+    elif code == 1 and bits == 32:
+        samples = np.frombuffer(payload[:len(payload) - len(payload) % 4], dtype="<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise AudioDecodeError(f"不支持的 WAV 编码: format={code}, bits={bits}")
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels), rate
+
+async def decode_ffmpeg(audio: UploadFile) -> bytes:
+    """
+    ffmpeg 解码任意容器，上传文件分块写入 stdin，直接输出目标采样率的 16 位单声道 PCM
+    """
+    if not AUDIO_FFMPEG:
+        raise AudioDecodeError("未安装 ffmpeg，无法解码该格式")
+    process = await asyncio.create_subprocess_exec(
+        AUDIO_FFMPEG, "-nostdin", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(AUDIO_TARGET_RATE), "pipe:1",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+
+    async def feed():
+        try:
+            async for chunk in iter_upload(audio):
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+            process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg 提前退出，错误信息见 stderr
+            pass
+
+    try:
+        _, pcm, stderr = await asyncio.wait_for(
+            asyncio.gather(feed(), process.stdout.read(), process.stderr.read()), AUDIO_DECODE_TIMEOUT
+        )
+        await process.wait()
+    except asyncio.TimeoutError:
+        raise AudioDecodeError("音频解码超时")
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    if process.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg 解码失败: {stderr.decode(errors='replace').strip()[:200]}")
+    return pcm
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    return samples[:, 0] if samples.shape[1] == 1 else samples.mean(axis=1)
+
+def _lowpass(samples: np.ndarray, cutoff: float) -> np.ndarray:
+    """
+    Hamming 窗 sinc 低通
+    :param cutoff: 截止频率 / 采样率（0~0.5）
+    """
+    n = np.arange(_LOWPASS_TAPS) - (_LOWPASS_TAPS - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(_LOWPASS_TAPS)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode="same")
+
+def resample(samples: np.ndarray, rate: int, target: int = AUDIO_TARGET_RATE) -> np.ndarray:
+    """
+    线性插值重采样；降采样前先低通抗混叠
+    """
+    if rate == target or len(samples) == 0:
+        return samples
+    if rate > target:
+        samples = _lowpass(samples, 0.45 * target / rate)
+    count = int(round(len(samples) * target / rate))
+    positions = np.arange(count, dtype=np.float64) * (rate / target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def trim_silence(samples: np.ndarray, rate: int = AUDIO_TARGET_RATE) -> np.ndarray:
+    """
+    裁掉首尾静音，保留 AUDIO_TRIM_PAD_MS；全部为静音时返回空数组
+    """
+    frame_len = rate * _TRIM_FRAME_MS // 1000
+    pcm = np.clip(samples * 32768, -32768, 32767).astype(np.int16)
+    energies = frame_energy_db(pcm, frame_len)
+    if len(energies) == 0:
+        return samples
+    # 整段音量接近时（没有静音段）以最响的帧为参照，避免全部判为静音
+    noise = float(np.percentile(energies, 10))
+    threshold = max(AUDIO_TRIM_DB, min(noise + _TRIM_MARGIN_DB, float(energies.max()) - _TRIM_MARGIN_DB))
+    voiced = np.flatnonzero(energies >= threshold)
+    if len(voiced) == 0:
+        return samples[:0]
+    pad = AUDIO_TRIM_PAD_MS // _TRIM_FRAME_MS
+    start = max(int(voiced[0]) - pad, 0) * frame_len
+    end = min((int(voiced[-1]) + 1 + pad) * frame_len, len(samples))
+    return samples[start:end]
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    return np.clip(samples * 32768, -32768, 32767).astype("<i2").tobytes()
+
+def trim_pcm16(pcm: bytes) -> bytes:
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2").astype(np.float32) / 32768
+    return to_pcm16(trim_silence(samples))
+
+def normalize_audio(data: bytes, content_type: Optional[str] = None, filename: Optional[str] = None) -> bytes:
+    """
+    WAV / 裸 PCM：解码 -> 单声道 -> 16kHz -> 裁剪首尾静音（在进程池中执行，参数与返回值需可序列化）
+    :return: 16kHz 16 位单声道 PCM；全部为静音时为空
+    """
+    if _is_wav(data):
+        samples, rate = decode_wav(data)
+    elif _is_raw_pcm(content_type, filename):
+        return trim_pcm16(data)
+    else:
+        raise AudioDecodeError("不是 WAV 或 PCM 音频")
+    mono = resample(downmix(samples), rate)
+    return to_pcm16(trim_silence(mono))
+
+def _is_target_wav(head: bytes) -> bool:
+    try:
+        return _wav_format(head) == (1, 1, AUDIO_TARGET_RATE, 16)
+    except AudioDecodeError:
+        return False
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # 主进程中有日志、链路导出、Google 识别等线程，fork 出的子进程可能继承被持有的锁，改用 spawn
+        _pool = ProcessPoolExecutor(max_workers=AUDIO_NORMALIZE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _reset_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def _decode_in_pool(audio: UploadFile) -> bytes:
+    # WAV 需要整体解码，只能整个读入（受上传大小上限约束）
+    await audio.seek(0)
+    data = await audio.read()
+    await audio.seek(0)
+    if AUDIO_NORMALIZE_WORKERS > 0:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), normalize_audio, data, audio.content_type, audio.filename)
+    return await asyncio.to_thread(normalize_audio, data, audio.content_type, audio.filename)
+
+async def normalize_upload(
+    audio: UploadFile,
+    container: str = "raw",
+    limit: int = SPEECH_MAX_UPLOAD_BYTES,
+    always: bool = False
+) -> Optional[bytes]:
+    """
+    按服务商需要预处理上传的音频，只在确有转换必要时解码：
+    已是 16kHz 单声道 16 位的 WAV、服务商可直接接受的裸 PCM、Whisper（container=wav）可直接接受的压缩格式都原样上传
+    :param container: 服务商需要的容器，wav 或 raw（见 speech_router.PCM_CONTAINERS）
+    :param limit: 上传大小上限，超过抛出 AudioTooLargeError
+    :param always: 总是解码为 PCM（长音频切分需要）
+    :return: 16kHz 16 位单声道 PCM（全部为静音时为空）；无需转换或无法解码时返回 None，由调用方按原文件上传
+    """
+    ensure_upload_size(audio, limit)
+    await audio.seek(0)
+    head = await audio.read(_HEAD_BYTES)
+    await audio.seek(0)
+    try:
+        if _is_wav(head):
+            if not always and _is_target_wav(head):
+                return None
+            return await _decode_in_pool(audio)
+        if _is_raw_pcm(audio.content_type, audio.filename):
+            if not always and container == "raw":
+                return None
+            return await _decode_in_pool(audio)
+        if not always and container == "wav":
+            return None
+        pcm = await decode_ffmpeg(audio)
+        return await asyncio.to_thread(trim_pcm16, pcm)
+    except AudioDecodeError as e:
+        log.info("audio_normalize_skipped", content_type=audio.content_type, reason=str(e))
+        return None
+    except BrokenProcessPool as e:
+        # 工作进程异常退出（如解码时内存不足），丢弃进程池，下次请求重新创建
+        log.warning("audio_normalize_pool_broken", error=str(e))
+        _reset_pool()
+        return None
+    finally:
+        await audio.seek(0)
+
+def shutdown_audio_pool():
+    _reset_pool()
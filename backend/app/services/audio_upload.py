@@ -0,0 +1,156 @@
+# @AI-Generated
+"""
+音频上传转发：把已接收的 UploadFile（小文件在内存、大文件由框架暂存）分块读取，
+直接流式写入发往服务商的 multipart / 表单请求体，不落临时文件、不在内存中拼出完整副本；
+base64 按 3 字节对齐分块编码，单个请求的额外内存为固定大小的缓冲区
+"""
+import base64
+import io
+import os
+import re
+import secrets
+import wave
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import quote
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+SPEECH_MAX_UPLOAD_BYTES = int(os.getenv("SPEECH_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))   # 默认与 Whisper 上限一致
+AUDIO_STREAM_CHUNK = 48 * 1024   # 分块大小，为 3 的倍数，base64 分块之间无需补位
+
+class AudioTooLargeError(Exception):
+    """
+    上传音频超过大小限制
+    """
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"音频大小 {size} 字节超过上限 {limit} 字节")
+        self.size = size
+        self.limit = limit
+
+def upload_size(audio: UploadFile) -> int:
+    """
+    上传文件大小：优先用解析表单时记录的 size，否则定位到文件末尾获取
+    """
+    if audio.size is not None:
+        return audio.size
+    file = audio.file
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+def ensure_upload_size(audio: UploadFile, limit: int = SPEECH_MAX_UPLOAD_BYTES) -> int:
+    """
+    :return: 文件大小；超过上限抛出 AudioTooLargeError
+    """
+    size = upload_size(audio)
+    if size > limit:
+        raise AudioTooLargeError(size, limit)
+    return size
+
+async def iter_upload(audio: UploadFile, chunk_size: int = AUDIO_STREAM_CHUNK) -> AsyncIterator[bytes]:
+    """
+    从头分块读取上传文件；已暂存到磁盘的文件由框架在线程池中读取
+    """
+    await audio.seek(0)
+    while True:
+        chunk = await audio.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+async def iter_base64(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    分块 base64 编码，输出与整体编码结果一致；不足 3 字节的尾部留到下一块
+    """
+    pending = b''
+    async for chunk in chunks:
+        data = pending + chunk if pending else chunk
+        cut = len(data) - len(data) % 3
+        pending = data[cut:]
+        if cut:
+            yield base64.b64encode(data[:cut])
+    if pending:
+        yield base64.b64encode(pending)
+
+def _safe_filename(filename: Optional[str]) -> str:
+    # 文件名只用于 multipart 头，去掉路径和引号/换行，避免头注入
+    name = os.path.basename(filename or '') or 'audio'
+    return re.sub(r'["\r\n\\]', '_', name)
+
+def multipart_upload(
+    audio: UploadFile,
+    size: int,
+    field: str,
+    fields: Dict[str, str]
+) -> Tuple[Dict[str, str], AsyncIterator[bytes]]:
+    """
+    构造流式 multipart/form-data 请求体，长度可预先算出，带 Content-Length 而不是分块传输
+    :param size: 文件大小（ensure_upload_size 的返回值）
+    :param field: 文件字段名
+    :param fields: 其他文本字段
+    :return: (请求头, 请求体迭代器)
+    """
+    boundary = secrets.token_hex(16)
+    head = b''.join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    )
+    head += (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{_safe_filename(audio.filename)}"\r\n'
+        f'Content-Type: {audio.content_type or "application/octet-stream"}\r\n\r\n'
+    ).encode()
+    tail = f'\r\n--{boundary}--\r\n'.encode()
+
+    async def body() -> AsyncIterator[bytes]:
+        yield head
+        async for chunk in iter_upload(audio):
+            yield chunk
+        yield tail
+
+    headers = {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + size + len(tail)),
+    }
+    return headers, body()
+
+async def urlencoded_base64_upload(
+    audio: UploadFile,
+    field: str
+) -> Tuple[int, AsyncIterator[bytes]]:
+    """
+    构造流式 application/x-www-form-urlencoded 请求体 "<field>=<base64 后再 URL 编码的音频>"
+    base64 中的 + / = 需要百分号编码，长度与内容有关：先分块编码一遍只计长度，再生成请求体，
+    以便带 Content-Length（部分服务商不接受分块传输的表单）
+    :return: (请求体长度, 请求体迭代器)
+    """
+    prefix = f"{quote(field)}=".encode()
+    length = len(prefix)
+    async for encoded in iter_base64(iter_upload(audio)):
+        # 每个 + / = 编码为 3 个字符
+        length += len(encoded) + 2 * (encoded.count(b'+') + encoded.count(b'/') + encoded.count(b'='))
+
+    async def body() -> AsyncIterator[bytes]:
+        yield prefix
+        async for encoded in iter_base64(iter_upload(audio)):
+            yield quote(encoded, safe='').encode()
+
+    return length, body()
+
+def pcm_upload(pcm: bytes, sample_rate: int, container: str = "wav") -> UploadFile:
+    """
+    把 16 位单声道 PCM 包装成 UploadFile，供按上传文件接口实现的各服务商复用
+    :param container: wav（带 WAV 头，Whisper 等需要容器格式的服务商）或 raw（裸 PCM，Google LINEAR16 / 讯飞 raw）
+    """
+    if container == "wav":
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(sample_rate)
+            writer.writeframes(pcm)
+        data, filename, content_type = buffer.getvalue(), "audio.wav", "audio/wav"
+    else:
+        data, filename, content_type = pcm, "audio.pcm", "application/octet-stream"
+    return UploadFile(io.BytesIO(data), size=len(data), filename=filename, headers=Headers({"content-type": content_type}))
@@ -0,0 +1,275 @@
+# @AI-Generated
+"""
+多段批量翻译：文档/字幕等多行内容按 token 预算打包，一次服务商请求翻译多段
+chatgpt/deepseek/gemini 使用 JSON 模式（带编号的 JSON 数组进、JSON 对象出），huggingface 使用列表输入；
+回复按编号拆回原顺序，对不齐的段单独重新请求
+"""
+import asyncio
+import json
+import os
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from .http_client import get_client
+from .metrics import provider_call
+from .logger import get_logger
+from .ai_base import ProviderError
+from .circuit_breaker import provider_breakers
+from .translation_cache import translation_cache, make_cache_key
+from .llm_translation import (
+    translate_with_llm, _openai_error_message, HF_LANG_MAP, LANG_NAME_MAP, UNCACHEABLE_RESULTS
+)
+
+log = get_logger(__name__)
+T = TypeVar("T")
+
+BATCH_TOKEN_BUDGET = int(os.getenv("BATCH_TOKEN_BUDGET", "1500"))                # 每次请求打包的原文估算 token 上限
+BATCH_MAX_SEGMENTS_PER_CALL = int(os.getenv("BATCH_MAX_SEGMENTS_PER_CALL", "50"))
+BATCH_MAX_OUTPUT_TOKENS = int(os.getenv("BATCH_MAX_OUTPUT_TOKENS", "4096"))
+BATCH_REQUEST_TIMEOUT = float(os.getenv("BATCH_REQUEST_TIMEOUT", "60"))         # 秒
+# 各服务商同时进行的批量请求数（打包请求与逐段重试共用，所有批量翻译共享），"服务商=并发数"，逗号分隔
+BATCH_CONCURRENCY = os.getenv("BATCH_CONCURRENCY", "chatgpt=4,deepseek=4,gemini=4,huggingface=2")
+BATCH_DEFAULT_CONCURRENCY = 2
+
+# 每段在 JSON 数组中的结构开销（id、引号、逗号等）
+_SEGMENT_OVERHEAD_TOKENS = 8
+# 中日韩字符大约一字一 token，其余按 4 字符一 token 估算
+_CJK_CHAR_RE = re.compile(r'[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]')
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+def parse_concurrency(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        provider, value = item.split("=", 1)
+        limits[provider.strip()] = max(1, int(value))
+    return limits
+
+_limits = parse_concurrency(BATCH_CONCURRENCY)
+_slots: Dict[str, asyncio.Semaphore] = {}
+
+def provider_slots(provider: str) -> asyncio.Semaphore:
+    if provider not in _slots:
+        _slots[provider] = asyncio.Semaphore(_limits.get(provider, BATCH_DEFAULT_CONCURRENCY))
+    return _slots[provider]
+
+async def _limited(provider: str, call: Callable[[], Awaitable[T]]) -> T:
+    # 拿到名额后才创建协程，排队中被取消时不会留下未执行的协程
+    async with provider_slots(provider):
+        return await call()
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算 token 数（不依赖分词器）
+    """
+    cjk = len(_CJK_CHAR_RE.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+def pack_segments(segments: List[str], token_budget: int = BATCH_TOKEN_BUDGET, max_segments: int = BATCH_MAX_SEGMENTS_PER_CALL) -> List[List[str]]:
+    """
+    按顺序贪心打包，每包估算 token 不超过预算；单段超出预算时独占一包
+    """
+    packs: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for segment in segments:
+        cost = estimate_tokens(segment) + _SEGMENT_OVERHEAD_TOKENS
+        if current and (used + cost > token_budget or len(current) >= max_segments):
+            packs.append(current)
+            current, used = [], 0
+        current.append(segment)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+def _batch_prompt(source_language: str, target_language: str) -> str:
+    source_lang = LANG_NAME_MAP.get(source_language, source_language)
+    target_lang = LANG_NAME_MAP.get(target_language, target_language)
+    return (
+        f"你是一个专业的{source_lang}到{target_lang}翻译引擎。输入是 JSON 数组，每项包含 id 和 text。"
+        f"逐项将 text 翻译为{target_lang}，输出 JSON 对象 {{\"translations\": [{{\"id\": 编号, \"text\": \"译文\"}}]}}。"
+        "保持 id 不变、条目数量与输入一致，不要合并或拆分条目，不要添加任何解释。"
+    )
+
+def _build_batch_request(provider: str, pack: List[str], source_language: str, target_language: str, api_key: str) -> Tuple[str, str, dict, dict]:
+    """
+    :return: (连接池主机, url, headers, payload)
+    """
+    system = _batch_prompt(source_language, target_language)
+    items = json.dumps([{"id": i, "text": text} for i, text in enumerate(pack, 1)], ensure_ascii=False)
+    if provider in ("chatgpt", "deepseek"):
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        payload = {
+            "model": "gpt-4o-mini" if provider == "chatgpt" else "deepseek-chat",
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": items}
+            ],
+            "temperature": 0.3,
+            "max_tokens": BATCH_MAX_OUTPUT_TOKENS,
+            "response_format": {"type": "json_object"}
+        }
+        if provider == "chatgpt":
+            return "openai", "https://api.openai.com/v1/chat/completions", headers, payload
+        return "deepseek", "https://api.deepseek.com/v1/chat/completions", headers, payload
+    if provider == "gemini":
+        api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro:generateContent?key={api_key}"
+        payload = {
+            "contents": [{"parts": [{"text": f"{system}\n\n{items}"}]}],
+            "generationConfig": {
+                "temperature": 0.2,
+                "maxOutputTokens": BATCH_MAX_OUTPUT_TOKENS,
+                "responseMimeType": "application/json"
+            }
+        }
+        return "gemini", api_url, {"Content-Type": "application/json"}, payload
+    raise ValueError(f"不支持的LLM提供者: {provider}")
+
+def parse_batch_reply(content: str, count: int) -> Dict[int, str]:
+    """
+    解析 JSON 回复，返回 {编号: 译文}；无法解析、编号越界或译文为空的条目不计入
+    """
+    try:
+        data = json.loads(_CODE_FENCE_RE.sub('', content.strip()))
+    except ValueError:
+        return {}
+    if isinstance(data, dict):
+        data = data.get("translations", [])
+    if not isinstance(data, list):
+        return {}
+    aligned = {}
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        text = item.get("text")
+        if 1 <= index <= count and isinstance(text, str) and text.strip():
+            aligned[index] = text.strip()
+    return aligned
+
+async def _translate_pack(provider: str, pack: List[str], source_language: str, target_language: str, api_key: str) -> Dict[int, str]:
+    with provider_breakers.guard(provider, api_key):
+        if provider == "huggingface":
+            return await _translate_pack_huggingface(pack, source_language, target_language, api_key)
+        return await _translate_pack_llm(provider, pack, source_language, target_language, api_key)
+
+async def _translate_pack_llm(provider: str, pack: List[str], source_language: str, target_language: str, api_key: str) -> Dict[int, str]:
+    host, api_url, headers, payload = _build_batch_request(provider, pack, source_language, target_language, api_key)
+    with provider_call(provider, "translate_batch") as call:
+        resp = await get_client(host).post(api_url, json=payload, headers=headers, timeout=BATCH_REQUEST_TIMEOUT)
+        call.status = resp.status_code
+    log.debug("provider_call", provider=provider, endpoint="batch", segments=len(pack), duration_ms=round(call.duration * 1000))
+    if not resp.is_success:
+        if provider == "gemini":
+            raise ProviderError(f"Gemini API错误: {resp.status_code}", resp.status_code)
+        name = "ChatGPT" if provider == "chatgpt" else "DeepSeek"
+        raise ProviderError(f"{name} API错误: {_openai_error_message(resp)}", resp.status_code)
+    data = resp.json()
+    try:
+        if provider == "gemini":
+            content = data["candidates"][0]["content"]["parts"][0]["text"]
+        else:
+            content = data["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return {}
+    return parse_batch_reply(content, len(pack))
+
+async def _translate_pack_huggingface(pack: List[str], source_language: str, target_language: str, api_key: str) -> Dict[int, str]:
+    api_url = "https://api-inference.huggingface.co/models/facebook/mbart-large-50-many-to-many-mmt"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    payload = {
+        "inputs": pack,
+        "parameters": {"src_lang": HF_LANG_MAP[source_language], "tgt_lang": HF_LANG_MAP[target_language]}
+    }
+    with provider_call("huggingface", "translate_batch") as call:
+        resp = await get_client("huggingface").post(api_url, json=payload, headers=headers, timeout=BATCH_REQUEST_TIMEOUT)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="huggingface", endpoint="mbart-large-50", segments=len(pack), duration_ms=round(call.duration * 1000))
+    if not resp.is_success:
+        raise ProviderError(f"HuggingFace API错误: {resp.status_code}", resp.status_code)
+    result = resp.json()
+    # 列表输入按顺序返回等长列表，长度不一致时无法对齐
+    if not isinstance(result, list) or len(result) != len(pack):
+        return {}
+    aligned = {}
+    for index, item in enumerate(result, 1):
+        text = item.get("translation_text") if isinstance(item, dict) else None
+        if isinstance(text, str) and text.strip():
+            aligned[index] = text.strip()
+    return aligned
+
+async def translate_batch(
+    segments: List[str],
+    source_language: str,
+    target_language: str,
+    api_key: str,
+    provider: str
+) -> Tuple[List[str], Dict[str, int]]:
+    """
+    批量翻译多段文本，结果与输入一一对应、顺序一致
+    空白段原样返回；重复段只翻译一次；已缓存的段不再请求，新译文逐段写入翻译缓存
+    :return: (译文列表, 统计 {segments, cached, provider_calls, realigned})
+    """
+    if provider not in ("chatgpt", "deepseek", "gemini", "huggingface"):
+        raise ValueError(f"不支持的LLM提供者: {provider}")
+    results: List[Optional[str]] = [None] * len(segments)
+    stats = {"segments": len(segments), "cached": 0, "provider_calls": 0, "realigned": 0}
+    positions: Dict[str, List[int]] = {}
+    for i, segment in enumerate(segments):
+        if segment.strip():
+            positions.setdefault(segment, []).append(i)
+        else:
+            results[i] = segment
+
+    def fill(segment: str, text: str):
+        for i in positions[segment]:
+            results[i] = text
+
+    if provider == "huggingface" and (source_language not in HF_LANG_MAP or target_language not in HF_LANG_MAP):
+        for segment in positions:
+            fill(segment, "不支持的语言组合")
+        return results, stats
+
+    uncached = []
+    for segment in positions:
+        cached = await translation_cache.get(make_cache_key(segment, source_language, target_language, provider))
+        if cached is not None:
+            fill(segment, cached)
+            stats["cached"] += len(positions[segment])
+        else:
+            uncached.append(segment)
+
+    packs = pack_segments(uncached)
+    # 服务商报错直接抛出；只有回复对不齐的段才逐段重试；同时在途的请求数受 BATCH_CONCURRENCY 限制
+    replies = await asyncio.gather(*(
+        _limited(provider, lambda pack=pack: _translate_pack(provider, pack, source_language, target_language, api_key))
+        for pack in packs
+    ))
+    stats["provider_calls"] = len(packs)
+
+    misaligned = []
+    for pack, aligned in zip(packs, replies):
+        for index, segment in enumerate(pack, 1):
+            text = aligned.get(index)
+            if text is None:
+                misaligned.append(segment)
+                continue
+            fill(segment, text)
+            if text not in UNCACHEABLE_RESULTS:
+                await translation_cache.set(make_cache_key(segment, source_language, target_language, provider), text)
+
+    if misaligned:
+        log.info("batch_realign", provider=provider, segments=len(misaligned))
+        stats["realigned"] = len(misaligned)
+        stats["provider_calls"] += len(misaligned)
+        singles = await asyncio.gather(*(
+            _limited(provider, lambda segment=segment: translate_with_llm(segment, source_language, target_language, api_key, provider))
+            for segment in misaligned
+        ))
+        for segment, text in zip(misaligned, singles):
+            fill(segment, text)
+    return results, stats
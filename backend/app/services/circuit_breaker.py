@@ -0,0 +1,189 @@
+# @AI-Generated
+"""
+服务商熔断器：按 (服务商, API Key 指纹) 维护 closed/open/half-open 状态
+最近窗口内错误率超过阈值即熔断，熔断期间直接快速失败；认证失败（401/403）立即熔断一段时间（负缓存），
+到期后放行一个探测请求，成功则恢复
+"""
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import httpx
+from .ai_base import ProviderError
+from .singleflight import key_fingerprint
+
+BREAKER_WINDOW_SIZE = int(os.getenv("BREAKER_WINDOW_SIZE", "20"))               # 统计错误率的最近请求数
+BREAKER_MIN_REQUESTS = int(os.getenv("BREAKER_MIN_REQUESTS", "5"))              # 窗口内请求数达到后才判断错误率
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))              # 错误率阈值
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))           # 熔断持续时间
+BREAKER_AUTH_NEGATIVE_TTL = float(os.getenv("BREAKER_AUTH_NEGATIVE_TTL", "60"))  # 认证失败负缓存时间
+BREAKER_MAX_ENTRIES = int(os.getenv("BREAKER_MAX_ENTRIES", "10000"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """
+    熔断期间快速失败
+    """
+    def __init__(self, provider: str, retry_after: float, reason: str):
+        if reason == "auth":
+            message = f"{provider} API Key 认证失败，{retry_after:.0f} 秒内不再重试"
+        else:
+            message = f"{provider} 服务暂不可用（已熔断），{retry_after:.0f} 秒后重试"
+        super().__init__(message)
+        self.provider = provider
+        self.retry_after = retry_after
+        self.reason = reason
+
+class CircuitBreaker:
+    """
+    单个 (服务商, Key) 的熔断状态
+    """
+    __slots__ = ('state', '_outcomes', '_failures', 'open_until', 'reason', 'probing', 'opened', 'rejected')
+
+    def __init__(self):
+        self.state = CLOSED
+        self._outcomes = deque()   # 最近请求结果，True 为失败
+        self._failures = 0
+        self.open_until = 0.0
+        self.reason = ''
+        self.probing = False
+        self.opened = 0            # 累计熔断次数
+        self.rejected = 0          # 累计快速失败次数
+
+    def allow(self, now: float) -> bool:
+        if self.state == OPEN:
+            if now < self.open_until:
+                return False
+            self.state = HALF_OPEN
+            self.probing = False
+        if self.state == HALF_OPEN:
+            # 半开状态只放行一个探测请求
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def on_success(self):
+        if self.state == HALF_OPEN:
+            self._reset()
+            return
+        self._push(False)
+
+    def on_failure(self, now: float, auth: bool = False):
+        if auth:
+            self._trip(now, BREAKER_AUTH_NEGATIVE_TTL, "auth")
+        elif self.state == HALF_OPEN:
+            self._trip(now, BREAKER_OPEN_SECONDS, "probe_failed")
+        else:
+            self._push(True)
+            if len(self._outcomes) >= BREAKER_MIN_REQUESTS and self._failures / len(self._outcomes) >= BREAKER_ERROR_RATE:
+                self._trip(now, BREAKER_OPEN_SECONDS, "error_rate")
+
+    def on_neutral(self):
+        # 取消或与服务商健康无关的错误：不计入，只释放探测名额
+        self.probing = False
+
+    def error_rate(self) -> float:
+        return self._failures / len(self._outcomes) if self._outcomes else 0.0
+
+    def _push(self, failed: bool):
+        self._outcomes.append(failed)
+        self._failures += failed
+        if len(self._outcomes) > BREAKER_WINDOW_SIZE:
+            self._failures -= self._outcomes.popleft()
+
+    def _trip(self, now: float, seconds: float, reason: str):
+        self.state = OPEN
+        self.open_until = now + seconds
+        self.reason = reason
+        self.probing = False
+        self.opened += 1
+
+    def _reset(self):
+        self.state = CLOSED
+        self._outcomes.clear()
+        self._failures = 0
+        self.reason = ''
+        self.probing = False
+
+class BreakerRegistry:
+    """
+    熔断器注册表，超出上限时按 LRU 淘汰
+    """
+    def __init__(self, max_entries: int = BREAKER_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._breakers: "OrderedDict[str, CircuitBreaker]" = OrderedDict()
+        self.rejected = 0
+
+    @staticmethod
+    def make_key(provider: str, api_key: str) -> str:
+        return f"{provider}:{key_fingerprint(api_key)}"
+
+    def get(self, provider: str, api_key: str) -> CircuitBreaker:
+        key = self.make_key(provider, api_key)
+        breaker = self._breakers.pop(key, None)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            while len(self._breakers) >= self.max_entries:
+                self._breakers.popitem(last=False)
+        self._breakers[key] = breaker
+        return breaker
+
+    def is_open(self, provider: str, api_key: str) -> bool:
+        """
+        是否处于熔断期（不改变状态，供路由跳过）
+        """
+        breaker = self._breakers.get(self.make_key(provider, api_key))
+        return breaker is not None and breaker.state == OPEN and time.monotonic() < breaker.open_until
+
+    @contextmanager
+    def guard(self, provider: str, api_key: str) -> Iterator[None]:
+        """
+        包裹一次服务商调用：熔断中抛出 CircuitOpenError，否则按调用结果更新状态
+        """
+        breaker = self.get(provider, api_key)
+        now = time.monotonic()
+        if not breaker.allow(now):
+            breaker.rejected += 1
+            self.rejected += 1
+            raise CircuitOpenError(provider, max(breaker.open_until - now, 1.0), breaker.reason)
+        try:
+            yield
+        except ProviderError as e:
+            if e.is_auth_error:
+                breaker.on_failure(time.monotonic(), auth=True)
+            elif e.status_code == 429 or e.status_code >= 500:
+                breaker.on_failure(time.monotonic())
+            else:
+                breaker.on_neutral()
+            raise
+        except (httpx.TimeoutException, httpx.TransportError):
+            breaker.on_failure(time.monotonic())
+            raise
+        except BaseException:
+            breaker.on_neutral()
+            raise
+        else:
+            breaker.on_success()
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        breakers = {}
+        for key, breaker in self._breakers.items():
+            if breaker.state == CLOSED and not breaker.opened and not breaker.error_rate():
+                continue
+            breakers[key] = {
+                "state": breaker.state,
+                "reason": breaker.reason,
+                "error_rate": round(breaker.error_rate(), 3),
+                "retry_after": round(max(breaker.open_until - now, 0.0), 1) if breaker.state == OPEN else 0,
+                "opened": breaker.opened,
+                "rejected": breaker.rejected,
+            }
+        return {"tracked": len(self._breakers), "rejected": self.rejected, "breakers": breakers}
+
+provider_breakers = BreakerRegistry()
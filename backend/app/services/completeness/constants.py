@@ -2,6 +2,7 @@
 """
 completeness 检测相关常量
 """
+import os
 
 # 句子结束标点
 SENTENCE_ENDING_PUNCTUATION = {
@@ -40,4 +41,13 @@ CHINESE_CONJUNCTIONS = [
     '因为', '由于', '所以', '因此', '如果', '假如', '除非', '虽然',
     '尽管', '即使', '无论', '不管', '还是', '或者', '的', '地', '得',
     '了', '着', '过'
-] 
\ No newline at end of file
+] 
+
+# 中文句尾连接词（规则检测用），句子以这些词结尾视为不完整
+CHINESE_ENDING_CONJUNCTIONS = [
+    '和', '或', '但', '因为', '所以', '如果', '但是', '而且', '并且', '虽然', '然而', '而', '且', '及', '与', '并', '而是'
+]
+
+# 完整性级联阈值：本地规则置信度 >= ACCEPT 直接判完整，<= REJECT 直接判不完整，之间交给 LLM
+COMPLETENESS_LOCAL_ACCEPT = float(os.getenv("COMPLETENESS_LOCAL_ACCEPT", "0.9"))
+COMPLETENESS_LOCAL_REJECT = float(os.getenv("COMPLETENESS_LOCAL_REJECT", "0.1"))
@@ -0,0 +1,213 @@
+# @AI-Generated
+"""
+增量完整性检测器：按键追加/退格时只处理变化的字符，维护引号括号计数、分词状态、
+文字类型标记等规则特征，评分复用 rule_scanner，结果与整段重扫完全一致
+"""
+from typing import List, Optional
+from .rule_scanner import (
+    TAIL_LENGTH, is_word_char, is_verb_token,
+    english_score_features, chinese_score_features, local_score_features
+)
+
+_INPUT_PUNCT = frozenset('.?!,;:')
+_CJK_OPEN = frozenset('「『（')
+_CJK_CLOSE = frozenset('」』）')
+
+def _is_latin(c: str) -> bool:
+    return 'a' <= c <= 'z' or 'A' <= c <= 'Z'
+
+def _is_cjk(c: str) -> bool:
+    return '\u4e00' <= c <= '\u9fa5'
+
+class IncrementalCompleteness:
+    """
+    单个输入框的增量特征状态，特征接口与 rule_scanner.TextFeatures 一致
+    """
+    __slots__ = (
+        'text', '_quotes', '_open_paren', '_close_paren', '_cjk_open', '_cjk_close',
+        '_input_punct', '_latin', '_cjk', '_word_count', '_first_non_space',
+        '_tokens', '_closed_verb_count'
+    )
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.text = ''
+        self._quotes = 0
+        self._open_paren = 0
+        self._close_paren = 0
+        self._cjk_open = 0
+        self._cjk_close = 0
+        self._input_punct = 0
+        self._latin = 0
+        self._cjk = 0
+        self._word_count = 0                      # 空白分隔的词数
+        self._first_non_space: Optional[int] = None
+        # \w 连续片段 [起点, 终点)，只有最后一个片段会继续变化
+        self._tokens: List[List[int]] = []
+        self._closed_verb_count = 0               # 除最后一个片段外命中谓语规则的片段数
+
+    # ---- 输入变化 ----
+
+    def update(self, new_text: str):
+        """
+        用最新的完整输入更新状态：追加只处理新增字符，删除只回退被删字符，
+        中间编辑则回退到分歧点后重新追加
+        """
+        old = self.text
+        if new_text.startswith(old):
+            self.append(new_text[len(old):])
+        elif old.startswith(new_text):
+            self.backspace(len(old) - len(new_text))
+        else:
+            common = 0
+            limit = min(len(old), len(new_text))
+            while common < limit and old[common] == new_text[common]:
+                common += 1
+            self.backspace(len(old) - common)
+            self.append(new_text[common:])
+
+    def append(self, chars: str):
+        if not chars:
+            return
+        base = pos = len(self.text)
+        prev = self.text[-1] if self.text else None
+        for c in chars:
+            self._count(c, 1)
+            if not c.isspace():
+                if prev is None or prev.isspace():
+                    self._word_count += 1
+                if self._first_non_space is None:
+                    self._first_non_space = pos
+            if is_word_char(c):
+                tokens = self._tokens
+                if tokens and tokens[-1][1] == pos:
+                    tokens[-1][1] = pos + 1
+                else:
+                    if tokens:
+                        self._closed_verb_count += self._token_is_verb(tokens[-1], chars, base)
+                    tokens.append([pos, pos + 1])
+            prev = c
+            pos += 1
+        self.text += chars
+
+    def backspace(self, count: int = 1):
+        text = self.text
+        count = min(count, len(text))
+        for i in range(len(text) - 1, len(text) - 1 - count, -1):
+            c = text[i]
+            self._count(c, -1)
+            if not c.isspace():
+                if i == 0 or text[i - 1].isspace():
+                    self._word_count -= 1
+                if self._first_non_space == i:
+                    self._first_non_space = None
+            if is_word_char(c):
+                tokens = self._tokens
+                tokens[-1][1] -= 1
+                if tokens[-1][1] == tokens[-1][0]:
+                    tokens.pop()
+                    if tokens:
+                        # 前一个片段重新成为最后一个片段，移出已封闭计数
+                        self._closed_verb_count -= self._token_is_verb(tokens[-1], '', len(text))
+        if count > 0:
+            self.text = text[:len(text) - count]
+
+    def _token_is_verb(self, token: List[int], pending: str, pending_start: int) -> bool:
+        # 片段可能部分位于尚未拼入 self.text 的 pending 中
+        start, end = token
+        text = self.text
+        if end <= len(text):
+            piece = text[start:end]
+        else:
+            piece = text[start:] + pending[max(start - pending_start, 0):end - pending_start]
+        return is_verb_token(piece)
+
+    def _count(self, c: str, delta: int):
+        if c == '"':
+            self._quotes += delta
+        elif c == '(':
+            self._open_paren += delta
+        elif c == ')':
+            self._close_paren += delta
+        elif c in _CJK_OPEN:
+            self._cjk_open += delta
+        elif c in _CJK_CLOSE:
+            self._cjk_close += delta
+        if c in _INPUT_PUNCT:
+            self._input_punct += delta
+        if _is_latin(c):
+            self._latin += delta
+        elif _is_cjk(c):
+            self._cjk += delta
+
+    # ---- 特征接口（与 TextFeatures 一致） ----
+
+    def _trimmed_end(self) -> int:
+        text = self.text
+        end = len(text)
+        while end > 0 and text[end - 1].isspace():
+            end -= 1
+        return end
+
+    @property
+    def length(self) -> int:
+        return len(self.text)
+
+    @property
+    def trimmed_len(self) -> int:
+        if self._first_non_space is None:
+            return 0
+        return self._trimmed_end() - self._first_non_space
+
+    @property
+    def tail(self) -> str:
+        if self._first_non_space is None:
+            return ''
+        end = self._trimmed_end()
+        return self.text[max(self._first_non_space, end - TAIL_LENGTH):end]
+
+    def last_word(self) -> str:
+        text = self.text
+        end = self._trimmed_end()
+        start = end
+        while start > 0 and not text[start - 1].isspace():
+            start -= 1
+        return text[start:end]
+
+    def word_count(self) -> int:
+        return self._word_count
+
+    def has_verb(self) -> bool:
+        if self._closed_verb_count > 0:
+            return True
+        return bool(self._tokens) and self._token_is_verb(self._tokens[-1], '', len(self.text))
+
+    def has_input_punct(self) -> bool:
+        return self._input_punct > 0
+
+    def unclosed_ascii(self) -> bool:
+        return self._quotes % 2 != 0 or self._open_paren != self._close_paren
+
+    def unclosed_cjk(self) -> bool:
+        return self._cjk_open != self._cjk_close
+
+    @property
+    def has_latin(self) -> bool:
+        return self._latin > 0
+
+    @property
+    def has_cjk(self) -> bool:
+        return self._cjk > 0
+
+    # ---- 评分 ----
+
+    def english_score(self) -> float:
+        return english_score_features(self)
+
+    def chinese_score(self) -> float:
+        return chinese_score_features(self)
+
+    def local_score(self, language_code: str) -> float:
+        return local_score_features(self, language_code)
@@ -1,84 +1,76 @@
 # @AI-Generated
 """
-输入检测器
+输入检测器：本地规则优先的级联判定，只有模糊的输入才交给 LLM
 """
-from .constants import INCOMPLETE_ENDING_CHARS
-from .chinese_detector import is_chinese_sentence_complete
-from .english_detector import is_english_sentence_complete
+from .constants import COMPLETENESS_LOCAL_ACCEPT, COMPLETENESS_LOCAL_REJECT
+from .rule_scanner import local_score, local_score_features
 from .llm_detector import is_sentence_complete_by_llm, is_translatable_word
-import re
+from app.services.tracing import span
+from typing import Dict
+import asyncio
 
-async def is_input_complete(text: str, language_code: str, llm_api_key: str = None, context: str = None, provider: str = None) -> bool:
+# 各阶段判定次数
+cascade_stats: Dict[str, int] = {
+    "local_accept": 0,   # 本地规则高置信判完整
+    "local_reject": 0,   # 本地规则高置信判不完整
+    "llm_accept": 0,     # 模糊输入由 LLM 判完整
+    "llm_fallback": 0,   # 模糊输入 LLM 未判完整，回落本地规则
+    "rules_only": 0,     # 模糊输入且无 API Key，直接用本地规则
+}
+
+def local_completeness_score(text: str, language_code: str) -> float:
+    """
+    本地规则完整度评分（0~1），>= 0.5 表示规则判定完整
+    过短的输入、疑似可直接翻译的短词为模糊分，交给 LLM；未闭合括号引号、不完整结尾字符为低分；
+    中文/英文走各自检测器，其他语言以句末标点或长度判断
+    :param text: 用户输入的文本
+    :param language_code: 当前输入语言代码
+    """
+    return local_score(text, language_code)
+
+async def _llm_says_complete(text: str, llm_api_key: str, context: str, provider: str) -> bool:
+    """
+    可翻译词汇检测与完整句检测并发执行，任一为 True 即视为完整
+    """
+    results = await asyncio.gather(
+        is_translatable_word(text, llm_api_key, context, provider),
+        is_sentence_complete_by_llm(text, llm_api_key, context, provider),
+        return_exceptions=True
+    )
+    return any(r is True for r in results)
+
+async def is_input_complete(text: str, language_code: str, llm_api_key: str = None, context: str = None, provider: str = None, features=None) -> bool:
     """
     智能检测文本输入是否看起来已经完整，支持多语言和上下文
+    明确的情况由本地规则直接判定，只有模糊输入才调用 LLM
     :param text: 用户输入的文本
     :param language_code: 当前输入语言代码
     :param llm_api_key: 可选的LLM API密钥
     :param context: 上下文（可选）
     :param provider: LLM 服务商（如 deepseek、chatgpt 等，可选）
+    :param features: 可选，已维护好的文本特征（如 IncrementalCompleteness），提供时不再重扫全文
     :return: 布尔值表示文本是否可能完整
     """
-    # 优先用 LLM 检查是否为可直接翻译的表达（词/短语/句子），支持上下文
-    if llm_api_key:
-        try:
-            is_word = await is_translatable_word(text, llm_api_key, context, provider)
-            if is_word:
-                return True
-        except Exception:
-            pass  # LLM 检查异常时降级为本地规则
-    # 本地规则兜底
-    if not text or len(text.strip()) <= 2:
-        return False
-    trimmed = text.strip()
-    last_char = trimmed[-1]
-    if last_char in INCOMPLETE_ENDING_CHARS:
-        return False
-    if trimmed.endswith(' ') or re.search(r'[a-z][A-Z]$', trimmed):
-        return False
-    open_quotes = len(re.findall(r'"', trimmed))
-    open_parentheses = len(re.findall(r'\(', trimmed))
-    close_parentheses = len(re.findall(r'\)', trimmed))
-    if (open_quotes % 2 != 0) or (open_parentheses != close_parentheses):
-        return False
-    if llm_api_key:
-        try:
-            llm_result = await is_sentence_complete_by_llm(text, llm_api_key, context, provider)
-            if llm_result:
-                return True
-        except Exception:
-            pass
-    # 语言分支
-    if language_code == 'zh':
-        return is_chinese_sentence_complete(text)
-    elif language_code == 'en':
-        result = is_english_sentence_complete(text)
-        common_incomplete_endings = [
-            'to ', 'and ', 'or ', 'the ', 'a ', 'an ', 'in ', 'on ', 'at ', 'with ', 'by ', 'as ',
-            'for ', 'from ', 'of ', 'about ', 'than '
-        ]
-        if any(trimmed.endswith(e.strip()) for e in common_incomplete_endings):
-            return False
-        words = trimmed.split()
-        if len(words) <= 3 and not re.search(r'[.?!,;:]', trimmed):
-            return False
-        return result
-    elif language_code in ['ja', 'ko', 'de', 'fr', 'es', 'it', 'ru', 'pt', 'vi', 'th']:
-        # 日语、韩语、德语、法语、西班牙语、意大利语、俄语、葡萄牙语、越南语、泰语等
-        # 规则：长度大于等于4，或以常见句末标点结尾
-        ending_punct = '。！？.!?;；'  # 兼容中西标点
-        if len(trimmed) >= 4:
-            return True
-        if trimmed[-1] in ending_punct:
-            return True
-        # 允许 1~4 字母/字符的短词
-        if 1 <= len(trimmed) <= 4 and re.fullmatch(r'\w+', trimmed):
-            return True
-        return False
+    with span("completeness.input", language=language_code) as current:
+        stage, complete = await _cascade(text, language_code, llm_api_key, context, provider, features)
+        cascade_stats[stage] += 1
+        current.set("stage", stage)
+        return complete
+
+async def _cascade(text: str, language_code: str, llm_api_key: str, context: str, provider: str, features) -> tuple:
+    """
+    :return: (判定阶段, 是否完整)，阶段名与 cascade_stats 的键一致
+    """
+    if features is not None:
+        score = local_score_features(features, language_code)
     else:
-        # 其他未知语言，兜底：长度大于等于4或以标点结尾
-        ending_punct = '。！？.!?;；'
-        if len(trimmed) >= 4:
-            return True
-        if trimmed[-1] in ending_punct:
-            return True
-        return False 
\ No newline at end of file
+        score = local_completeness_score(text, language_code)
+    if score >= COMPLETENESS_LOCAL_ACCEPT:
+        return "local_accept", True
+    if score <= COMPLETENESS_LOCAL_REJECT:
+        return "local_reject", False
+    if llm_api_key:
+        if await _llm_says_complete(text, llm_api_key, context, provider):
+            return "llm_accept", True
+        return "llm_fallback", score >= 0.5
+    return "rules_only", score >= 0.5
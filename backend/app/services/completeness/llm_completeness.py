@@ -2,19 +2,32 @@
 """
 大模型语句完整性分析服务
 """
-import httpx
-from app.services.ai_base import Optional
+from app.services.http_client import get_client
+from app.services.metrics import provider_call
+from app.services.logger import get_logger
+from app.services.singleflight import provider_flight, key_fingerprint
+from app.services.ai_base import Optional, ProviderError
+from app.services.circuit_breaker import provider_breakers
 from typing import Tuple
-import time
+
+log = get_logger(__name__)
 
 async def analyze_sentence_completeness_with_llm(text: str, api_key: str, provider: str) -> Tuple[bool, str]:
     """
-    调用大模型API分析语句是否为完整句
+    调用大模型API分析语句是否为完整句，相同的进行中请求合并为一次上游调用
     :param text: 需要分析的语句
     :param api_key: 大模型API密钥
     :param provider: 大模型服务商
     :return: (是否完整, 分析理由或原文)
     """
+    flight_key = "\x1f".join(("analyze", provider, key_fingerprint(api_key), text))
+    return await provider_flight.do(flight_key, lambda: _analyze(text, api_key, provider))
+
+async def _analyze(text: str, api_key: str, provider: str) -> Tuple[bool, str]:
+    with provider_breakers.guard(provider, api_key):
+        return await _dispatch_analyze(text, api_key, provider)
+
+async def _dispatch_analyze(text: str, api_key: str, provider: str) -> Tuple[bool, str]:
     if provider == "chatgpt":
         return await _analyze_with_chatgpt(text, api_key)
     elif provider == "gemini":
@@ -39,18 +52,17 @@ async def _analyze_with_chatgpt(text: str, api_key: str):
         "temperature": 0.2,
         "max_tokens": 256
     }
-    start = time.time()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers, timeout=30)
-    duration = time.time() - start
-    print(f"[LLM耗时] provider=chatgpt, 接口=chat_completions, 耗时: {duration:.2f}秒")
+    with provider_call("chatgpt", "completeness") as call:
+        resp = await get_client("openai").post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers, timeout=30)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="chatgpt", endpoint="chat_completions", duration_ms=round(call.duration * 1000))
     if not resp.is_success:
         try:
             err = resp.json()
             msg = err.get("error", {}).get("message", "API错误")
         except Exception:
             msg = "API错误"
-        raise Exception(f"ChatGPT API错误: {msg}")
+        raise ProviderError(f"ChatGPT API错误: {msg}", resp.status_code)
     data = resp.json()
     content = data["choices"][0]["message"]["content"].strip().lower()
     if content.startswith("true"):
@@ -69,13 +81,12 @@ async def _analyze_with_gemini(text: str, api_key: str):
         "contents": [{"parts": [{"text": prompt}]}],
         "generationConfig": {"temperature": 0.2, "maxOutputTokens": 256}
     }
-    start = time.time()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(api_url, json=payload, headers=headers, timeout=30)
-    duration = time.time() - start
-    print(f"[LLM耗时] provider=gemini, 接口=generateContent, 耗时: {duration:.2f}秒")
+    with provider_call("gemini", "completeness") as call:
+        resp = await get_client("gemini").post(api_url, json=payload, headers=headers, timeout=30)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="gemini", endpoint="generateContent", duration_ms=round(call.duration * 1000))
     if not resp.is_success:
-        raise Exception(f"Gemini API错误: {resp.status_code}")
+        raise ProviderError(f"Gemini API错误: {resp.status_code}", resp.status_code)
     result = resp.json()
     content = result["candidates"][0]["content"]["parts"][0]["text"].strip().lower()
     if content.startswith("true"):
@@ -99,18 +110,17 @@ async def _analyze_with_deepseek(text: str, api_key: str):
         "temperature": 0.2,
         "max_tokens": 256
     }
-    start = time.time()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(api_url, json=payload, headers=headers, timeout=30)
-    duration = time.time() - start
-    print(f"[LLM耗时] provider=deepseek, 接口=chat_completions, 耗时: {duration:.2f}秒")
+    with provider_call("deepseek", "completeness") as call:
+        resp = await get_client("deepseek").post(api_url, json=payload, headers=headers, timeout=30)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="deepseek", endpoint="chat_completions", duration_ms=round(call.duration * 1000))
     if not resp.is_success:
         try:
             err = resp.json()
             msg = err.get("error", {}).get("message", "API错误")
         except Exception:
             msg = "API错误"
-        raise Exception(f"DeepSeek API错误: {msg}")
+        raise ProviderError(f"DeepSeek API错误: {msg}", resp.status_code)
     result = resp.json()
     content = result["choices"][0]["message"]["content"].strip().lower()
     if content.startswith("true"):
@@ -2,8 +2,17 @@
 """
 LLM 检测器
 """
-import httpx
-import time
+from app.services.http_client import get_client
+from app.services.metrics import provider_call
+from app.services.logger import get_logger
+from app.services.singleflight import provider_flight, key_fingerprint
+from app.services.ai_base import ProviderError
+from app.services.circuit_breaker import provider_breakers
+from app.services.tracing import span
+from .verdict_cache import verdict_cache, ends_with_conjunction
+import asyncio
+
+log = get_logger(__name__)
 
 async def is_sentence_complete_by_llm(text: str, api_key: str, context: str = None, provider: str = None) -> bool:
     """
@@ -62,27 +71,8 @@ async def is_sentence_complete_by_llm(text: str, api_key: str, context: str = No
                 f"Sentence: {text}\n"
                 "Return only true or false, no other explanation."
             )
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    payload = {
-        "model": "gpt-3.5-turbo",
-        "messages": [
-            {"role": "system", "content": "You are a sentence completeness checker. Return only true or false, no other explanation."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.1,
-        "max_tokens": 10
-    }
-    try:
-        start = time.time()
-        async with httpx.AsyncClient() as client:
-            resp = await client.post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers, timeout=15)
-        duration = time.time() - start
-        print(f"[LLM耗时] provider={{provider or 'openai'}}, 接口=chat_completions, 耗时: {{duration:.2f}}秒")
-        data = resp.json()
-        result = data["choices"][0]["message"]["content"].strip().lower()
-        return result == 'true'
-    except Exception:
-        return False
+    system = "You are a sentence completeness checker. Return only true or false, no other explanation."
+    return await _llm_verdict("sentence_complete", text, context, api_key, provider, system, prompt)
 
 async def is_translatable_word(text: str, api_key: str, context: str = None, provider: str = None) -> bool:
     """
@@ -119,24 +109,56 @@ async def is_translatable_word(text: str, api_key: str, context: str = None, pro
             prompt = (
                 "Please determine if the following input is a standalone word or phrase that can be directly translated (not a sentence, not a fragment, not gibberish). Return only true or false.\nInput: " + text
             )
+    system = "You are a translation assistant. Return only true or false, no other explanation."
+    return await _llm_verdict("translatable_word", text, context, api_key, provider, system, prompt)
+
+async def _llm_verdict(check: str, text: str, context: str, api_key: str, provider: str, system: str, prompt: str) -> bool:
+    """
+    发起 true/false 判定请求：先查判定缓存，相同的进行中判定合并为一次上游调用
+    调用失败返回 False 但不写缓存，避免把失败固化为“不完整”
+    """
+    with span("completeness.llm_verdict", check=check) as current:
+        # 启发式判定不写缓存，缓存中只保存 LLM 的结果
+        if check == "sentence_complete" and ends_with_conjunction(text):
+            verdict_cache.short_circuits += 1
+            current.set("source", "short_circuit")
+            return False
+        cache_key = verdict_cache.make_key(check, text, context, provider)
+        cached = verdict_cache.get(cache_key)
+        if cached is not None:
+            current.set("source", "cache")
+            return cached
+        flight_key = "\x1f".join((check, provider or '', key_fingerprint(api_key), context or '', text))
+        current.set("source", "provider")
+        try:
+            result = await provider_flight.do(flight_key, lambda: _request_verdict(api_key, provider, system, prompt))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            current.set("error", type(e).__name__)
+            return False
+        verdict_cache.set(cache_key, result)
+        return result
+
+async def _request_verdict(api_key: str, provider: str, system: str, prompt: str) -> bool:
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     payload = {
         "model": "gpt-3.5-turbo",
         "messages": [
-            {"role": "system", "content": "You are a translation assistant. Return only true or false, no other explanation."},
+            {"role": "system", "content": system},
             {"role": "user", "content": prompt}
         ],
         "temperature": 0.1,
         "max_tokens": 10
     }
-    try:
-        start = time.time()
-        async with httpx.AsyncClient() as client:
-            resp = await client.post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers, timeout=15)
-        duration = time.time() - start
-        print(f"[LLM耗时] provider={{provider or 'openai'}}, 接口=chat_completions, 耗时: {{duration:.2f}}秒")
-        data = resp.json()
-        result = data["choices"][0]["message"]["content"].strip().lower()
-        return result == 'true'
-    except Exception:
-        return False 
\ No newline at end of file
+    # 判定请求统一发往 OpenAI 接口；熔断中直接快速失败，由 _llm_verdict 按 False 处理
+    with provider_breakers.guard("chatgpt", api_key):
+        with provider_call("chatgpt", "verdict") as call:
+            resp = await get_client("openai").post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers, timeout=15)
+            call.status = resp.status_code
+        log.debug("provider_call", provider=provider or 'openai', endpoint="chat_completions", duration_ms=round(call.duration * 1000))
+        if not resp.is_success:
+            raise ProviderError(f"判定请求失败: {resp.status_code}", resp.status_code)
+    data = resp.json()
+    result = data["choices"][0]["message"]["content"].strip().lower()
+    return result == 'true'
@@ -0,0 +1,222 @@
+# @AI-Generated
+"""
+预编译规则扫描器：一次提取文本特征（长度、文本尾部、括号引号计数、末词、分词），
+供中文/英文/通用完整性规则共用，结果与逐条规则函数完全一致
+特征统计使用 str.count/endswith 等 C 层原语，比 Python 逐字符循环更快；
+评分函数只依赖特征接口，增量检测器（incremental_detector）复用同一套评分
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+from .constants import (
+    ENGLISH_CONJUNCTIONS, ENGLISH_PREPOSITIONS, SENTENCE_ENDING_PUNCTUATION,
+    INCOMPLETE_ENDING_CHARS, CHINESE_ENDING_CONJUNCTIONS
+)
+
+# 预编译集合与元组
+_EN_CONJ_OR_PREP = frozenset(ENGLISH_CONJUNCTIONS) | frozenset(ENGLISH_PREPOSITIONS)
+_EN_ENDING_PUNCT = frozenset(SENTENCE_ENDING_PUNCTUATION['english'])
+_EN_SHORT_WORDS = frozenset(['a', 'an', 'i', 'be', 'do', 'to', 'so', 'no', 'of', 'he', 'by', 'we'])
+_EN_TRUNCATED_SUFFIXES = ('and', 'or', 'but', 'to', 'the')
+_EN_COMMON_INCOMPLETE_SUFFIXES = (
+    'to', 'and', 'or', 'the', 'a', 'an', 'in', 'on', 'at', 'with', 'by', 'as',
+    'for', 'from', 'of', 'about', 'than'
+)
+_EN_VERB_RE = re.compile(r'\b(am|is|are|was|were|be|being|been|do|does|did|have|has|had|can|could|will|would|shall|should|may|might|must|ought)\b', re.I)
+_EN_INFLECTED_RE = re.compile(r'\b\w+(?:s|ed|ing)\b', re.I)
+_NON_WORD_RE = re.compile(r'[^\w]')
+_TRAILING_LOWER_RE = re.compile(r'[a-z]+$')
+_INPUT_PUNCT_RE = re.compile(r'[.?!,;:]')
+_PURE_CJK_RE = re.compile(r'[\u4e00-\u9fa5]+')
+_WORD_RE = re.compile(r'\w+')
+
+_INCOMPLETE_ENDING = frozenset(INCOMPLETE_ENDING_CHARS)
+_ZH_ENDING_PUNCT = frozenset('。！？…；：?!;:')
+_ZH_CONJUNCTIONS = tuple(CHINESE_ENDING_CONJUNCTIONS)
+_GENERIC_ENDING_PUNCT = frozenset('。！？.!?;；')
+_GENERIC_LANGUAGES = frozenset(['ja', 'ko', 'de', 'fr', 'es', 'it', 'ru', 'pt', 'vi', 'th'])
+
+# 以固定短语结尾视为不完整；按短语末词建立反向索引（后缀 trie 的第一层）
+_EN_INCOMPLETE_PHRASES = [
+    'in order', 'as well as', 'such as', 'more than', 'rather than', 'due to', 'according to',
+    'based on', 'refers to', 'related to', 'compared to', 'contrary to', 'similar to',
+    'for example', 'in terms of', 'in other words', 'on the other hand'
+]
+_PHRASES_BY_LAST_WORD: Dict[str, Tuple[str, ...]] = {}
+for _phrase in _EN_INCOMPLETE_PHRASES:
+    _last = _phrase.rsplit(' ', 1)[-1]
+    _PHRASES_BY_LAST_WORD[_last] = _PHRASES_BY_LAST_WORD.get(_last, ()) + (_phrase,)
+
+# 特征中保留的去空白文本尾部长度，须大于最长固定短语
+TAIL_LENGTH = 32
+assert TAIL_LENGTH > max(len(p) for p in _EN_INCOMPLETE_PHRASES)
+
+_EN_VERB_FULL_RE = re.compile(r'(?:am|is|are|was|were|be|being|been|do|does|did|have|has|had|can|could|will|would|shall|should|may|might|must|ought)', re.I)
+_EN_INFLECTED_FULL_RE = re.compile(r'\w+(?:s|ed|ing)', re.I)
+
+def is_word_char(c: str) -> bool:
+    """
+    与正则 \w 一致的单字符判断
+    """
+    return c.isalnum() or c == '_'
+
+def is_verb_token(token: str) -> bool:
+    """
+    单个 \w 连续片段是否命中谓语规则，与在全文上搜索 \b...\b 等价
+    """
+    return bool(_EN_VERB_FULL_RE.fullmatch(token) or _EN_INFLECTED_FULL_RE.fullmatch(token))
+
+class TextFeatures:
+    """
+    由完整文本提取的规则特征，代价较高的特征按需计算；
+    IncrementalCompleteness 提供相同接口的增量版本
+    """
+    __slots__ = ('length', 'trimmed_len', 'tail', '_trimmed', '_words')
+
+    def __init__(self, text: str):
+        trimmed = text.strip() if text else ''
+        self._trimmed = trimmed
+        self.length = len(text) if text else 0
+        self.trimmed_len = len(trimmed)
+        self.tail = trimmed[-TAIL_LENGTH:]
+        self._words = None
+
+    def _split(self) -> List[str]:
+        if self._words is None:
+            self._words = self._trimmed.split()
+        return self._words
+
+    def last_word(self) -> str:
+        return self._split()[-1]
+
+    def word_count(self) -> int:
+        return len(self._split())
+
+    def has_verb(self) -> bool:
+        trimmed = self._trimmed
+        return bool(_EN_VERB_RE.search(trimmed) or _EN_INFLECTED_RE.search(trimmed))
+
+    def has_input_punct(self) -> bool:
+        return bool(_INPUT_PUNCT_RE.search(self._trimmed))
+
+    def unclosed_ascii(self) -> bool:
+        trimmed = self._trimmed
+        return trimmed.count('"') % 2 != 0 or trimmed.count('(') != trimmed.count(')')
+
+    def unclosed_cjk(self) -> bool:
+        trimmed = self._trimmed
+        open_count = trimmed.count('「') + trimmed.count('『') + trimmed.count('（')
+        close_count = trimmed.count('」') + trimmed.count('』') + trimmed.count('）')
+        return open_count != close_count
+
+def _ends_with_incomplete_phrase(f) -> bool:
+    """
+    等价于 re.search(r'\b(短语...)\s*$', trimmed)
+    """
+    tail = f.tail
+    match = _TRAILING_LOWER_RE.search(tail)
+    if match is None:
+        return False
+    for phrase in _PHRASES_BY_LAST_WORD.get(match.group(0), ()):
+        if tail.endswith(phrase):
+            start = len(tail) - len(phrase)
+            # tail 长于最长短语，start 为 0 说明 tail 即完整文本
+            if start == 0 or not is_word_char(tail[start - 1]):
+                return True
+    return False
+
+def english_score_features(f) -> float:
+    if f.length < 5 or f.trimmed_len == 0:
+        return 0.4
+    tail = f.tail
+    last_word = _NON_WORD_RE.sub('', f.last_word().lower())
+    if last_word in _EN_CONJ_OR_PREP or tail.endswith(_EN_TRUNCATED_SUFFIXES) or _ends_with_incomplete_phrase(f):
+        return 0.05
+    if len(last_word) <= 2 and last_word not in _EN_SHORT_WORDS:
+        return 0.3
+    if f.unclosed_ascii():
+        return 0.1
+    if tail[-1] in _EN_ENDING_PUNCT:
+        return 0.95
+    # 谓语检测代价较高，只在需要时执行
+    if f.word_count() >= 4 and f.has_verb():
+        return 0.7
+    return 0.35
+
+def chinese_score_features(f) -> float:
+    if f.trimmed_len == 0:
+        return 0.0
+    tail = f.tail
+    if f.trimmed_len <= 4 and _PURE_CJK_RE.fullmatch(tail):
+        return 0.6
+    if f.unclosed_cjk():
+        return 0.05
+    if tail[-1] in _ZH_ENDING_PUNCT:
+        return 0.95
+    if tail.endswith(_ZH_CONJUNCTIONS):
+        return 0.1
+    return 0.35
+
+def local_score_features(f, language_code: str) -> float:
+    if f.trimmed_len <= 2:
+        return 0.3
+    tail = f.tail
+    last_char = tail[-1]
+    if last_char in _INCOMPLETE_ENDING:
+        return 0.05
+    if 'A' <= last_char <= 'Z' and 'a' <= tail[-2] <= 'z':
+        return 0.1
+    if f.unclosed_ascii():
+        return 0.05
+    if language_code == 'zh':
+        return chinese_score_features(f)
+    if language_code == 'en':
+        score = english_score_features(f)
+        if tail.endswith(_EN_COMMON_INCOMPLETE_SUFFIXES):
+            return min(score, 0.3)
+        if f.word_count() <= 3 and not f.has_input_punct():
+            return min(score, 0.4)
+        return score
+    if last_char in _GENERIC_ENDING_PUNCT:
+        return 0.95
+    if f.trimmed_len >= 4:
+        return 0.6
+    if language_code in _GENERIC_LANGUAGES and _WORD_RE.fullmatch(tail):
+        return 0.6
+    return 0.3
+
+def english_score(text: str) -> float:
+    """
+    英文句子完整度评分，见 english_detector.english_completeness_score
+    """
+    return english_score_features(TextFeatures(text))
+
+def chinese_score(text: str) -> float:
+    """
+    中文句子或词汇完整度评分，见 chinese_detector.chinese_completeness_score
+    """
+    return chinese_score_features(TextFeatures(text))
+
+def local_score(text: str, language_code: str) -> float:
+    """
+    输入完整度评分（不含 LLM），见 input_detector.local_completeness_score
+    """
+    return local_score_features(TextFeatures(text), language_code)
+
+_SCORERS = {
+    'input': local_score,
+    'chinese': lambda text, _: chinese_score(text),
+    'english': lambda text, _: english_score(text),
+}
+
+def scan_batch(texts: List[str], language_code: Optional[str] = None, detector: str = 'input') -> List[bool]:
+    """
+    批量规则判定
+    :param texts: 文本列表
+    :param language_code: 语言代码（detector=input 时使用）
+    :param detector: input（通用输入规则）/ chinese / english
+    :return: 每条文本是否完整
+    """
+    scorer = _SCORERS.get(detector)
+    if scorer is None:
+        raise ValueError(f"不支持的检测器: {detector}")
+    return [scorer(text, language_code) >= 0.5 for text in texts]
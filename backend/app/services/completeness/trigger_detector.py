@@ -2,9 +2,13 @@
 """
 触发检测器
 """
+import os
 import time
-import re
+from collections import OrderedDict
+from typing import Dict, Optional
 from .input_detector import is_input_complete
+from .incremental_detector import IncrementalCompleteness
+from app.services.tracing import span
 
 # 触发检测相关常量
 PAUSE_THRESHOLD_SHORT = 600  # ms，短文本停顿阈值
@@ -14,16 +18,28 @@ TIME_THRESHOLD_OTHER = 600   # ms，其他语言时间阈值
 CONSECUTIVE_COMPLETE_LIMIT = 1  # 连续完整检测次数
 PAUSE_COUNTER_LIMIT = 3      # 连续未变动计数
 
+# 会话注册表配置
+SESSION_IDLE_TTL = float(os.getenv("TRIGGER_SESSION_IDLE_TTL", "600"))     # 秒，空闲会话过期时间
+SESSION_MAX_COUNT = int(os.getenv("TRIGGER_SESSION_MAX_COUNT", "10000"))   # 会话数量硬上限，超出按 LRU 淘汰
+
 class InputTriggerDetector:
     """
     输入触发检测器，封装状态，支持多用户/多会话
     """
+    __slots__ = (
+        '_last_input_check_time', '_last_complete_text', '_consecutive_complete_count',
+        '_pause_counter', '_last_input_text', '_last_input_time', '_tracker'
+    )
+
     def __init__(self):
         self._last_input_check_time = 0
         self._last_complete_text = ''
         self._consecutive_complete_count = 0
         self._pause_counter = 0
         self._last_input_text = ''
+        self._last_input_time = None
+        # 逐次输入多为追加/退格，规则特征增量维护，避免每次重扫全文
+        self._tracker = IncrementalCompleteness()
 
     def reset_state(self):
         self._last_input_check_time = 0
@@ -31,8 +47,15 @@ class InputTriggerDetector:
         self._last_input_text = ''
         self._pause_counter = 0
         self._last_complete_text = ''
+        self._tracker.reset()
 
     async def should_translate(self, source_text: str, source_language_code: str, last_translated_text: str, is_first_translation: bool, llm_api_key: str = None) -> bool:
+        with span("trigger.should_translate", language=source_language_code) as current:
+            should = await self._should_translate(source_text, source_language_code, last_translated_text, is_first_translation, llm_api_key)
+            current.set("should", should)
+            return should
+
+    async def _should_translate(self, source_text: str, source_language_code: str, last_translated_text: str, is_first_translation: bool, llm_api_key: str = None) -> bool:
         current_time = int(time.time() * 1000)
         if not source_text.strip():
             self.reset_state()
@@ -48,12 +71,14 @@ class InputTriggerDetector:
             self._pause_counter += 1
         user_paused_typing = self._pause_counter >= PAUSE_COUNTER_LIMIT
         user_pause_time = current_time - self._last_input_check_time
-        word_count = len(source_text.strip().split())
+        tracker = self._tracker
+        tracker.update(source_text)
+        word_count = tracker.word_count()
         pause_threshold = PAUSE_THRESHOLD_SHORT if word_count <= 2 else PAUSE_THRESHOLD_LONG
         user_paused_long_enough = user_pause_time >= pause_threshold
         if user_paused_long_enough:
             return True
-        is_complete = await is_input_complete(source_text, source_language_code, llm_api_key)
+        is_complete = await is_input_complete(source_text, source_language_code, llm_api_key, features=tracker)
         if is_complete:
             if source_text == self._last_complete_text:
                 self._consecutive_complete_count += 1
@@ -79,17 +104,23 @@ class InputTriggerDetector:
         增强版停顿/完整性检测
         :return: { should: bool, is_complete: bool }
         """
-        if not hasattr(self, '_last_input_time'):
+        with span("trigger.should_translate_ex", language=source_language_code) as current:
+            result = await self._should_translate_ex(source_text, source_language_code, llm_api_key)
+            current.set("should", result["should"])
+            return result
+
+    async def _should_translate_ex(self, source_text: str, source_language_code: str, llm_api_key: str = None) -> dict:
+        if self._last_input_time is None:
             self._last_input_time = int(time.time() * 1000)
-        is_complete = await is_input_complete(source_text, source_language_code, llm_api_key)
-        has_latin = bool(re.search(r'[a-zA-Z]', source_text))
-        has_cjk = bool(re.search(r'[\u4e00-\u9fa5]', source_text))
-        if has_latin and has_cjk:
+        tracker = self._tracker
+        tracker.update(source_text)
+        is_complete = await is_input_complete(source_text, source_language_code, llm_api_key, features=tracker)
+        if tracker.has_latin and tracker.has_cjk:
             is_complete = False
         now = int(time.time() * 1000)
         last = self._last_input_time
         pause = now - last
-        word_count = len(source_text.strip().split())
+        word_count = tracker.word_count()
         is_single_word = word_count == 1
         if is_single_word and pause >= PAUSE_THRESHOLD_SHORT:
             self._last_input_time = now
@@ -102,17 +133,77 @@ class InputTriggerDetector:
             return {"should": True, "is_complete": True}
         return {"should": False, "is_complete": is_complete}
 
-# 单例兼容原有用法
+class DetectorRegistry:
+    """
+    按会话 ID 懒创建检测器，空闲超时或超出上限时按 LRU 淘汰
+    """
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, max_sessions: int = SESSION_MAX_COUNT):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        # session_id -> (检测器, 最近访问时间)，按访问顺序排列
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, session_id: str) -> InputTriggerDetector:
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            detector = InputTriggerDetector()
+            self.created += 1
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        else:
+            detector = entry[0]
+        self._sessions[session_id] = (detector, now)
+        return detector
+
+    def remove(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def _expire(self, now: float):
+        # 最久未访问的会话在最前，遇到未过期的即可停止
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def stats(self) -> Dict[str, int]:
+        self._expire(time.monotonic())
+        return {
+            "live_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+detector_registry = DetectorRegistry()
+
+# 单例兼容原有用法（未提供 session_id 时）
 _detector_instance = InputTriggerDetector()
 
-async def should_translate(source_text: str, source_language_code: str, last_translated_text: str, is_first_translation: bool, llm_api_key: str = None) -> bool:
+def get_detector(session_id: Optional[str] = None) -> InputTriggerDetector:
+    """
+    获取会话对应的检测器，未提供 session_id 时返回共享单例
+    """
+    if session_id:
+        return detector_registry.get(session_id)
+    return _detector_instance
+
+async def should_translate(source_text: str, source_language_code: str, last_translated_text: str, is_first_translation: bool, llm_api_key: str = None, session_id: str = None) -> bool:
     """
-    兼容原有API，使用单例
+    兼容原有API，按 session_id 隔离状态
     """
-    return await _detector_instance.should_translate(source_text, source_language_code, last_translated_text, is_first_translation, llm_api_key)
+    return await get_detector(session_id).should_translate(source_text, source_language_code, last_translated_text, is_first_translation, llm_api_key)
 
-async def should_translate_ex(source_text: str, source_language_code: str, llm_api_key: str = None) -> dict:
+async def should_translate_ex(source_text: str, source_language_code: str, llm_api_key: str = None, session_id: str = None) -> dict:
     """
-    兼容原有API，使用单例
+    兼容原有API，按 session_id 隔离状态
     """
-    return await _detector_instance.should_translate_ex(source_text, source_language_code, llm_api_key) 
\ No newline at end of file
+    return await get_detector(session_id).should_translate_ex(source_text, source_language_code, llm_api_key)
\ No newline at end of file
@@ -0,0 +1,70 @@
+# @AI-Generated
+"""
+LLM 判定结果缓存（完整句检测 / 可翻译词汇检测）
+只缓存成功返回的判定，调用失败不会被记为 False
+"""
+import hashlib
+import os
+import re
+from typing import Dict, Optional
+from app.services.translation_cache import MemoryLRUCache
+from .constants import ENGLISH_CONJUNCTIONS, CHINESE_ENDING_CONJUNCTIONS
+
+LLM_VERDICT_CACHE_TTL = float(os.getenv("LLM_VERDICT_CACHE_TTL", "600"))   # 秒
+LLM_VERDICT_CACHE_MAX_BYTES = int(os.getenv("LLM_VERDICT_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+_LAST_WORD_RE = re.compile(r'([A-Za-z]+)$')
+# 单字连词（与/而/且/及/并 等）常是普通词语的末字（如“参与”“合并”），只用多字连词判定
+_CHINESE_SHORT_CIRCUIT_CONJUNCTIONS = tuple(conj for conj in CHINESE_ENDING_CONJUNCTIONS if len(conj) > 1)
+
+def ends_with_conjunction(text: str) -> bool:
+    """
+    文本以英文连接词/冠词或中文多字连词结尾（末尾无标点），无需调用 LLM 即可判定不完整
+    """
+    trimmed = text.strip()
+    if not trimmed:
+        return False
+    match = _LAST_WORD_RE.search(trimmed)
+    if match:
+        return match.group(1).lower() in ENGLISH_CONJUNCTIONS
+    return trimmed.endswith(_CHINESE_SHORT_CIRCUIT_CONJUNCTIONS)
+
+class VerdictCache:
+    """
+    按 (检测类型, 服务商, 上下文哈希, 文本) 缓存 true/false 判定
+    """
+    def __init__(self, max_bytes: int = LLM_VERDICT_CACHE_MAX_BYTES, ttl: float = LLM_VERDICT_CACHE_TTL):
+        self._cache = MemoryLRUCache(max_bytes, ttl)
+        self.hits = 0
+        self.misses = 0
+        self.short_circuits = 0
+
+    @staticmethod
+    def make_key(check: str, text: str, context: Optional[str], provider: Optional[str]) -> str:
+        context_hash = hashlib.sha1(context.encode('utf-8')).hexdigest()[:16] if context else ''
+        return "\x1f".join((check, provider or '', context_hash, text.strip()))
+
+    def get(self, key: str) -> Optional[bool]:
+        value = self._cache.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value == 'true'
+
+    def set(self, key: str, verdict: bool):
+        self._cache.set(key, 'true' if verdict else 'false')
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "short_circuits": self.short_circuits,
+            "evictions": self._cache.evictions,
+            "entries": len(self._cache),
+        }
+
+verdict_cache = VerdictCache()
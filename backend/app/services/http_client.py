@@ -0,0 +1,69 @@
+# @AI-Generated
+"""
+共享 HTTP 连接池：每个服务商主机一个长连接 AsyncClient，由 FastAPI lifespan 创建和关闭
+"""
+import os
+import httpx
+from typing import Dict
+
+# 连接池配置，可通过环境变量覆盖
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+
+# 服务商 -> 是否启用 HTTP/2（ALPN 协商，不支持时自动回退 HTTP/1.1）
+PROVIDER_HOSTS = {
+    "openai": True,        # api.openai.com
+    "deepseek": False,     # api.deepseek.com
+    "gemini": True,        # generativelanguage.googleapis.com
+    "huggingface": True,   # api-inference.huggingface.co
+    "xfyun": False,        # iat-api.xfyun.cn
+}
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+def _create_client(host: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY,
+    )
+    # 单次请求仍按调用方传入的 timeout，这里只给默认值
+    timeout = httpx.Timeout(30, connect=HTTP_CONNECT_TIMEOUT)
+    http2 = HTTP2_AVAILABLE and PROVIDER_HOSTS.get(host, False)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+def get_client(host: str) -> httpx.AsyncClient:
+    """
+    获取服务商对应的共享客户端，未初始化时懒创建（兼容脚本/非 lifespan 场景）
+    :param host: 服务商标识，见 PROVIDER_HOSTS
+    :return: httpx.AsyncClient
+    """
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        client = _create_client(host)
+        _clients[host] = client
+    return client
+
+async def init_clients():
+    """
+    应用启动时预创建所有服务商客户端
+    """
+    for host in PROVIDER_HOSTS:
+        get_client(host)
+
+async def close_clients():
+    """
+    应用关闭时释放所有连接
+    """
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,68 @@
+# @AI-Generated
+"""
+增量分句翻译：已完成的句子走翻译缓存复用，只有新增/修改的尾部发给服务商
+"""
+import asyncio
+import re
+from typing import List, Tuple
+from .completeness.chinese_detector import is_chinese_sentence_complete
+from .completeness.english_detector import is_english_sentence_complete
+from .llm_translation import translate_with_llm
+
+# 候选句：到句末标点（可跟闭合引号/括号）为止，连同其后空白
+_SENTENCE_RE = re.compile(r'[^.!?;。！？；…]*[.!?;。！？；…]+["\'」』）)]*\s*')
+
+# 译文之间不加空格的目标语言
+_NO_SPACE_LANGUAGES = {'zh', 'ja'}
+
+def _is_finished(sentence: str, language: str) -> bool:
+    if language == 'zh':
+        return is_chinese_sentence_complete(sentence)
+    if language == 'en':
+        return is_english_sentence_complete(sentence)
+    return bool(sentence.strip())
+
+def split_sentences(text: str, language: str) -> Tuple[List[str], str]:
+    """
+    按句末标点切分，并用完整性规则确认每句已结束（如缩写 "Mr." 会与下一句合并）
+    :param text: 完整输入
+    :param language: 源语言代码
+    :return: (已完成句子列表, 未完成尾部)
+    """
+    finished = []
+    pending = ''
+    pos = 0
+    for match in _SENTENCE_RE.finditer(text):
+        pending += match.group(0)
+        pos = match.end()
+        if _is_finished(pending, language):
+            finished.append(pending)
+            pending = ''
+    return finished, pending + text[pos:]
+
+def join_translations(parts: List[str], target_language: str) -> str:
+    separator = '' if target_language in _NO_SPACE_LANGUAGES else ' '
+    return separator.join(p.strip() for p in parts if p and p.strip())
+
+async def translate_incremental(
+    text: str,
+    source_language: str,
+    target_language: str,
+    api_key: str,
+    provider: str
+) -> str:
+    """
+    增量翻译：逐句调用 translate_with_llm，未变化的已完成句直接命中缓存，
+    每次更新只有新句/尾部产生服务商调用
+    """
+    finished, tail = split_sentences(text, source_language)
+    segments = [s for s in finished if s.strip()]
+    if tail.strip():
+        segments.append(tail)
+    if len(segments) <= 1:
+        return await translate_with_llm(text, source_language, target_language, api_key, provider)
+    parts = await asyncio.gather(*(
+        translate_with_llm(segment, source_language, target_language, api_key, provider)
+        for segment in segments
+    ))
+    return join_translations(list(parts), target_language)
@@ -2,10 +2,22 @@
 """
 大模型翻译相关服务
 """
-import httpx
-from .ai_base import Optional
+from .http_client import get_client
+from .metrics import provider_call, provider_stream_ttfb_seconds
+from .translation_cache import translation_cache, make_cache_key
+from .singleflight import provider_flight, key_fingerprint
+from .provider_latency import provider_latency
+from .ai_base import Optional, Tuple, ProviderError
+from .circuit_breaker import provider_breakers
+from .tracing import span
+from .logger import get_logger
+from typing import AsyncIterator, Awaitable, Callable
+import asyncio
+import json
 import time
 
+log = get_logger(__name__)
+
 HF_LANG_MAP = {
     "en": "en_XX",
     "zh": "zh_CN",
@@ -37,6 +49,9 @@ LANG_NAME_MAP = {
     "tr": "土耳其语"
 }
 
+# 服务商返回的兜底文案不写入缓存
+UNCACHEABLE_RESULTS = {"翻译失败", "不支持的语言组合"}
+
 async def translate_with_llm(
     text: str,
     source_language: str,
@@ -45,8 +60,55 @@ async def translate_with_llm(
     provider: str
 ) -> str:
     """
-    调用大模型API进行翻译
+    调用大模型API进行翻译，先查翻译缓存，未命中时合并相同的进行中请求
     """
+    with span("translate", provider=provider, chars=len(text)) as current:
+        cache_key = make_cache_key(text, source_language, target_language, provider)
+        cached = await translation_cache.get(cache_key)
+        current.set("cache_hit", cached is not None)
+        if cached is not None:
+            return cached
+        # 相同请求（同一租户）进行中时合并为一次上游调用
+        flight_key = f"translate:{cache_key}:{key_fingerprint(api_key)}"
+        result = await provider_flight.do(
+            flight_key,
+            lambda: _translate_uncached(text, source_language, target_language, api_key, provider)
+        )
+        if result not in UNCACHEABLE_RESULTS:
+            await translation_cache.set(cache_key, result)
+        return result
+
+async def _translate_uncached(
+    text: str,
+    source_language: str,
+    target_language: str,
+    api_key: str,
+    provider: str
+) -> str:
+    # 熔断中直接快速失败；实际发往服务商的调用计入延迟统计，供延迟感知路由使用
+    with provider_breakers.guard(provider, api_key):
+        start = time.monotonic()
+        try:
+            result = await _dispatch_translation(text, source_language, target_language, api_key, provider)
+        except asyncio.CancelledError:
+            provider_latency.record_cancelled(provider, time.monotonic() - start)
+            raise
+        except Exception:
+            provider_latency.record_failure(provider, time.monotonic() - start)
+            raise
+    if result == "翻译失败":
+        provider_latency.record_failure(provider, time.monotonic() - start)
+    elif result != "不支持的语言组合":
+        provider_latency.record_success(provider, time.monotonic() - start)
+    return result
+
+async def _dispatch_translation(
+    text: str,
+    source_language: str,
+    target_language: str,
+    api_key: str,
+    provider: str
+) -> str:
     if provider == "chatgpt":
         return await translate_with_chatgpt(text, source_language, target_language, api_key)
     elif provider == "huggingface":
@@ -59,7 +121,7 @@ async def translate_with_llm(
         raise ValueError(f"不支持的LLM提供者: {provider}")
 
 # ChatGPT
-async def translate_with_chatgpt(text: str, source_language: str, target_language: str, api_key: str) -> str:
+def _build_chatgpt_request(text: str, source_language: str, target_language: str, api_key: str) -> Tuple[str, dict, dict]:
     lang_map = {
         'zh': 'Chinese', 'en': 'English', 'ja': 'Japanese', 'ko': 'Korean',
         'fr': 'French', 'de': 'German', 'es': 'Spanish', 'it': 'Italian',
@@ -78,18 +140,16 @@ async def translate_with_chatgpt(text: str, source_language: str, target_languag
         "temperature": 0.3,
         "max_tokens": 2048
     }
-    start = time.time()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers, timeout=30)
-    duration = time.time() - start
-    print(f"[LLM耗时] provider=chatgpt, 接口=chat_completions, 耗时: {duration:.2f}秒")
+    return "https://api.openai.com/v1/chat/completions", headers, payload
+
+async def translate_with_chatgpt(text: str, source_language: str, target_language: str, api_key: str) -> str:
+    api_url, headers, payload = _build_chatgpt_request(text, source_language, target_language, api_key)
+    with provider_call("chatgpt", "translate") as call:
+        resp = await get_client("openai").post(api_url, json=payload, headers=headers, timeout=30)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="chatgpt", endpoint="chat_completions", duration_ms=round(call.duration * 1000))
     if not resp.is_success:
-        try:
-            err = resp.json()
-            msg = err.get("error", {}).get("message", "API错误")
-        except Exception:
-            msg = "API错误"
-        raise Exception(f"ChatGPT API错误: {msg}")
+        raise ProviderError(f"ChatGPT API错误: {_openai_error_message(resp)}", resp.status_code)
     data = resp.json()
     return data["choices"][0]["message"]["content"].strip()
 
@@ -102,21 +162,23 @@ async def translate_with_huggingface(text: str, source_language: str, target_lan
         return "不支持的语言组合"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     payload = {"inputs": text, "parameters": {"src_lang": src_lang, "tgt_lang": tgt_lang}}
-    start = time.time()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(api_url, json=payload, headers=headers, timeout=30)
-    duration = time.time() - start
-    print(f"[LLM耗时] provider=huggingface, 接口=mbart-large-50, 耗时: {duration:.2f}秒")
+    with provider_call("huggingface", "translate") as call:
+        resp = await get_client("huggingface").post(api_url, json=payload, headers=headers, timeout=30)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="huggingface", endpoint="mbart-large-50", duration_ms=round(call.duration * 1000))
     if not resp.is_success:
-        raise Exception(f"HuggingFace API错误: {resp.status_code}")
+        raise ProviderError(f"HuggingFace API错误: {resp.status_code}", resp.status_code)
     result = resp.json()
     if isinstance(result, list) and result:
         return result[0].get("translation_text", "翻译失败")
     return "翻译失败"
 
 # Gemini
-async def translate_with_gemini(text: str, source_language: str, target_language: str, api_key: str) -> str:
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro:generateContent?key={api_key}"
+def _build_gemini_request(text: str, source_language: str, target_language: str, api_key: str, stream: bool = False) -> Tuple[str, dict, dict]:
+    if stream:
+        api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro:streamGenerateContent?alt=sse&key={api_key}"
+    else:
+        api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-pro:generateContent?key={api_key}"
     source_lang = LANG_NAME_MAP.get(source_language, source_language)
     target_lang = LANG_NAME_MAP.get(target_language, target_language)
     prompt = f"将以下{source_lang}文本翻译为{target_lang}，不要添加任何解释，仅输出翻译结果：\n\n{text}"
@@ -130,13 +192,16 @@ async def translate_with_gemini(text: str, source_language: str, target_language
             "maxOutputTokens": 800
         }
     }
-    start = time.time()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(api_url, json=payload, headers=headers, timeout=30)
-    duration = time.time() - start
-    print(f"[LLM耗时] provider=gemini, 接口=generateContent, 耗时: {duration:.2f}秒")
+    return api_url, headers, payload
+
+async def translate_with_gemini(text: str, source_language: str, target_language: str, api_key: str) -> str:
+    api_url, headers, payload = _build_gemini_request(text, source_language, target_language, api_key)
+    with provider_call("gemini", "translate") as call:
+        resp = await get_client("gemini").post(api_url, json=payload, headers=headers, timeout=30)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="gemini", endpoint="generateContent", duration_ms=round(call.duration * 1000))
     if not resp.is_success:
-        raise Exception(f"Gemini API错误: {resp.status_code}")
+        raise ProviderError(f"Gemini API错误: {resp.status_code}", resp.status_code)
     result = resp.json()
     try:
         return result["candidates"][0]["content"]["parts"][0]["text"]
@@ -144,8 +209,7 @@ async def translate_with_gemini(text: str, source_language: str, target_language
         return "翻译失败"
 
 # DeepSeek
-async def translate_with_deepseek(text: str, source_language: str, target_language: str, api_key: str) -> str:
-    api_url = "https://api.deepseek.com/v1/chat/completions"
+def _build_deepseek_request(text: str, source_language: str, target_language: str, api_key: str) -> Tuple[str, dict, dict]:
     source_lang = LANG_NAME_MAP.get(source_language, source_language)
     target_lang = LANG_NAME_MAP.get(target_language, target_language)
     prompt = f"将以下{source_lang}文本翻译为{target_lang}，不要添加任何解释，仅输出翻译结果：\n\n{text}"
@@ -159,20 +223,128 @@ async def translate_with_deepseek(text: str, source_language: str, target_langua
         "temperature": 0.3,
         "max_tokens": 2048
     }
-    start = time.time()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(api_url, json=payload, headers=headers, timeout=30)
-    duration = time.time() - start
-    print(f"[LLM耗时] provider=deepseek, 接口=chat_completions, 耗时: {duration:.2f}秒")
+    return "https://api.deepseek.com/v1/chat/completions", headers, payload
+
+async def translate_with_deepseek(text: str, source_language: str, target_language: str, api_key: str) -> str:
+    api_url, headers, payload = _build_deepseek_request(text, source_language, target_language, api_key)
+    with provider_call("deepseek", "translate") as call:
+        resp = await get_client("deepseek").post(api_url, json=payload, headers=headers, timeout=30)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="deepseek", endpoint="chat_completions", duration_ms=round(call.duration * 1000))
     if not resp.is_success:
-        try:
-            err = resp.json()
-            msg = err.get("error", {}).get("message", "API错误")
-        except Exception:
-            msg = "API错误"
-        raise Exception(f"DeepSeek API错误: {msg}")
+        raise ProviderError(f"DeepSeek API错误: {_openai_error_message(resp)}", resp.status_code)
     result = resp.json()
     try:
         return result["choices"][0]["message"]["content"]
     except Exception:
-        return "翻译失败" 
\ No newline at end of file
+        return "翻译失败"
+
+def _openai_error_message(resp) -> str:
+    """
+    解析 OpenAI 兼容接口（ChatGPT/DeepSeek）的错误信息
+    """
+    try:
+        err = resp.json()
+        return err.get("error", {}).get("message", "API错误")
+    except Exception:
+        return "API错误"
+
+# 流式翻译
+async def stream_translate_with_llm(
+    text: str,
+    source_language: str,
+    target_language: str,
+    api_key: str,
+    provider: str
+) -> AsyncIterator[str]:
+    """
+    流式调用大模型翻译，逐段产出译文；chatgpt/deepseek/gemini 使用服务商流式接口，
+    huggingface 不支持流式，整体作为一段返回。完整结果同样写入翻译缓存
+    """
+    cache_key = make_cache_key(text, source_language, target_language, provider)
+    cached = await translation_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    if provider == "chatgpt":
+        api_url, headers, payload = _build_chatgpt_request(text, source_language, target_language, api_key)
+        chunks = _stream_openai_compatible("chatgpt", "openai", api_url, headers, payload)
+    elif provider == "deepseek":
+        api_url, headers, payload = _build_deepseek_request(text, source_language, target_language, api_key)
+        chunks = _stream_openai_compatible("deepseek", "deepseek", api_url, headers, payload)
+    elif provider == "gemini":
+        api_url, headers, payload = _build_gemini_request(text, source_language, target_language, api_key, stream=True)
+        chunks = _stream_gemini(api_url, headers, payload)
+    elif provider == "huggingface":
+        chunks = _single_chunk(lambda: translate_with_huggingface(text, source_language, target_language, api_key))
+    else:
+        raise ValueError(f"不支持的LLM提供者: {provider}")
+    parts = []
+    with provider_breakers.guard(provider, api_key):
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+    result = "".join(parts).strip()
+    if result and result not in UNCACHEABLE_RESULTS:
+        await translation_cache.set(cache_key, result)
+
+async def _single_chunk(call: Callable[[], Awaitable[str]]) -> AsyncIterator[str]:
+    # 迭代时才创建协程：熔断器拒绝时生成器未被迭代，不会留下未 await 的协程
+    yield await call()
+
+async def _iter_sse_data(resp) -> AsyncIterator[str]:
+    """
+    解析 SSE 响应中的 data 行
+    """
+    async for line in resp.aiter_lines():
+        if line.startswith("data:"):
+            yield line[5:].strip()
+
+async def _stream_openai_compatible(provider: str, host: str, api_url: str, headers: dict, payload: dict) -> AsyncIterator[str]:
+    payload = dict(payload, stream=True)
+    start = time.time()
+    first_token_at = None
+    with provider_call(provider, "translate_stream") as call:
+        async with get_client(host).stream("POST", api_url, json=payload, headers=headers, timeout=30) as resp:
+            call.status = resp.status_code
+            if not resp.is_success:
+                await resp.aread()
+                name = "ChatGPT" if provider == "chatgpt" else "DeepSeek"
+                raise ProviderError(f"{name} API错误: {_openai_error_message(resp)}", resp.status_code)
+            async for data in _iter_sse_data(resp):
+                if data == "[DONE]":
+                    break
+                try:
+                    delta = json.loads(data)["choices"][0]["delta"].get("content")
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if delta:
+                    if first_token_at is None:
+                        first_token_at = time.time()
+                    yield delta
+    _log_stream_timing(provider, "chat_completions(stream)", start, first_token_at)
+
+async def _stream_gemini(api_url: str, headers: dict, payload: dict) -> AsyncIterator[str]:
+    start = time.time()
+    first_token_at = None
+    with provider_call("gemini", "translate_stream") as call:
+        async with get_client("gemini").stream("POST", api_url, json=payload, headers=headers, timeout=30) as resp:
+            call.status = resp.status_code
+            if not resp.is_success:
+                raise ProviderError(f"Gemini API错误: {resp.status_code}", resp.status_code)
+            async for data in _iter_sse_data(resp):
+                try:
+                    piece = json.loads(data)["candidates"][0]["content"]["parts"][0]["text"]
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if piece:
+                    if first_token_at is None:
+                        first_token_at = time.time()
+                    yield piece
+    _log_stream_timing("gemini", "streamGenerateContent", start, first_token_at)
+
+def _log_stream_timing(provider: str, endpoint: str, start: float, first_token_at: Optional[float]):
+    duration = time.time() - start
+    ttft = (first_token_at - start) if first_token_at else duration
+    provider_stream_ttfb_seconds.observe(ttft, provider, "translate_stream")
+    log.debug("provider_stream", provider=provider, endpoint=endpoint, ttft_ms=round(ttft * 1000), duration_ms=round(duration * 1000))
@@ -0,0 +1,208 @@
+# @AI-Generated
+"""
+结构化日志：JSON Lines，按级别过滤，高频 debug 事件可采样，敏感字段与疑似密钥自动脱敏
+请求路径上只做级别/采样判断和一次非阻塞入队，序列化、脱敏与写 stdout/文件在后台线程完成；
+队列满时丢弃并计数，不阻塞事件循环
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info").lower()
+LOG_FILE = os.getenv("LOG_FILE", "")                                          # 为空时写 stdout
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1"))       # debug 事件默认采样率 0~1
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# 字段名包含这些词时整体替换
+SENSITIVE_KEYS = ("api_key", "apikey", "authorization", "password", "secret", "token", "credential", "private_key")
+# 字段值中的疑似密钥：OpenAI/DeepSeek sk-、HuggingFace hf_、Google AIza、Bearer 头
+SECRET_PATTERN = re.compile(r"(sk-[A-Za-z0-9_\-]{8,}|hf_[A-Za-z0-9]{8,}|AIza[0-9A-Za-z_\-]{20,}|Bearer\s+[A-Za-z0-9._\-]+)")
+REDACTED = "***"
+
+def _is_sensitive(key: str) -> bool:
+    key = key.lower()
+    # token 计数类字段（如 max_tokens、prompt_tokens）不是凭据
+    if key.endswith("tokens"):
+        return False
+    return any(word in key for word in SENSITIVE_KEYS)
+
+def redact(value, key: str = ""):
+    """
+    递归脱敏：敏感字段名的值整体替换，字符串中的疑似密钥局部替换
+    """
+    if key and _is_sensitive(key) and value:
+        return REDACTED
+    if isinstance(value, str):
+        return SECRET_PATTERN.sub(REDACTED, value)
+    if isinstance(value, dict):
+        # 非字符串键（如元组）无法序列化为 JSON 对象键，统一转为字符串
+        return {str(k): redact(v, str(k)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+# 日志记录附加的上下文字段（如链路追踪登记的 request_id），在调用方所在上下文中取值
+_context_providers: List[Callable[[], Dict[str, object]]] = []
+
+def register_context(provider: Callable[[], Dict[str, object]]):
+    _context_providers.append(provider)
+
+class LogWriter:
+    """
+    后台线程从有界队列取记录，序列化后写出
+    """
+    def __init__(self, path: str = LOG_FILE, max_queue: int = LOG_QUEUE_SIZE):
+        self.path = path
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def submit(self, record: dict):
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def shutdown(self, timeout: float = 5):
+        """
+        写完队列中剩余的记录后停止后台线程
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+
+    def _run(self):
+        try:
+            stream = open(self.path, "a", encoding="utf-8") if self.path else sys.stdout
+        except OSError as e:
+            # 日志文件不可写时退回 stderr，不能让后台线程退出
+            sys.stderr.write(f"log file {self.path} unavailable: {e}\n")
+            stream = sys.stderr
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                lines = []
+                self._append(lines, record)
+                # 一次取完已排队的记录，合并为一次写入
+                stop = False
+                while True:
+                    try:
+                        record = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if record is None:
+                        stop = True
+                        break
+                    self._append(lines, record)
+                if lines:
+                    self._write(stream, lines)
+                if stop:
+                    break
+        finally:
+            if stream not in (sys.stdout, sys.stderr):
+                stream.close()
+
+    def _append(self, lines: List[str], record: dict):
+        # 单条记录无法序列化时丢弃并计数，不影响其他记录
+        try:
+            lines.append(self._format(record))
+        except Exception:
+            self.dropped += 1
+
+    def _write(self, stream, lines: List[str]):
+        # 写出失败（stdout 管道关闭、磁盘满等）时丢弃本批并计数，后台线程继续运行
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            self.written += len(lines)
+        except Exception:
+            self.dropped += len(lines)
+
+    @staticmethod
+    def _format(record: dict) -> str:
+        record["ts"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record["ts"])) + f".{int(record['ts'] * 1000) % 1000:03d}"
+        return json.dumps(redact(record), ensure_ascii=False, default=str)
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+_writer = LogWriter()
+atexit.register(_writer.shutdown)
+
+class Logger:
+    """
+    用法：log = get_logger(__name__); log.info("event_name", field=value)
+    debug 事件按 sample（默认 LOG_DEBUG_SAMPLE_RATE）采样，采样率小于 1 时记录中带 sample_rate 便于还原总量
+    """
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS[level] >= _min_level
+
+    def debug(self, event: str, sample: Optional[float] = None, **fields):
+        if _min_level > LEVELS["debug"]:
+            return
+        rate = LOG_DEBUG_SAMPLE_RATE if sample is None else sample
+        if rate < 1:
+            if random.random() >= rate:
+                return
+            fields["sample_rate"] = rate
+        self._emit("debug", event, fields)
+
+    def info(self, event: str, **fields):
+        if _min_level <= LEVELS["info"]:
+            self._emit("info", event, fields)
+
+    def warning(self, event: str, **fields):
+        if _min_level <= LEVELS["warning"]:
+            self._emit("warning", event, fields)
+
+    def error(self, event: str, **fields):
+        self._emit("error", event, fields)
+
+    def _emit(self, level: str, event: str, fields: dict):
+        record = {"ts": time.time(), "level": level, "logger": self.name, "event": event}
+        for provider in _context_providers:
+            record.update(provider())
+        record.update(fields)
+        _writer.submit(record)
+
+_min_level = LEVELS.get(LOG_LEVEL, LEVELS["info"])
+
+def get_logger(name: str) -> Logger:
+    return Logger(name)
+
+def shutdown_logging():
+    _writer.shutdown()
+
+def logging_stats() -> Dict[str, int]:
+    return _writer.stats()
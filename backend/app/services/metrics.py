@@ -0,0 +1,176 @@
+# @AI-Generated
+"""
+Prometheus 指标：计数器、仪表、直方图与文本格式输出（无第三方依赖）
+各服务模块已有的统计（缓存、单飞、熔断等）通过采集函数在抓取时读取
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .tracing import span
+
+# HTTP 接口与服务商调用的耗时分桶（秒）
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROVIDER_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, count in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {_format_value(count)}")
+        return lines
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str):
+        self._values[label_values] = value
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = HTTP_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # 标签 -> [各分桶计数（非累计，最后一格为 +Inf）, 总和, 次数]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {cumulative}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """
+    指标注册表；collectors 在抓取时返回 (指标名, 类型, 说明, [(标签字典, 值)]) 形式的即时数据
+    """
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP 请求数", ("route", "method", "status")))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时（到响应结束）", ("route", "method"), HTTP_BUCKETS))
+rate_limit_rejections_total = registry.register(Counter(
+    "rate_limit_rejections_total", "限流拒绝次数", ("policy",)))
+provider_requests_total = registry.register(Counter(
+    "llm_provider_requests_total", "服务商调用次数，outcome 为 HTTP 状态码或异常类型", ("provider", "operation", "outcome")))
+provider_request_duration_seconds = registry.register(Histogram(
+    "llm_provider_request_duration_seconds", "服务商调用耗时", ("provider", "operation"), PROVIDER_BUCKETS))
+provider_stream_ttfb_seconds = registry.register(Histogram(
+    "llm_provider_stream_ttfb_seconds", "流式调用首字耗时", ("provider", "operation"), PROVIDER_BUCKETS))
+provider_in_flight = registry.register(Gauge(
+    "llm_provider_in_flight", "进行中的服务商调用数", ("provider",)))
+
+class ProviderCall:
+    """
+    一次服务商调用的状态，status 由调用方在拿到响应后设置
+    """
+    __slots__ = ('status', 'duration')
+
+    def __init__(self):
+        self.status: Optional[int] = None
+        self.duration = 0.0
+
+@contextmanager
+def provider_call(provider: str, operation: str) -> Iterator[ProviderCall]:
+    """
+    记录服务商调用的次数、耗时与进行中数量，链路采样时同时记录 provider.<operation> span
+    """
+    call = ProviderCall()
+    provider_in_flight.inc(provider)
+    start = time.perf_counter()
+    outcome = "error"
+    with span(f"provider.{operation}", provider=provider) as current:
+        try:
+            yield call
+            outcome = str(call.status) if call.status is not None else "ok"
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            call.duration = time.perf_counter() - start
+            current.set("outcome", outcome)
+            provider_in_flight.dec(provider)
+            provider_requests_total.inc(provider, operation, outcome)
+            provider_request_duration_seconds.observe(call.duration, provider, operation)
@@ -0,0 +1,112 @@
+# @AI-Generated
+"""
+服务商延迟统计：按服务商维护 EWMA、滑动窗口 p95 与连续失败次数，供延迟感知路由使用
+样本来自实际发往服务商的翻译请求（缓存命中、单飞合并不计入）
+"""
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+ROUTER_EWMA_ALPHA = float(os.getenv("ROUTER_EWMA_ALPHA", "0.3"))
+ROUTER_WINDOW_SIZE = int(os.getenv("ROUTER_WINDOW_SIZE", "50"))                  # p95 滑动窗口样本数
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("ROUTER_FAILURE_THRESHOLD", "3"))       # 连续失败次数达到后暂时视为不健康
+ROUTER_UNHEALTHY_COOLDOWN = float(os.getenv("ROUTER_UNHEALTHY_COOLDOWN", "30"))  # 秒
+
+class ProviderLatency:
+    """
+    单个服务商的延迟状态（秒）
+    """
+    __slots__ = ('ewma', 'samples', 'consecutive_failures', 'unhealthy_until', 'successes', 'failures')
+
+    def __init__(self):
+        self.ewma: Optional[float] = None
+        self.samples = deque(maxlen=ROUTER_WINDOW_SIZE)
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.successes = 0
+        self.failures = 0
+
+    def observe(self, seconds: float):
+        self.ewma = seconds if self.ewma is None else ROUTER_EWMA_ALPHA * seconds + (1 - ROUTER_EWMA_ALPHA) * self.ewma
+        self.samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+class LatencyTracker:
+    """
+    所有服务商的延迟统计
+    """
+    def __init__(self):
+        self._providers: Dict[str, ProviderLatency] = {}
+
+    def _get(self, provider: str) -> ProviderLatency:
+        state = self._providers.get(provider)
+        if state is None:
+            state = self._providers[provider] = ProviderLatency()
+        return state
+
+    def record_success(self, provider: str, seconds: float):
+        state = self._get(provider)
+        state.observe(seconds)
+        state.successes += 1
+        state.consecutive_failures = 0
+        state.unhealthy_until = 0.0
+
+    def record_failure(self, provider: str, seconds: float):
+        state = self._get(provider)
+        # 失败只会拉高延迟估计（如超时），快速失败不能让服务商显得更快
+        if state.ewma is None or seconds > state.ewma:
+            state.observe(seconds)
+        state.failures += 1
+        state.consecutive_failures += 1
+        if state.consecutive_failures >= ROUTER_FAILURE_THRESHOLD:
+            state.unhealthy_until = time.monotonic() + ROUTER_UNHEALTHY_COOLDOWN
+
+    def record_cancelled(self, provider: str, seconds: float):
+        """
+        对冲请求中落败被取消：真实延迟至少为已等待时长，仅在高于当前估计时计入
+        """
+        state = self._get(provider)
+        if state.ewma is None or seconds > state.ewma:
+            state.observe(seconds)
+
+    def estimate(self, provider: str) -> Optional[float]:
+        state = self._providers.get(provider)
+        return state.ewma if state else None
+
+    def p95(self, provider: str) -> Optional[float]:
+        state = self._providers.get(provider)
+        return state.p95() if state else None
+
+    def sample_count(self, provider: str) -> int:
+        state = self._providers.get(provider)
+        return len(state.samples) if state else 0
+
+    def is_healthy(self, provider: str) -> bool:
+        state = self._providers.get(provider)
+        return state is None or state.healthy(time.monotonic())
+
+    def stats(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        result = {}
+        for provider, state in self._providers.items():
+            p95 = state.p95()
+            result[provider] = {
+                "ewma_ms": int(state.ewma * 1000) if state.ewma is not None else None,
+                "p95_ms": int(p95 * 1000) if p95 is not None else None,
+                "samples": len(state.samples),
+                "successes": state.successes,
+                "failures": state.failures,
+                "healthy": state.healthy(now),
+            }
+        return result
+
+provider_latency = LatencyTracker()
@@ -0,0 +1,119 @@
+# @AI-Generated
+"""
+延迟感知路由：在调用方提供了 API Key 的服务商中选择延迟估计最低的健康服务商，
+超过对冲延迟仍未返回时向下一个服务商发起对冲请求，采用先返回的结果并取消另一个
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+from .llm_translation import translate_with_llm, UNCACHEABLE_RESULTS
+from .provider_latency import provider_latency
+from .circuit_breaker import provider_breakers
+from .logger import get_logger
+
+log = get_logger(__name__)
+
+ROUTER_DEFAULT_LATENCY = float(os.getenv("ROUTER_DEFAULT_LATENCY", "2.0"))          # 秒，无样本服务商的延迟估计
+ROUTER_HEDGE_DEFAULT_DELAY = float(os.getenv("ROUTER_HEDGE_DEFAULT_DELAY", "1.5"))  # 秒，样本不足时的对冲延迟
+ROUTER_HEDGE_MIN_DELAY = float(os.getenv("ROUTER_HEDGE_MIN_DELAY", "0.3"))
+ROUTER_HEDGE_MAX_DELAY = float(os.getenv("ROUTER_HEDGE_MAX_DELAY", "5.0"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))                      # 样本数达到后才用 p95 作对冲延迟
+
+ROUTABLE_PROVIDERS = ("chatgpt", "deepseek", "gemini", "huggingface")
+
+# 路由计数
+router_stats: Dict[str, int] = {
+    "routed": 0,       # 路由请求数
+    "hedged": 0,       # 发起对冲的次数
+    "hedge_wins": 0,   # 对冲请求先返回的次数
+    "failovers": 0,    # 请求失败后改发下一个服务商的次数
+}
+
+def rank_providers(api_keys: Dict[str, str]) -> List[str]:
+    """
+    按延迟估计（EWMA）从低到高排列有 API Key 且未熔断的服务商；全部不健康时仍返回全部
+    """
+    keyed = [p for p in ROUTABLE_PROVIDERS if api_keys.get(p)]
+    # 全部熔断时保留原列表，由熔断器快速失败
+    candidates = [p for p in keyed if not provider_breakers.is_open(p, api_keys[p])] or keyed
+    healthy = [p for p in candidates if provider_latency.is_healthy(p)] or candidates
+    def estimate(provider: str) -> float:
+        value = provider_latency.estimate(provider)
+        return ROUTER_DEFAULT_LATENCY if value is None else value
+    return sorted(healthy, key=estimate)
+
+def hedge_delay(provider: str) -> float:
+    """
+    对冲延迟：该服务商的 p95，限制在 [ROUTER_HEDGE_MIN_DELAY, ROUTER_HEDGE_MAX_DELAY]
+    """
+    if provider_latency.sample_count(provider) < ROUTER_MIN_SAMPLES:
+        return ROUTER_HEDGE_DEFAULT_DELAY
+    return min(max(provider_latency.p95(provider), ROUTER_HEDGE_MIN_DELAY), ROUTER_HEDGE_MAX_DELAY)
+
+async def translate_routed(
+    text: str,
+    source_language: str,
+    target_language: str,
+    api_keys: Dict[str, str]
+) -> Tuple[str, str]:
+    """
+    路由翻译，同时最多两个请求在途
+    :param api_keys: 服务商 -> API Key
+    :return: (译文, 实际采用的服务商)
+    """
+    ranked = rank_providers(api_keys)
+    if not ranked:
+        raise ValueError("没有可路由的服务商 API Key")
+    router_stats["routed"] += 1
+    owners: Dict[asyncio.Task, str] = {}
+
+    def launch(provider: str) -> asyncio.Task:
+        task = asyncio.ensure_future(
+            translate_with_llm(text, source_language, target_language, api_keys[provider], provider)
+        )
+        owners[task] = provider
+        return task
+
+    pending = {launch(ranked[0])}
+    next_index = 1
+    hedged = False
+    fallback: Optional[Tuple[str, str]] = None
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            can_hedge = next_index < len(ranked) and len(pending) < 2
+            # 对冲延迟取自仍在途的那个请求的服务商（对冲后备用请求先失败时，在途的是主服务商而不是最后发出的）
+            timeout = hedge_delay(owners[next(iter(pending))]) if can_hedge else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                provider = owners[task]
+                if task.exception() is not None:
+                    last_error = task.exception()
+                    log.warning("route_provider_failed", provider=provider, error=str(last_error))
+                    continue
+                result = task.result()
+                if result in UNCACHEABLE_RESULTS:
+                    fallback = fallback or (result, provider)
+                    continue
+                if hedged and provider != ranked[0]:
+                    router_stats["hedge_wins"] += 1
+                return result, provider
+            if next_index < len(ranked):
+                if not pending:
+                    # 在途请求全部失败，改发下一个服务商
+                    router_stats["failovers"] += 1
+                elif not done:
+                    # 超过对冲延迟仍未返回
+                    router_stats["hedged"] += 1
+                    hedged = True
+                else:
+                    continue
+                pending.add(launch(ranked[next_index]))
+                next_index += 1
+    finally:
+        # 取消落败的请求（单飞合并层在无其他等待者时才取消上游）
+        for task in pending:
+            task.cancel()
+    if fallback is not None:
+        return fallback
+    raise last_error
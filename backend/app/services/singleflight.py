@@ -0,0 +1,64 @@
+# @AI-Generated
+"""
+单飞（single-flight）合并：相同请求在进行中时，后来者等待同一个上游调用的结果
+"""
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+
+def key_fingerprint(api_key: str) -> str:
+    """
+    API Key 指纹，用于区分租户而不暴露原文
+    """
+    if not api_key:
+        return ''
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+class _Call:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    按 key 合并进行中的协程调用；单个等待者断开（被取消）不影响其他等待者，
+    所有等待者都取消后才取消上游调用
+    """
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.shared += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        return {"started": self.started, "shared": self.shared, "in_flight": self.in_flight}
+
+# 翻译与完整性检测共用的合并层
+provider_flight = SingleFlight()
@@ -0,0 +1,78 @@
+# @AI-Generated
+"""
+推测翻译：完整性检测与翻译同时发起，判定完整则采用译文，否则取消翻译
+"""
+import asyncio
+from typing import Dict, Optional, Tuple
+from .completeness.input_detector import is_input_complete
+from .llm_translation import translate_with_llm
+
+class SpeculationStats:
+    """
+    推测翻译计数，用于权衡成本与延迟
+    wasted：判定不完整而丢弃的推测；wasted_completed：丢弃时上游已完成（费用已产生，译文已进缓存）
+    """
+    def __init__(self):
+        self.started = 0
+        self.committed = 0
+        self.wasted = 0
+        self.wasted_completed = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "started": self.started,
+            "committed": self.committed,
+            "wasted": self.wasted,
+            "wasted_completed": self.wasted_completed,
+        }
+
+speculation_stats = SpeculationStats()
+
+def start_speculation(text: str, source_language: str, target_language: str, api_key: str, provider: str) -> asyncio.Task:
+    """
+    立即在后台发起翻译
+    """
+    speculation_stats.started += 1
+    return asyncio.ensure_future(translate_with_llm(text, source_language, target_language, api_key, provider))
+
+async def commit_speculation(task: asyncio.Task) -> str:
+    """
+    判定完整：采用推测结果
+    """
+    speculation_stats.committed += 1
+    return await task
+
+def discard_speculation(task: asyncio.Task):
+    """
+    判定不完整或输入已变化：取消推测翻译
+    """
+    speculation_stats.wasted += 1
+    if task.done():
+        speculation_stats.wasted_completed += 1
+        if not task.cancelled():
+            task.exception()  # 取出异常，避免 "exception was never retrieved"
+    else:
+        task.cancel()
+
+async def translate_if_complete(
+    text: str,
+    source_language: str,
+    target_language: str,
+    api_key: str,
+    provider: str,
+    context: str = None
+) -> Tuple[bool, Optional[str]]:
+    """
+    完整性检测与翻译并行
+    :return: (是否完整, 译文；不完整时为 None)
+    """
+    task = start_speculation(text, source_language, target_language, api_key, provider)
+    try:
+        is_complete = await is_input_complete(text, source_language, api_key, context, provider)
+    except BaseException:
+        discard_speculation(task)
+        raise
+    if not is_complete:
+        discard_speculation(task)
+        return False, None
+    return True, await commit_speculation(task)
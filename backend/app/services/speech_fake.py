@@ -0,0 +1,22 @@
+# @AI-Generated
+"""
+本地假语音识别服务：不调用外部接口，按音频长度返回固定格式的文本，用于测试流式识别等链路
+需设置 SPEECH_FAKE_PROVIDER=1 才能通过 provider=fake 使用
+"""
+import asyncio
+import os
+from fastapi import UploadFile
+from typing import Optional, Tuple
+from .audio_upload import upload_size
+
+SPEECH_FAKE_PROVIDER = os.getenv("SPEECH_FAKE_PROVIDER", "0") == "1"
+SPEECH_FAKE_LATENCY = float(os.getenv("SPEECH_FAKE_LATENCY", "0.05"))   # 秒，模拟识别耗时
+
+async def speech_to_text_fake(audio: UploadFile) -> Tuple[str, Optional[float]]:
+    """
+    :param audio: 16kHz 16 位单声道 PCM（raw）
+    :return: ("语音 N.NN 秒", 1.0)
+    """
+    seconds = upload_size(audio) / 32000
+    await asyncio.sleep(SPEECH_FAKE_LATENCY)
+    return f"语音 {seconds:.2f} 秒", 1.0
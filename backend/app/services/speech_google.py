@@ -1,24 +1,189 @@
 # @AI-Generated
 """
 Google Speech-to-Text 语音识别服务
+SDK 为同步 gRPC 调用，放到有界线程池执行，不阻塞事件循环；并发数超过上限的请求排队等待，
+等待超时直接报繁忙。客户端按服务账号指纹缓存复用（LRU + 空闲过期），避免每次请求重新解析凭据、建立连接
+淘汰的客户端立即关闭通道；仍有识别在线程中使用时，等最后一个识别结束再关闭
 """
 from google.cloud import speech_v1p1beta1 as speech
+from google.api_core import exceptions as google_exceptions
+import asyncio
 import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import UploadFile
-from typing import Optional, Tuple
-from .ai_base import Optional as BaseOptional
+from typing import Dict, Optional, Tuple
+from .ai_base import Optional as BaseOptional, ProviderError
+from .circuit_breaker import provider_breakers
+from .metrics import provider_call
+from .singleflight import provider_flight, key_fingerprint
+from .logger import get_logger
+from .audio_upload import ensure_upload_size
 
-async def speech_to_text_google(audio: UploadFile, api_key: str) -> Tuple[str, Optional[float]]:
-    content = await audio.read()
-    client = speech.SpeechClient.from_service_account_info(json.loads(api_key))
+GOOGLE_SPEECH_MAX_CONCURRENCY = int(os.getenv("GOOGLE_SPEECH_MAX_CONCURRENCY", "4"))      # 同时进行的识别数（线程池大小）
+GOOGLE_SPEECH_QUEUE_TIMEOUT = float(os.getenv("GOOGLE_SPEECH_QUEUE_TIMEOUT", "10"))       # 秒，排队等待上限
+GOOGLE_SPEECH_TIMEOUT = float(os.getenv("GOOGLE_SPEECH_TIMEOUT", "60"))                   # 秒，单次识别超时
+GOOGLE_SPEECH_CLIENT_CACHE = int(os.getenv("GOOGLE_SPEECH_CLIENT_CACHE", "16"))           # 缓存的客户端数量上限
+GOOGLE_SPEECH_CLIENT_IDLE_TTL = float(os.getenv("GOOGLE_SPEECH_CLIENT_IDLE_TTL", "1800"))  # 秒，空闲客户端关闭时间
+
+log = get_logger(__name__)
+
+class SpeechBusyError(Exception):
+    """
+    识别并发已满且排队超时
+    """
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} 语音识别繁忙，请稍后再试")
+        self.provider = provider
+        self.retry_after = retry_after
+
+# 线程池与并发上限一致，信号量保证线程池内不会积压任务
+_executor = ThreadPoolExecutor(max_workers=GOOGLE_SPEECH_MAX_CONCURRENCY, thread_name_prefix="google-speech")
+_slots = asyncio.Semaphore(GOOGLE_SPEECH_MAX_CONCURRENCY)
+
+class SpeechClientCache:
+    """
+    服务账号指纹 -> SpeechClient，按最近使用排序
+    """
+    def __init__(self, max_entries: int = GOOGLE_SPEECH_CLIENT_CACHE, idle_ttl: float = GOOGLE_SPEECH_CLIENT_IDLE_TTL):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        # 指纹 -> [客户端, 最近使用时间]
+        self._clients: "OrderedDict[str, list]" = OrderedDict()
+        # id(客户端) -> 正在进行的识别数；已淘汰但仍在使用的客户端等计数归零再关闭
+        self._in_use: Dict[int, int] = {}
+        self._retired: Dict[int, "speech.SpeechClient"] = {}
+        self.created = 0
+        self.evicted = 0
+
+    async def acquire(self, service_account_json: str) -> "speech.SpeechClient":
+        """
+        获取客户端，用完须调用 release
+        """
+        fingerprint = key_fingerprint(service_account_json)
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._clients.get(fingerprint)
+        if entry is not None:
+            entry[1] = now
+            self._clients.move_to_end(fingerprint)
+            client = entry[0]
+        else:
+            # 同一服务账号并发的首个请求只创建一个客户端
+            client = await provider_flight.do(
+                f"google_speech_client:{fingerprint}",
+                lambda: self._create(fingerprint, service_account_json)
+            )
+        self._in_use[id(client)] = self._in_use.get(id(client), 0) + 1
+        return client
+
+    def release(self, client: "speech.SpeechClient"):
+        count = self._in_use.get(id(client), 0) - 1
+        if count > 0:
+            self._in_use[id(client)] = count
+            return
+        self._in_use.pop(id(client), None)
+        retired = self._retired.pop(id(client), None)
+        if retired is not None:
+            self._close_client(retired)
+
+    async def _create(self, fingerprint: str, service_account_json: str) -> "speech.SpeechClient":
+        info = json.loads(service_account_json)
+        # 解析私钥、建立通道有一定耗时，同样放到线程池
+        client = await asyncio.get_running_loop().run_in_executor(
+            _executor, lambda: speech.SpeechClient.from_service_account_info(info)
+        )
+        self.created += 1
+        self._clients[fingerprint] = [client, time.monotonic()]
+        self._evict(time.monotonic())
+        return client
+
+    def _evict(self, now: float):
+        while self._clients:
+            fingerprint, (client, last_used) = next(iter(self._clients.items()))
+            if now - last_used < self.idle_ttl and len(self._clients) <= self.max_entries:
+                break
+            self._clients.popitem(last=False)
+            self.evicted += 1
+            if self._in_use.get(id(client)):
+                self._retired[id(client)] = client
+            else:
+                self._close_client(client)
+
+    def _close_client(self, client: "speech.SpeechClient"):
+        try:
+            client.transport.close()
+        except Exception as e:
+            log.warning("google_speech_client_close_failed", error=str(e))
+
+    def close(self):
+        """
+        关闭全部缓存的客户端（应用退出时调用）
+        """
+        while self._clients:
+            _, (client, _) = self._clients.popitem(last=False)
+            self._close_client(client)
+        while self._retired:
+            _, client = self._retired.popitem()
+            self._close_client(client)
+
+    def stats(self):
+        return {
+            "clients": len(self._clients), "retired": len(self._retired),
+            "created": self.created, "evicted": self.evicted
+        }
+
+speech_clients = SpeechClientCache()
+
+def _recognize(client, content: bytes) -> Tuple[str, Optional[float]]:
     audio_config = speech.RecognitionAudio(content=content)
     config = speech.RecognitionConfig(
         encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
         sample_rate_hertz=16000,
         language_code="zh-CN"
     )
-    response = client.recognize(config=config, audio=audio_config)
+    try:
+        response = client.recognize(config=config, audio=audio_config, timeout=GOOGLE_SPEECH_TIMEOUT)
+    except google_exceptions.GoogleAPICallError as e:
+        # 转成带 HTTP 状态码的错误，供熔断器区分认证失败与服务端错误
+        raise ProviderError(f"Google 语音识别错误: {e.message}", e.code or 500) from e
     if not response.results:
         return "", None
     result = response.results[0]
-    return result.alternatives[0].transcript, result.alternatives[0].confidence 
\ No newline at end of file
+    return result.alternatives[0].transcript, result.alternatives[0].confidence
+
+async def speech_to_text_google(audio: UploadFile, api_key: str) -> Tuple[str, Optional[float]]:
+    # 同步识别接口要求整段音频内容，只能整体读入
+    ensure_upload_size(audio)
+    content = await audio.read()
+    client = await speech_clients.acquire(api_key)
+    future = None
+    try:
+        with provider_breakers.guard("google", api_key):
+            try:
+                await asyncio.wait_for(_slots.acquire(), GOOGLE_SPEECH_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise SpeechBusyError("google", GOOGLE_SPEECH_QUEUE_TIMEOUT)
+            try:
+                with provider_call("google", "speech") as call:
+                    future = asyncio.get_running_loop().run_in_executor(_executor, _recognize, client, content)
+                    text, confidence = await asyncio.shield(future)
+            finally:
+                # 线程中的调用无法取消：请求被取消时名额等线程跑完再释放，保证线程池不积压
+                if future is not None and not future.done():
+                    future.add_done_callback(lambda _: _slots.release())
+                else:
+                    _slots.release()
+    finally:
+        # 同理，客户端等线程用完再归还，淘汰后才能安全关闭
+        if future is not None and not future.done():
+            future.add_done_callback(lambda _: speech_clients.release(client))
+        else:
+            speech_clients.release(client)
+    log.debug("provider_call", provider="google", endpoint="recognize", duration_ms=round(call.duration * 1000))
+    return text, confidence
+
+def close_google_clients():
+    speech_clients.close()
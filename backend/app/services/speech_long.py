@@ -0,0 +1,201 @@
+# @AI-Generated
+"""
+长音频分段并行识别：预处理为 16kHz 单声道后在停顿处切成相互重叠的分段，
+各分段在服务商并发上限内同时识别，每段完成即推送；按顺序拼接并去掉重叠部分重复识别出的文字
+总耗时随并发数而不是音频时长增长，单段不超过服务商的大小与超时限制
+"""
+import asyncio
+import os
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import numpy as np
+from fastapi import UploadFile
+from .audio_normalize import normalize_upload, AudioDecodeError, AUDIO_TARGET_RATE
+from .audio_upload import pcm_upload
+from .speech_router import speech_to_text_with_llm, PCM_CONTAINERS
+from .speech_fake import SPEECH_FAKE_PROVIDER
+from .vad import frame_energy_db
+from .logger import get_logger
+
+SPEECH_LONG_MAX_BYTES = int(os.getenv("SPEECH_LONG_MAX_BYTES", str(100 * 1024 * 1024)))   # 长音频上传上限
+SPEECH_LONG_CHUNK_MS = int(os.getenv("SPEECH_LONG_CHUNK_MS", "30000"))                     # 分段最长（不含重叠）
+SPEECH_LONG_MIN_CHUNK_MS = int(os.getenv("SPEECH_LONG_MIN_CHUNK_MS", "10000"))             # 分段最短，在此之后找停顿
+SPEECH_LONG_OVERLAP_MS = int(os.getenv("SPEECH_LONG_OVERLAP_MS", "1000"))                  # 相邻分段的重叠
+# 各服务商同时识别的分段数（所有长音频请求共享），格式同 RATE_LIMIT_ROUTES："服务商=并发数"，逗号分隔
+SPEECH_LONG_CONCURRENCY = os.getenv("SPEECH_LONG_CONCURRENCY", "openai=4,google=4,xfyun=2,fake=4")
+SPEECH_LONG_DEFAULT_CONCURRENCY = 2
+
+# 找切分点的帧长与平滑窗口（平滑后短暂的弱音不会被当作停顿，优先切在较长的停顿里）
+_SPLIT_FRAME_MS = 20
+_SPLIT_SMOOTH_FRAMES = 10
+# 重叠去重：中日韩文字按字符比较，以空格分词的文字按整词比较；重叠过短时不去重，避免误删
+_MAX_OVERLAP_CHARS = 40
+_MIN_OVERLAP_CHARS = 3
+_MAX_OVERLAP_WORDS = 15
+_MIN_OVERLAP_WORDS = 2
+_PUNCTUATION = "，。！？、；：,.!?;: \t\n"
+_CJK_CHAR_RE = re.compile(r'[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]')
+
+log = get_logger(__name__)
+
+def parse_concurrency(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        provider, value = item.split("=", 1)
+        limits[provider.strip()] = max(1, int(value))
+    return limits
+
+_limits = parse_concurrency(SPEECH_LONG_CONCURRENCY)
+_slots: Dict[str, asyncio.Semaphore] = {}
+
+def provider_slots(provider: str) -> asyncio.Semaphore:
+    if provider not in _slots:
+        _slots[provider] = asyncio.Semaphore(_limits.get(provider, SPEECH_LONG_DEFAULT_CONCURRENCY))
+    return _slots[provider]
+
+def split_chunks(samples: np.ndarray, sample_rate: int = AUDIO_TARGET_RATE) -> List[Tuple[int, int]]:
+    """
+    在停顿处切分，相邻分段重叠 SPEECH_LONG_OVERLAP_MS
+    :param samples: int16 采样
+    :return: [(起始采样, 结束采样)]
+    """
+    total = len(samples)
+    frame_len = sample_rate * _SPLIT_FRAME_MS // 1000
+    max_len = sample_rate * SPEECH_LONG_CHUNK_MS // 1000
+    min_len = min(sample_rate * SPEECH_LONG_MIN_CHUNK_MS // 1000, max_len)
+    overlap = sample_rate * SPEECH_LONG_OVERLAP_MS // 1000
+    energies = frame_energy_db(samples, frame_len)
+    window = np.ones(_SPLIT_SMOOTH_FRAMES, dtype=np.float32) / _SPLIT_SMOOTH_FRAMES
+    smoothed = np.convolve(energies, window, mode="same") if len(energies) >= _SPLIT_SMOOTH_FRAMES else energies
+    chunks = []
+    start = 0
+    while total - start > max_len:
+        low, high = (start + min_len) // frame_len, (start + max_len) // frame_len
+        candidates = smoothed[low:high]
+        if len(candidates):
+            # 切在最安静的一段停顿的中间
+            quiet = candidates <= candidates.min() + 1
+            first = int(np.argmax(quiet))
+            run = int(np.argmin(quiet[first:])) or len(candidates) - first
+            cut = (low + first + run // 2) * frame_len
+        else:
+            cut = start + max_len
+        # 分段最短不足一帧时 cut 可能等于 start，至少前进一帧
+        cut = max(cut, start + frame_len)
+        chunks.append((max(start - overlap, 0), cut))
+        start = cut
+    chunks.append((max(start - overlap, 0), total))
+    return chunks
+
+def _word_key(word: str) -> str:
+    return word.strip(_PUNCTUATION + "\"'").lower()
+
+def merge_overlap(previous: str, current: str) -> str:
+    """
+    去掉 current 开头与 previous 结尾重复的部分（重叠音频被两段都识别出来）
+    :return: 应追加的文本
+    """
+    current = current.strip()
+    if _CJK_CHAR_RE.search(current[:_MIN_OVERLAP_CHARS]):
+        tail = previous.rstrip(_PUNCTUATION)[-_MAX_OVERLAP_CHARS:]
+        for size in range(min(len(tail), len(current)), _MIN_OVERLAP_CHARS - 1, -1):
+            if tail.endswith(current[:size]):
+                return current[size:].lstrip(_PUNCTUATION)
+        return current
+    # 按空白分词，重叠必须由完整的词组成
+    tail_words = [_word_key(word) for word in previous.split()[-_MAX_OVERLAP_WORDS:]]
+    words = current.split()
+    keys = [_word_key(word) for word in words]
+    for size in range(min(len(tail_words), len(words)), _MIN_OVERLAP_WORDS - 1, -1):
+        if tail_words[-size:] == keys[:size]:
+            return " ".join(words[size:]).lstrip(_PUNCTUATION)
+    return current
+
+def _join(previous: str, addition: str) -> str:
+    # 英文等以空格分词的文字在拼接处补空格
+    if previous and addition and previous[-1].isascii() and previous[-1].isalnum() and addition[0].isascii() and addition[0].isalnum():
+        return " " + addition
+    return addition
+
+async def prepare_long_audio(audio: UploadFile, provider: str) -> bytes:
+    """
+    校验服务商并预处理音频
+    :return: 16kHz 16 位单声道 PCM（已裁掉首尾静音）
+    """
+    if provider not in PCM_CONTAINERS or (provider == "fake" and not SPEECH_FAKE_PROVIDER):
+        raise ValueError(f"不支持的语音识别服务商: {provider}")
+    pcm = await normalize_upload(audio, PCM_CONTAINERS[provider], SPEECH_LONG_MAX_BYTES, always=True)
+    if pcm is None:
+        raise AudioDecodeError("无法解码该音频，长音频需为 WAV/PCM，或在服务器安装 ffmpeg")
+    return pcm
+
+async def transcribe_long(pcm: bytes, provider: str, credentials: dict) -> AsyncIterator[dict]:
+    """
+    分段并行识别，依次产出事件：
+      {"type": "plan", "chunks", "duration_ms"}
+      {"type": "chunk", "index", "start_ms", "end_ms", "text", "confidence"}（按完成顺序）
+      {"type": "error", "index", "detail"}（该段识别失败，按空文本拼接）
+      {"type": "text", "text", "chunks"}（按顺序拼接、去重后新增的文本，chunks 为已拼接的分段数）
+      {"type": "done", "text", "chunks", "failed", "total_ms"}
+    :param credentials: llm_api_key / xfyun_* 参数
+    """
+    started = time.monotonic()
+    samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype="<i2")
+    bounds = split_chunks(samples) if len(samples) else []
+    yield {"type": "plan", "chunks": len(bounds), "duration_ms": len(samples) * 1000 // AUDIO_TARGET_RATE}
+
+    results: "asyncio.Queue[tuple]" = asyncio.Queue()
+    slots = provider_slots(provider)
+
+    async def recognize(index: int, start: int, end: int):
+        async with slots:
+            try:
+                upload = pcm_upload(pcm[start * 2:end * 2], AUDIO_TARGET_RATE, PCM_CONTAINERS[provider])
+                # 整段已预处理，分段不再重复转换
+                text, confidence = await speech_to_text_with_llm(upload, provider, normalize=False, **credentials)
+                results.put_nowait((index, text or "", confidence, None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                results.put_nowait((index, None, None, e))
+
+    tasks = [asyncio.create_task(recognize(index, start, end)) for index, (start, end) in enumerate(bounds)]
+    texts: List[Optional[str]] = [None] * len(bounds)
+    stitched = ""
+    next_index = 0
+    failed = 0
+    try:
+        for _ in bounds:
+            index, text, confidence, error = await results.get()
+            start, end = bounds[index]
+            if error is not None:
+                failed += 1
+                texts[index] = ""
+                log.warning("speech_long_chunk_failed", provider=provider, index=index, error=str(error))
+                yield {"type": "error", "index": index, "detail": f"语音识别失败: {error}"}
+            else:
+                texts[index] = text
+                yield {
+                    "type": "chunk", "index": index, "text": text, "confidence": confidence,
+                    "start_ms": start * 1000 // AUDIO_TARGET_RATE, "end_ms": end * 1000 // AUDIO_TARGET_RATE
+                }
+            # 前面的分段都已完成时按顺序拼接
+            addition = ""
+            while next_index < len(bounds) and texts[next_index] is not None:
+                merged = merge_overlap(stitched, texts[next_index])
+                merged = _join(stitched, merged) if merged else ""
+                stitched += merged
+                addition += merged
+                next_index += 1
+            if addition:
+                yield {"type": "text", "text": addition, "chunks": next_index}
+    finally:
+        # 客户端断开时取消尚未完成的分段
+        for task in tasks:
+            task.cancel()
+    total_ms = int((time.monotonic() - started) * 1000)
+    log.info("speech_long_done", provider=provider, chunks=len(bounds), failed=failed, total_ms=total_ms)
+    yield {"type": "done", "text": stitched, "chunks": len(bounds), "failed": failed, "total_ms": total_ms}
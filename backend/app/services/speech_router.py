@@ -7,6 +7,12 @@ from typing import Optional, Tuple
 from .speech_openai import speech_to_text_openai
 from .speech_google import speech_to_text_google
 from .speech_xfyun import speech_to_text_xfyun
+from .speech_fake import speech_to_text_fake, SPEECH_FAKE_PROVIDER
+from .audio_normalize import normalize_upload, AUDIO_TARGET_RATE
+from .audio_upload import pcm_upload
+
+# 各服务商期望的音频容器：Whisper 需要带格式头的文件，Google（LINEAR16）与讯飞（raw）为 16kHz 裸 PCM
+PCM_CONTAINERS = {"openai": "wav", "google": "raw", "xfyun": "raw", "fake": "raw"}
 
 async def speech_to_text_with_llm(
     audio: UploadFile,
@@ -14,16 +20,28 @@ async def speech_to_text_with_llm(
     llm_api_key: str = None,
     xfyun_app_id: str = None,
     xfyun_api_key: str = None,
-    xfyun_api_secret: str = None
+    xfyun_api_secret: str = None,
+    normalize: bool = True
 ) -> Tuple[str, Optional[float]]:
     """
     调用大模型或第三方API进行语音识别，支持 openai/google/xfyun
+    :param normalize: 服务商不能直接接受时先转为 16kHz 单声道并裁掉首尾静音，再按服务商需要的容器上传；
+        无需转换（Whisper 的压缩格式、16kHz 单声道 WAV 等）或无法解码的音频原样上传
     """
+    if normalize and llm_provider in PCM_CONTAINERS:
+        pcm = await normalize_upload(audio, PCM_CONTAINERS[llm_provider])
+        if pcm is not None:
+            # 全部为静音，无需调用服务商
+            if not pcm:
+                return "", None
+            audio = pcm_upload(pcm, AUDIO_TARGET_RATE, PCM_CONTAINERS[llm_provider])
     if llm_provider == "openai":
         return await speech_to_text_openai(audio, llm_api_key)
     elif llm_provider == "google":
         return await speech_to_text_google(audio, llm_api_key)
     elif llm_provider == "xfyun":
         return await speech_to_text_xfyun(audio, xfyun_app_id, xfyun_api_key, xfyun_api_secret)
+    elif llm_provider == "fake" and SPEECH_FAKE_PROVIDER:
+        return await speech_to_text_fake(audio)
     else:
         raise ValueError(f"不支持的语音识别服务商: {llm_provider}") 
\ No newline at end of file
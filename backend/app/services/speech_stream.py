@@ -0,0 +1,157 @@
+# @AI-Generated
+"""
+流式语音识别会话：单个 WebSocket 连接持续接收 PCM 音频，VAD 分句后逐句送服务商识别，
+推送中间结果与最终结果；识别并发进行，最终结果按句子顺序推送
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Optional
+from .vad import EnergyVAD
+from .audio_upload import pcm_upload
+from .speech_router import speech_to_text_with_llm, PCM_CONTAINERS
+from .speech_fake import SPEECH_FAKE_PROVIDER
+from .logger import get_logger
+
+STREAM_MAX_PENDING = int(os.getenv("SPEECH_STREAM_MAX_PENDING", "4"))            # 每个连接同时识别的句子数上限
+STREAM_INTERIM_MS = int(os.getenv("SPEECH_STREAM_INTERIM_MS", "1500"))           # 中间结果的识别间隔（按音频时长）
+STREAM_MAX_SAMPLE_RATE = 48000
+
+log = get_logger(__name__)
+
+class SpeechStreamSession:
+    """
+    客户端依次发送 config、若干二进制 PCM 帧（16 位小端单声道）、end；
+    新句子开始时推送 speech_start，开启 interim 时句子进行中定期推送 interim，句子结束后推送 final
+    """
+    def __init__(self, send: Callable[[dict], Awaitable[None]]):
+        self._send = send
+        self.provider: Optional[str] = None
+        self.credentials: dict = {}
+        self.sample_rate = 16000
+        self.interim = False
+        self.vad: Optional[EnergyVAD] = None
+        self._seq = 0
+        self._last_final: Optional[asyncio.Task] = None
+        self._pending: "set[asyncio.Task]" = set()
+        self._interim_task: Optional[asyncio.Task] = None
+        self._interim_at = 0            # 上次发起中间识别时句子的字节数
+
+    def configure(self, message: dict):
+        """
+        设置服务商、凭据与音频参数；重新配置会丢弃进行中的句子
+        """
+        provider = message.get('provider')
+        if not isinstance(provider, str) or provider not in PCM_CONTAINERS or (provider == "fake" and not SPEECH_FAKE_PROVIDER):
+            raise ValueError(f"不支持的语音识别服务商: {provider}")
+        sample_rate = message.get('sample_rate', 16000)
+        if isinstance(sample_rate, bool) or not isinstance(sample_rate, int) or not 8000 <= sample_rate <= STREAM_MAX_SAMPLE_RATE:
+            raise ValueError(f"不支持的采样率: {sample_rate}")
+        interim = message.get('interim', False)
+        if not isinstance(interim, bool):
+            raise ValueError(f"interim 必须是布尔值: {interim}")
+        for name in ('api_key', 'xfyun_app_id', 'xfyun_api_key', 'xfyun_api_secret'):
+            if message.get(name) is not None and not isinstance(message[name], str):
+                raise ValueError(f"{name} 必须是字符串")
+        self.provider = provider
+        self.sample_rate = sample_rate
+        self.interim = interim
+        self.credentials = {
+            "llm_api_key": message.get('api_key'),
+            "xfyun_app_id": message.get('xfyun_app_id'),
+            "xfyun_api_key": message.get('xfyun_api_key'),
+            "xfyun_api_secret": message.get('xfyun_api_secret'),
+        }
+        self.vad = EnergyVAD(sample_rate)
+
+    async def on_audio(self, pcm: bytes):
+        if self.vad is None:
+            raise ValueError("请先发送 config 消息")
+        was_speaking = self.vad.in_speech
+        for audio, start_ms, end_ms in self.vad.feed(pcm):
+            await self._finalize(audio, start_ms, end_ms)
+            was_speaking = False
+        if self.vad.in_speech:
+            if not was_speaking:
+                self._interim_at = 0
+                await self._send({"type": "speech_start", "seq": self._seq})
+            self._maybe_interim()
+
+    async def on_end(self):
+        """
+        音频结束：进行中的句子直接结束，等所有识别完成后推送 done
+        """
+        if self.vad is not None:
+            utterance = self.vad.flush()
+            if utterance is not None:
+                await self._finalize(*utterance)
+        if self._last_final is not None:
+            await asyncio.gather(self._last_final, return_exceptions=True)
+        await self._send({"type": "done", "utterances": self._seq})
+
+    async def _finalize(self, audio: bytes, start_ms: int, end_ms: int):
+        # 超出并发上限时等待最早的识别完成，读取端随之放缓（背压）
+        while len(self._pending) >= STREAM_MAX_PENDING:
+            await asyncio.wait(self._pending, return_when=asyncio.FIRST_COMPLETED)
+        self._cancel_interim()
+        seq = self._seq
+        self._seq += 1
+        task = asyncio.create_task(self._recognize_final(seq, audio, start_ms, end_ms, self._last_final))
+        self._last_final = task
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _recognize_final(self, seq: int, audio: bytes, start_ms: int, end_ms: int, previous: Optional[asyncio.Task]):
+        try:
+            text, confidence = await self._recognize(audio)
+            message = {
+                "type": "final", "seq": seq, "text": text, "confidence": confidence,
+                "start_ms": start_ms, "end_ms": end_ms
+            }
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning("speech_stream_recognize_failed", provider=self.provider, seq=seq, error=str(e))
+            message = {"type": "error", "seq": seq, "detail": f"语音识别失败: {e}"}
+        # 按句子顺序推送：等前一句推送完成
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        await self._send(message)
+
+    def _maybe_interim(self):
+        if not self.interim or (self._interim_task is not None and not self._interim_task.done()):
+            return
+        audio = self.vad.current_audio()
+        if len(audio) - self._interim_at < self.sample_rate * 2 * STREAM_INTERIM_MS // 1000:
+            return
+        self._interim_at = len(audio)
+        self._interim_task = asyncio.create_task(self._recognize_interim(self._seq, audio))
+
+    async def _recognize_interim(self, seq: int, audio: bytes):
+        try:
+            text, _ = await self._recognize(audio)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.debug("speech_stream_interim_failed", provider=self.provider, seq=seq, error=str(e))
+            return
+        # 句子已结束则丢弃过时的中间结果
+        if seq == self._seq and self.vad is not None and self.vad.in_speech:
+            await self._send({"type": "interim", "seq": seq, "text": text})
+
+    def _cancel_interim(self):
+        if self._interim_task is not None and not self._interim_task.done():
+            self._interim_task.cancel()
+        self._interim_task = None
+
+    async def _recognize(self, audio: bytes):
+        # 16kHz 直接按服务商需要的容器上传；其他采样率带 WAV 头上传，由统一调度重采样
+        container = PCM_CONTAINERS[self.provider] if self.sample_rate == 16000 else "wav"
+        upload = pcm_upload(audio, self.sample_rate, container)
+        return await speech_to_text_with_llm(upload, self.provider, **self.credentials)
+
+    def cancel(self):
+        self._cancel_interim()
+        for task in list(self._pending):
+            task.cancel()
+        self._pending.clear()
+        self._last_final = None
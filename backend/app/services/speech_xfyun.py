@@ -1,8 +1,11 @@
 # @AI-Generated
 """
-讯飞语音识别服务
+讯飞语音识别服务：音频分块 base64 编码后流式写入表单请求体
 """
-import httpx
+from .http_client import get_client
+from .audio_upload import ensure_upload_size, urlencoded_base64_upload
+from .metrics import provider_call
+from .logger import get_logger
 import hashlib
 import base64
 import time
@@ -11,11 +14,12 @@ import json
 from fastapi import UploadFile
 from typing import Optional, Tuple
 
+log = get_logger(__name__)
+
 async def speech_to_text_xfyun(audio: UploadFile, app_id: str, api_key: str, api_secret: str) -> Tuple[str, Optional[float]]:
     url = "https://iat-api.xfyun.cn/v2/iat"
     ts = str(int(time.time()))
-    body = await audio.read()
-    body_base64 = base64.b64encode(body).decode()
+    ensure_upload_size(audio)
     param = base64.b64encode(json.dumps({
         "engine_type": "sms16k",
         "aue": "raw",
@@ -31,12 +35,12 @@ async def speech_to_text_xfyun(audio: UploadFile, app_id: str, api_key: str, api
         "X-Signa": signa,
         "Content-Type": "application/x-www-form-urlencoded; charset=utf-8"
     }
-    data = {"audio": body_base64}
-    start = time.time()
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(url, headers=headers, data=data, timeout=60)
-    duration = time.time() - start
-    print(f"[LLM耗时] provider=xfyun, 接口=iat-api, 耗时: {duration:.2f}秒")
+    length, body = await urlencoded_base64_upload(audio, "audio")
+    headers["Content-Length"] = str(length)
+    with provider_call("xfyun", "speech") as call:
+        resp = await get_client("xfyun").post(url, headers=headers, content=body, timeout=60)
+        call.status = resp.status_code
+    log.debug("provider_call", provider="xfyun", endpoint="iat-api", duration_ms=round(call.duration * 1000))
     result = resp.json()
     if result.get("code") != "0":
         raise Exception(f"讯飞API错误: {result.get('desc')}")
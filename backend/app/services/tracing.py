@@ -0,0 +1,345 @@
+# @AI-Generated
+"""
+请求链路追踪：以请求 ID 作为 trace ID，经 contextvars 在服务调用间传递（asyncio 任务创建时自动继承）
+按 TRACE_SAMPLE_RATE 采样，未采样的请求只有一次上下文变量读取的开销；
+结束的 span 放入有界队列，由后台线程批量导出到本地文件（每行一个 OTLP JSON span）或 OTLP/HTTP 收集器
+"""
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+import httpx
+from .logger import get_logger, register_context
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))           # 0~1，0 表示不记录 span
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file")                     # file / otlp
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ai-translation-server")
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))           # 队列满时丢弃 span，不阻塞请求
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "512"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "2"))     # 秒
+REQUEST_ID_MAX_LENGTH = 128                                              # 更长的 X-Request-ID 不沿用
+
+log = get_logger(__name__)
+
+# OTLP span 状态码：出错
+STATUS_ERROR = 2
+
+def _new_id(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+def _is_hex(value: str, length: int) -> bool:
+    if len(value) != length:
+        return False
+    try:
+        return int(value, 16) != 0
+    except ValueError:
+        return False
+
+class Span:
+    """
+    一个计时区间；sampled 为 False 时只携带 trace ID 与请求 ID，不记录也不导出
+    request_id 为调用方传入的原始请求 ID，未传入时与 trace ID 相同
+    """
+    __slots__ = ('trace_id', 'request_id', 'span_id', 'parent_id', 'name', 'sampled', 'attributes', 'start_ns', 'end_ns', 'status', 'error')
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, sampled: bool, request_id: Optional[str] = None):
+        self.trace_id = trace_id
+        self.request_id = request_id or trace_id
+        self.span_id = _new_id(8) if sampled else ''
+        self.parent_id = parent_id
+        self.name = name
+        self.sampled = sampled
+        self.attributes: Dict[str, object] = {}
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = 0
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status:
+            span["status"] = {"code": self.status, "message": self.error} if self.error else {"code": self.status}
+        return span
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+def current_trace_id() -> Optional[str]:
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+def _log_context() -> Dict[str, str]:
+    span = _current.get()
+    if span is None:
+        return {}
+    if span.request_id == span.trace_id:
+        return {"request_id": span.request_id}
+    return {"request_id": span.request_id, "trace_id": span.trace_id}
+
+# 链路中的日志带上请求 ID
+register_context(_log_context)
+
+def parse_traceparent(header: str) -> Tuple[Optional[str], Optional[str], Optional[bool]]:
+    """
+    解析 W3C traceparent（00-<trace_id>-<parent_id>-<flags>）
+    :return: (trace_id, parent_id, 上游是否采样)，格式不合法时全为 None
+    """
+    parts = header.strip().split("-")
+    if len(parts) != 4 or not _is_hex(parts[1], 32) or not _is_hex(parts[2], 16):
+        return None, None, None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None, None, None
+    return parts[1].lower(), parts[2].lower(), sampled
+
+def trace_id_for(request_id: str) -> str:
+    """
+    由调用方的请求 ID 得出 trace ID：32 位十六进制（含去掉连字符的 UUID）直接使用，其他格式取 SHA-256 前 32 位
+    """
+    compact = request_id.replace("-", "").lower()
+    if _is_hex(compact, 32):
+        return compact
+    return hashlib.sha256(request_id.encode("utf-8")).hexdigest()[:32]
+
+@contextmanager
+def start_trace(
+    name: str,
+    request_id: Optional[str] = None,
+    traceparent: Optional[str] = None,
+    **attributes
+) -> Iterator[Span]:
+    """
+    开始一条链路（根 span）
+    :param request_id: 调用方传入的请求 ID（任意格式，原样保留并记录），由它得出 trace ID；否则生成新的
+    :param traceparent: W3C traceparent 头，提供时沿用上游的 trace ID、父 span 与采样决定
+    """
+    request_id = request_id.strip() if request_id else None
+    if request_id and len(request_id) > REQUEST_ID_MAX_LENGTH:
+        request_id = None
+    trace_id, parent_id, sampled = parse_traceparent(traceparent) if traceparent else (None, None, None)
+    if trace_id is None:
+        trace_id = trace_id_for(request_id) if request_id else _new_id(16)
+    if sampled is None:
+        sampled = TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE
+    root = Span(trace_id, parent_id, name, sampled, request_id)
+    if request_id:
+        attributes = dict(attributes, request_id=request_id)
+    with _activate(root, attributes) as span:
+        yield span
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    在当前链路下开始子 span；不在链路中或未采样时返回不记录的 span
+    """
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        yield parent or _UNTRACED
+        return
+    child = Span(parent.trace_id, parent.span_id, name, True, parent.request_id)
+    with _activate(child, attributes) as active:
+        yield active
+
+@contextmanager
+def _activate(active: Span, attributes: dict) -> Iterator[Span]:
+    if active.sampled:
+        active.attributes.update(attributes)
+    token = _current.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.status = STATUS_ERROR
+        active.error = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # 异步生成器在其他上下文中被关闭时 token 不可用
+            pass
+        if active.sampled:
+            active.end_ns = time.time_ns()
+            _exporter.submit(active)
+
+_UNTRACED = Span("", None, "", False)
+
+class SpanExporter:
+    """
+    span 批量导出：请求路径只做一次非阻塞入队，写文件/发网络请求在后台线程完成
+    """
+    def __init__(self, max_queue: int = TRACE_QUEUE_SIZE, batch_size: int = TRACE_BATCH_SIZE, interval: float = TRACE_FLUSH_INTERVAL):
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, finished: Span):
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, timeout: float = 5):
+        """
+        停止后台线程，导出队列中剩余的 span
+        """
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+        self.close()
+
+    def _run(self):
+        while True:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                self._export_safely(batch)
+            if stop:
+                return
+
+    def _export_safely(self, batch: List[Span]):
+        try:
+            self.export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            log.warning("span_export_failed", spans=len(batch), error=str(e))
+
+    def export(self, batch: List[Span]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+class FileSpanExporter(SpanExporter):
+    """
+    追加写入本地 JSON Lines 文件，每行一个 OTLP JSON 格式的 span（附 service 字段）
+    """
+    def __init__(self, path: str = TRACE_FILE, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._file = None
+
+    def export(self, batch: List[Span]):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        lines = []
+        for finished in batch:
+            record = finished.to_otlp()
+            record["service"] = TRACE_SERVICE_NAME
+            lines.append(json.dumps(record, ensure_ascii=False))
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class OTLPSpanExporter(SpanExporter):
+    """
+    以 OTLP/HTTP JSON 发送到收集器（如 OpenTelemetry Collector、Jaeger、Tempo 的 /v1/traces）
+    """
+    def __init__(self, endpoint: str = TRACE_OTLP_ENDPOINT, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self._client: Optional[httpx.Client] = None
+
+    def export(self, batch: List[Span]):
+        if self._client is None:
+            self._client = httpx.Client(timeout=5)
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", TRACE_SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "app.services.tracing"}, "spans": [s.to_otlp() for s in batch]}],
+            }]
+        }
+        resp = self._client.post(self.endpoint, json=payload)
+        resp.raise_for_status()
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+def create_exporter(kind: str = TRACE_EXPORTER) -> SpanExporter:
+    if kind == "file":
+        return FileSpanExporter()
+    if kind == "otlp":
+        return OTLPSpanExporter()
+    raise ValueError(f"不支持的链路追踪导出方式: {kind}")
+
+_exporter: SpanExporter = create_exporter()
+
+def init_tracing():
+    """
+    启动导出线程（由 FastAPI lifespan 调用）；采样率为 0 时仍可能有上游 traceparent 要求采样的请求
+    """
+    _exporter.start()
+
+def shutdown_tracing():
+    _exporter.shutdown()
+
+def tracing_stats() -> Dict[str, object]:
+    return dict(_exporter.stats(), sample_rate=TRACE_SAMPLE_RATE, exporter=TRACE_EXPORTER)
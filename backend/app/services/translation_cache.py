@@ -0,0 +1,189 @@
+# @AI-Generated
+"""
+翻译结果两级缓存：进程内 LRU+TTL（按字节限额）+ 可选 SQLite(WAL) 磁盘层
+磁盘层可跨重启保留，并被同机多个 uvicorn worker 共享
+"""
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# 缓存配置，可通过环境变量覆盖
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", "3600"))                 # 秒
+TRANSLATION_CACHE_MAX_BYTES = int(os.getenv("TRANSLATION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB", "")                              # 为空则不启用磁盘层
+
+# 每条记录的固定开销估算（OrderedDict 节点、元组、float 等）
+_ENTRY_OVERHEAD = 200
+
+# NFKC 不会折叠的中文标点，单独映射为半角
+_PUNCT_FOLD = str.maketrans({
+    '。': '.', '、': ',', '「': '"', '」': '"', '『': '"', '』': '"',
+    '【': '[', '】': ']', '《': '<', '》': '>', '“': '"', '”': '"', '‘': "'", '’': "'",
+})
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    """
+    归一化缓存文本：去首尾空白、合并连续空白、全角/半角标点折叠
+    """
+    text = unicodedata.normalize('NFKC', text).translate(_PUNCT_FOLD)
+    return _WHITESPACE_RE.sub(' ', text.strip())
+
+def make_cache_key(text: str, source_language: str, target_language: str, provider: str) -> str:
+    """
+    生成缓存键，只包含文本、语言对和服务商，不包含 API Key
+    """
+    raw = "\x1f".join((provider, source_language, target_language, normalize_text(text)))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class MemoryLRUCache:
+    """
+    进程内 LRU+TTL 缓存，按估算字节数限额
+    """
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at, size = item
+        if expires_at < time.time():
+            del self._data[key]
+            self._bytes -= size
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None):
+        size = len(key) + len(value.encode('utf-8')) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        old = self._data.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        self._data[key] = (value, expires_at or time.time() + self.ttl, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+class SQLiteCache:
+    """
+    磁盘缓存层，WAL 模式允许多进程并发读写
+    """
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translation_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM translation_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0], row[1]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translation_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl)
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM translation_cache WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class TranslationCache:
+    """
+    两级翻译缓存，先查内存，未命中再查磁盘并回填内存
+    """
+    def __init__(self, max_bytes: int = TRANSLATION_CACHE_MAX_BYTES, ttl: float = TRANSLATION_CACHE_TTL, db_path: str = TRANSLATION_CACHE_DB):
+        self.memory = MemoryLRUCache(max_bytes, ttl)
+        self.disk = SQLiteCache(db_path, ttl) if db_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.disk is not None:
+            row = await asyncio.to_thread(self.disk.get, key)
+            if row is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self.memory.set(key, row[0], row[1])
+                return row[0]
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": len(self.memory),
+            "bytes": self.memory.bytes,
+            "max_bytes": self.memory.max_bytes,
+        }
+
+    def clear(self):
+        self.memory.clear()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.purge_expired()
+            self.disk.close()
+            self.disk = None
+
+translation_cache = TranslationCache()
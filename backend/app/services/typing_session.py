@@ -0,0 +1,107 @@
+# @AI-Generated
+"""
+输入会话：单个 WebSocket 连接的服务端触发检测与翻译推送
+"""
+import asyncio
+from typing import Awaitable, Callable, Optional
+from .completeness.trigger_detector import InputTriggerDetector, PAUSE_THRESHOLD_LONG, PAUSE_COUNTER_LIMIT
+from .llm_translation import translate_with_llm
+from .incremental_translation import translate_incremental
+from .speculative_translation import start_speculation, commit_speculation, discard_speculation
+from .tracing import start_trace
+
+# 文本未变动时的复检间隔（ms），PAUSE_COUNTER_LIMIT 次复检后视为用户停顿
+PAUSE_TICK_INTERVAL = PAUSE_THRESHOLD_LONG // PAUSE_COUNTER_LIMIT
+
+class TypingSession:
+    """
+    每个连接独立的触发检测状态；新的编辑会取消尚未完成的检测/翻译
+    """
+    def __init__(self, send: Callable[[dict], Awaitable[None]]):
+        self._send = send
+        self.detector = InputTriggerDetector()
+        self.source_language = 'en'
+        self.target_language = 'zh'
+        self.llm_api_key: Optional[str] = None
+        self.llm_provider: Optional[str] = None
+        self.incremental = False
+        self.speculative = False
+        self.last_translated_text = ''
+        self.is_first_translation = True
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, message: dict):
+        """
+        更新会话配置（语言、服务商、API Key、是否增量/推测翻译）
+        """
+        self.source_language = message.get('source_language', self.source_language)
+        self.target_language = message.get('target_language', self.target_language)
+        self.llm_api_key = message.get('llm_api_key', self.llm_api_key)
+        self.llm_provider = message.get('llm_provider', self.llm_provider)
+        self.incremental = bool(message.get('incremental', self.incremental))
+        self.speculative = bool(message.get('speculative', self.speculative))
+
+    def on_edit(self, text: str):
+        """
+        收到文本编辑：取消上一次检测，重新开始检测循环
+        """
+        self.cancel()
+        self._task = asyncio.create_task(self._evaluate(text))
+
+    def cancel(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _evaluate(self, text: str):
+        # WebSocket 连接不经过 HTTP 中间件，每次编辑的检测/翻译单独作为一条链路
+        with start_trace("session.edit", chars=len(text), speculative=self.speculative):
+            await self._evaluate_edit(text)
+
+    async def _evaluate_edit(self, text: str):
+        # 推测模式：检测期间译文已在后台进行，触发后直接采用；文本与上次翻译相同时不会再次触发，无需推测
+        speculation = None
+        if (self.speculative and self._can_translate() and text.strip() and not self.incremental
+                and text != self.last_translated_text):
+            speculation = start_speculation(
+                text, self.source_language, self.target_language, self.llm_api_key, self.llm_provider
+            )
+        try:
+            # 文本不变时按固定间隔复检，与前端轮询语义一致，直到触发或用户继续输入
+            for _ in range(PAUSE_COUNTER_LIMIT + 1):
+                should = await self.detector.should_translate(
+                    text, self.source_language, self.last_translated_text,
+                    self.is_first_translation, self.llm_api_key
+                )
+                if should:
+                    task, speculation = speculation, None
+                    await self._translate(text, task)
+                    return
+                if not text.strip():
+                    return
+                await asyncio.sleep(PAUSE_TICK_INTERVAL / 1000)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._send({"type": "error", "source_text": text, "detail": str(e)})
+        finally:
+            if speculation is not None:
+                discard_speculation(speculation)
+
+    def _can_translate(self) -> bool:
+        return bool(self.llm_api_key and self.llm_provider)
+
+    async def _translate(self, text: str, speculation: Optional[asyncio.Task] = None):
+        if not self._can_translate():
+            await self._send({"type": "trigger", "source_text": text})
+            return
+        if speculation is not None:
+            translated = await commit_speculation(speculation)
+        else:
+            translate_func = translate_incremental if self.incremental else translate_with_llm
+            translated = await translate_func(
+                text, self.source_language, self.target_language, self.llm_api_key, self.llm_provider
+            )
+        self.last_translated_text = text
+        self.is_first_translation = False
+        await self._send({"type": "translation", "source_text": text, "translated_text": translated})
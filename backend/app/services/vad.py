@@ -0,0 +1,133 @@
+# @AI-Generated
+"""
+能量语音活动检测（VAD）：16 位单声道 PCM 按帧计算能量（NumPy 向量化），
+自适应噪声底 + 余量作为阈值，连续有声帧开始一句话，连续静音帧结束一句话
+"""
+import os
+from typing import List, Optional, Tuple
+import numpy as np
+
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+VAD_MIN_DB = float(os.getenv("VAD_MIN_DB", "-45"))                      # 阈值下限（dBFS），安静环境下的底线
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))                 # 高于噪声底多少 dB 视为有声
+VAD_START_MS = int(os.getenv("VAD_START_MS", "90"))                     # 连续有声多久开始一句话
+VAD_SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "600"))                # 连续静音多久结束一句话
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "200"))                # 句首保留的开始前音频，避免切掉弱起音
+VAD_MAX_UTTERANCE_MS = int(os.getenv("VAD_MAX_UTTERANCE_MS", "15000"))  # 单句最长，超过强制切分
+
+# 噪声底跟踪的平滑系数（每个静音帧）
+_NOISE_ALPHA = 0.05
+_INT16_FULL_SCALE = 32768.0
+
+def frame_energy_db(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """
+    每帧 RMS 能量（dBFS），不足一帧的尾部不计算
+    :param samples: int16 采样
+    """
+    count = len(samples) // frame_len
+    if count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[:count * frame_len].reshape(count, frame_len).astype(np.float32) / _INT16_FULL_SCALE
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-6))
+
+class EnergyVAD:
+    """
+    流式分句：feed 任意长度的 PCM 字节，返回本次新完成的句子（PCM 字节、起止毫秒）
+    """
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * VAD_FRAME_MS // 1000
+        self.frame_bytes = self.frame_len * 2
+        self.start_frames = max(1, VAD_START_MS // VAD_FRAME_MS)
+        self.silence_frames = max(1, VAD_SILENCE_MS // VAD_FRAME_MS)
+        self.preroll_frames = VAD_PREROLL_MS // VAD_FRAME_MS
+        self.max_frames = max(self.start_frames + 1, VAD_MAX_UTTERANCE_MS // VAD_FRAME_MS)
+        self.noise_db: Optional[float] = None
+        self._remainder = b''
+        self._frames_seen = 0           # 已处理的帧数，用于计算时间戳
+        self._recent: List[bytes] = []  # 未进入句子的最近若干帧（预留 + 起始判定）
+        self._voiced_run = 0
+        self._utterance: List[bytes] = []
+        self._utterance_start = 0       # 句首帧序号
+        self._silence_run = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return bool(self._utterance)
+
+    def current_audio(self) -> bytes:
+        """
+        进行中的句子已收到的音频（用于中间结果）
+        """
+        return b''.join(self._utterance)
+
+    def feed(self, pcm: bytes) -> List[Tuple[bytes, int, int]]:
+        """
+        :return: 新完成的句子列表 [(PCM 字节, 起始毫秒, 结束毫秒)]
+        """
+        data = self._remainder + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        if not usable:
+            return []
+        samples = np.frombuffer(data[:usable], dtype='<i2')
+        energies = frame_energy_db(samples, self.frame_len)
+        finished = []
+        for index, energy in enumerate(energies.tolist()):
+            frame = data[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            result = self._step(frame, energy)
+            if result is not None:
+                finished.append(result)
+        return finished
+
+    def flush(self) -> Optional[Tuple[bytes, int, int]]:
+        """
+        音频流结束：进行中的句子直接结束
+        """
+        self._remainder = b''
+        if not self._utterance:
+            return None
+        return self._finish(trailing_silence=0)
+
+    def _threshold(self) -> float:
+        if self.noise_db is None:
+            return VAD_MIN_DB
+        return max(VAD_MIN_DB, self.noise_db + VAD_MARGIN_DB)
+
+    def _step(self, frame: bytes, energy: float) -> Optional[Tuple[bytes, int, int]]:
+        voiced = energy >= self._threshold()
+        self._frames_seen += 1
+        if not self._utterance:
+            if not voiced:
+                self.noise_db = energy if self.noise_db is None else (1 - _NOISE_ALPHA) * self.noise_db + _NOISE_ALPHA * energy
+            self._recent.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                # 起始判定的有声帧与之前的预留帧一起作为句首
+                keep = self.preroll_frames + self._voiced_run
+                self._utterance = self._recent[-keep:]
+                self._utterance_start = self._frames_seen - len(self._utterance)
+                self._recent = []
+                self._voiced_run = 0
+                self._silence_run = 0
+            elif len(self._recent) > self.preroll_frames + self.start_frames:
+                del self._recent[0]
+            return None
+        self._utterance.append(frame)
+        self._silence_run = 0 if voiced else self._silence_run + 1
+        if self._silence_run >= self.silence_frames:
+            return self._finish(trailing_silence=self._silence_run)
+        if len(self._utterance) >= self.max_frames:
+            return self._finish(trailing_silence=0)
+        return None
+
+    def _finish(self, trailing_silence: int) -> Tuple[bytes, int, int]:
+        # 句尾只保留少量静音
+        keep = len(self._utterance) - max(trailing_silence - self.preroll_frames, 0)
+        audio = b''.join(self._utterance[:keep])
+        start_ms = self._utterance_start * VAD_FRAME_MS
+        end_ms = start_ms + keep * VAD_FRAME_MS
+        self._utterance = []
+        self._silence_run = 0
+        return audio, start_ms, end_ms
@@ -0,0 +1,12 @@
+# @AI-Generated
+"""
+测试公共配置：启用本地假语音识别服务，不调用外部接口
+在 backend 目录下运行：python -m pytest tests
+"""
+import os
+import sys
+
+# 服务模块在导入时读取环境变量，须在导入 app 之前设置
+os.environ.setdefault("SPEECH_FAKE_PROVIDER", "1")
+os.environ.setdefault("SPEECH_FAKE_LATENCY", "0.01")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
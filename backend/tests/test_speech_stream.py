@@ -0,0 +1,190 @@
+# @AI-Generated
+"""
+流式语音识别：VAD 分句与时间戳、最终结果按序推送、并发背压、WebSocket 接口
+"""
+import asyncio
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import speech_stream
+from app.services.speech_stream import SpeechStreamSession
+from app.services.vad import EnergyVAD, VAD_FRAME_MS, VAD_PREROLL_MS, VAD_MAX_UTTERANCE_MS
+
+RATE = 16000
+
+def tone(ms: int, amplitude: float = 0.3) -> bytes:
+    t = np.arange(RATE * ms // 1000) / RATE
+    return (amplitude * 32767 * np.sin(2 * np.pi * 300 * t)).astype('<i2').tobytes()
+
+def silence(ms: int) -> bytes:
+    return b'\0\0' * (RATE * ms // 1000)
+
+def utterances(*tone_ms: int, gap_ms: int = 1000) -> bytes:
+    """
+    静音开头，每句之间及末尾各有 gap_ms 静音
+    """
+    return silence(gap_ms) + b''.join(tone(ms) + silence(gap_ms) for ms in tone_ms)
+
+def test_vad_cuts_utterances_with_timestamps():
+    vad = EnergyVAD(RATE)
+    results = vad.feed(silence(510) + tone(1020) + silence(1200) + tone(600) + silence(1200))
+    assert len(results) == 2
+    (first, start_ms, end_ms), (_, second_start, second_end) = results
+    # 句首保留预留音频，句尾保留少量静音
+    assert 510 - VAD_PREROLL_MS - VAD_FRAME_MS <= start_ms <= 510
+    assert 1530 <= end_ms <= 1530 + VAD_PREROLL_MS + VAD_FRAME_MS
+    assert len(first) == (end_ms - start_ms) * RATE // 1000 * 2
+    assert 2730 - VAD_PREROLL_MS - VAD_FRAME_MS <= second_start <= 2730
+    assert 3330 <= second_end <= 3330 + VAD_PREROLL_MS + VAD_FRAME_MS
+    assert not vad.in_speech
+
+def test_vad_handles_arbitrary_chunking():
+    audio = utterances(800, 800)
+    vad = EnergyVAD(RATE)
+    chunked = []
+    for offset in range(0, len(audio), 777):
+        chunked.extend(vad.feed(audio[offset:offset + 777]))
+    assert [(start, end) for _, start, end in chunked] == [(start, end) for _, start, end in EnergyVAD(RATE).feed(audio)]
+
+def test_vad_flush_ends_open_utterance():
+    vad = EnergyVAD(RATE)
+    assert vad.feed(silence(300) + tone(600)) == []
+    assert vad.in_speech
+    audio, start_ms, end_ms = vad.flush()
+    assert end_ms - start_ms == len(audio) * 1000 // (RATE * 2)
+    assert not vad.in_speech
+    assert vad.flush() is None
+
+def test_vad_splits_overlong_utterance():
+    vad = EnergyVAD(RATE)
+    results = vad.feed(tone(VAD_MAX_UTTERANCE_MS + 3000))
+    assert len(results) == 1
+    assert results[0][2] - results[0][1] <= VAD_MAX_UTTERANCE_MS
+    assert vad.in_speech
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, message: dict):
+        self.messages.append(message)
+
+    def of_type(self, msg_type: str):
+        return [m for m in self.messages if m["type"] == msg_type]
+
+def make_session(recorder: Recorder, **config) -> SpeechStreamSession:
+    session = SpeechStreamSession(recorder.send)
+    session.configure({"type": "config", "provider": "fake", **config})
+    return session
+
+def test_fake_provider_final_text():
+    async def run():
+        recorder = Recorder()
+        session = make_session(recorder)
+        await session.on_audio(utterances(1000))
+        await session.on_end()
+        return recorder
+    recorder = asyncio.run(run())
+    finals = recorder.of_type("final")
+    assert len(finals) == 1
+    assert finals[0]["text"].startswith("语音 ")
+    assert recorder.messages[-1] == {"type": "done", "utterances": 1}
+
+def test_finals_are_sent_in_order():
+    async def run():
+        recorder = Recorder()
+        session = make_session(recorder)
+
+        # 第一句识别最慢，后面的句子先识别完也要等它推送
+        async def recognize(audio: bytes):
+            seconds = len(audio) / (RATE * 2)
+            await asyncio.sleep(0.3 if seconds > 1.5 else 0.01)
+            return f"{seconds:.1f}", 1.0
+        session._recognize = recognize
+        await session.on_audio(utterances(2000, 500, 500))
+        await session.on_end()
+        return recorder
+    recorder = asyncio.run(run())
+    finals = recorder.of_type("final")
+    assert [m["seq"] for m in finals] == [0, 1, 2]
+    assert [m["start_ms"] for m in finals] == sorted(m["start_ms"] for m in finals)
+    assert recorder.messages[-1]["type"] == "done"
+
+def test_pending_recognitions_apply_backpressure(monkeypatch):
+    monkeypatch.setattr(speech_stream, "STREAM_MAX_PENDING", 2)
+
+    async def run():
+        recorder = Recorder()
+        session = make_session(recorder)
+        release = asyncio.Event()
+        started = []
+
+        async def recognize(audio: bytes):
+            started.append(len(audio))
+            await release.wait()
+            return "ok", 1.0
+        session._recognize = recognize
+        feeding = asyncio.create_task(session.on_audio(utterances(400, 400, 400, 400)))
+        await asyncio.sleep(0.1)
+        # 两句在识别，第三句等待名额，读取端被阻塞
+        assert len(started) == 2
+        assert not feeding.done()
+        release.set()
+        await feeding
+        await session.on_end()
+        return recorder, started
+    recorder, started = asyncio.run(run())
+    assert len(started) == 4
+    assert [m["seq"] for m in recorder.of_type("final")] == [0, 1, 2, 3]
+
+@pytest.mark.parametrize("config, detail", [
+    ({"provider": "fake", "sample_rate": None}, "采样率"),
+    ({"provider": ["fake"]}, "服务商"),
+    ({"provider": "fake", "sample_rate": 4000}, "采样率"),
+    ({"provider": "fake", "interim": "false"}, "interim"),
+    ({"provider": "fake", "api_key": 1}, "api_key"),
+])
+def test_configure_rejects_invalid_values(config, detail):
+    session = SpeechStreamSession(Recorder().send)
+    with pytest.raises(ValueError, match=detail):
+        session.configure({"type": "config", **config})
+
+def test_websocket_stream():
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/translation/speech/ws") as ws:
+            ws.send_bytes(silence(100))
+            assert ws.receive_json()["type"] == "error"
+            ws.send_text("not json")
+            assert ws.receive_json() == {"type": "error", "detail": "消息不是合法的 JSON"}
+            ws.send_json({"type": "config", "provider": "fake", "interim": "false"})
+            assert "interim" in ws.receive_json()["detail"]
+
+            ws.send_json({"type": "config", "provider": "fake"})
+            audio = utterances(800, 800)
+            for offset in range(0, len(audio), 3200):
+                ws.send_bytes(audio[offset:offset + 3200])
+            ws.send_json({"type": "end"})
+            messages = []
+            while not messages or messages[-1]["type"] != "done":
+                messages.append(ws.receive_json())
+    finals = [m for m in messages if m["type"] == "final"]
+    assert [m["seq"] for m in finals] == [0, 1]
+    assert all(m["text"].startswith("语音 ") for m in finals)
+    assert [m["seq"] for m in messages if m["type"] == "speech_start"] == [0, 1]
+    assert messages[-1] == {"type": "done", "utterances": 2}
+
+def test_websocket_resamples_other_rates():
+    rate = 44100
+    t = np.arange(rate) / rate
+    audio = np.concatenate([np.zeros(rate // 2), 0.3 * np.sin(2 * np.pi * 300 * t), np.zeros(rate)])
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/translation/speech/ws") as ws:
+            ws.send_json({"type": "config", "provider": "fake", "sample_rate": rate})
+            ws.send_bytes((audio * 32767).astype('<i2').tobytes())
+            ws.send_json({"type": "end"})
+            messages = []
+            while not messages or messages[-1]["type"] != "done":
+                messages.append(ws.receive_json())
+    finals = [m for m in messages if m["type"] == "final"]
+    assert len(finals) == 1 and finals[0]["text"].startswith("语音 ")
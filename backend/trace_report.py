@@ -0,0 +1,59 @@
+# @AI-Generated
+"""
+链路文件分析：按 trace 汇总总耗时与最慢阶段（自身耗时最长的子 span），并按阶段统计 p50/p95
+用法（在 backend 目录下）: python trace_report.py [链路文件，默认 traces.jsonl] [列出的最慢请求数，默认 20]
+"""
+import json
+import sys
+from collections import defaultdict
+
+def load_spans(path: str):
+    traces = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                span["ms"] = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                traces[span["traceId"]].append(span)
+    return traces
+
+def self_times(spans: list) -> dict:
+    """
+    自身耗时 = span 耗时 - 直接子 span 耗时之和（并发子 span 可能使结果偏小，最小为 0）
+    """
+    children = defaultdict(float)
+    for span in spans:
+        if span.get("parentSpanId"):
+            children[span["parentSpanId"]] += span["ms"]
+    return {span["spanId"]: max(span["ms"] - children[span["spanId"]], 0.0) for span in spans}
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+def main(path: str, top: int):
+    traces = load_spans(path)
+    rows = []
+    stage_ms = defaultdict(list)
+    for trace_id, spans in traces.items():
+        ids = {span["spanId"] for span in spans}
+        roots = [span for span in spans if span.get("parentSpanId") not in ids]
+        own = self_times(spans)
+        for span in spans:
+            stage_ms[span["name"]].append(span["ms"])
+        slowest = max(spans, key=lambda s: own[s["spanId"]])
+        total = max(root["ms"] for root in roots)
+        rows.append((total, trace_id, roots[0]["name"], slowest["name"], own[slowest["spanId"]]))
+
+    print(f"trace 数: {len(rows)}，最慢的 {min(top, len(rows))} 个请求：")
+    print(f"{'总耗时ms':>10}  {'trace_id':<32}  {'请求':<40}  最慢阶段（自身耗时ms）")
+    for total, trace_id, name, stage, stage_own in sorted(rows, reverse=True)[:top]:
+        print(f"{total:10.1f}  {trace_id:<32}  {name:<40}  {stage} ({stage_own:.1f})")
+
+    print("\n各阶段耗时：")
+    print(f"{'阶段':<40} {'次数':>8} {'p50ms':>10} {'p95ms':>10}")
+    for name, values in sorted(stage_ms.items(), key=lambda item: -percentile(item[1], 0.95)):
+        print(f"{name:<40} {len(values):>8} {percentile(values, 0.5):10.1f} {percentile(values, 0.95):10.1f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else "traces.jsonl", int(sys.argv[2]) if len(sys.argv) > 2 else 20)